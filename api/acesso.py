@@ -1,29 +1,23 @@
 # acesso.py
 import requests
-from msal import ConfidentialClientApplication
 import streamlit as st
 
+from api.graph_api import obter_token as _obter_token_compartilhado
 
-def obter_token():
-    client_id = st.secrets["AZURE_CLIENT_ID"]
-    client_secret = st.secrets["AZURE_CLIENT_SECRET"]
-    tenant_id = st.secrets["AZURE_TENANT_ID"]
-
-    authority = f"https://login.microsoftonline.com/{tenant_id}"
-    scope = ["https://graph.microsoft.com/.default"]
-
-    app_msal = ConfidentialClientApplication(
-        client_id, authority=authority, client_credential=client_secret
-    )
 
-    token_response = app_msal.acquire_token_for_client(scopes=scope)
-    if "access_token" not in token_response:
+def obter_token():
+    # mesmo token do processo que o api.graph_api (renovado em segundo plano antes de expirar)
+    try:
+        return _obter_token_compartilhado()
+    except Exception as e:
         st.error("\u274c Erro ao gerar token de acesso.")
-        st.json(token_response)
+        resposta = getattr(e, "response", None)
+        try:
+            st.json(resposta.json())
+        except Exception:
+            st.write(str(e))
         st.stop()
 
-    return token_response["access_token"]
-
 
 def obter_site_drive_ids(headers, dominio, biblioteca):
     site_url = f"https://graph.microsoft.com/v1.0/sites/{dominio}:/"
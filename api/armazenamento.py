@@ -0,0 +1,181 @@
+import io
+import os
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, Optional, Tuple
+
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.utils.dataframe import dataframe_to_rows
+
+from api.cache_disco import gravar_atomico
+from api.escritor_xlsx import substituir_abas_xlsx
+from api.leitor_xlsx import ler_aba_xlsx
+
+try:
+    import fcntl
+except ImportError:  # Windows: só o lock entre threads do processo
+    fcntl = None
+
+# =====================================================
+# Armazenamento da planilha: bytes do workbook + versão (ETag) + escrita condicional
+# =====================================================
+
+Lido = Tuple[Optional[bytes], Optional[str], Optional[str]]  # (bytes | None se não mudou, etag, last_modified)
+Gravado = Tuple[bytes, Optional[str], Optional[str]]        # (bytes gravados, etag, last_modified)
+
+
+def _write_df_to_worksheet(ws, df: pd.DataFrame):
+    ws.delete_rows(1, ws.max_row if ws.max_row else 1)
+    for row in dataframe_to_rows(df, index=False, header=True):
+        ws.append(row)
+
+def montar_xlsx(content: bytes, abas: Dict[str, pd.DataFrame], por_zip: bool = False) -> bytes:
+    """
+    Troca as abas informadas no .xlsx 'content' (as demais ficam como estão; abas novas entram
+    no fim, como no create_sheet). Com 'por_zip' só o XML delas é regenerado e as outras partes
+    do zip são copiadas; sem ele (ou se o zip não der conta) o workbook passa pelo openpyxl.
+    """
+    if por_zip:
+        novo = substituir_abas_xlsx(content, abas)
+        if novo is not None:
+            return novo
+    wb = load_workbook(io.BytesIO(content))
+    for sheet_name, df in abas.items():
+        if sheet_name in wb.sheetnames:
+            ws = wb[sheet_name]
+        else:
+            ws = wb.create_sheet(title=sheet_name)
+        _write_df_to_worksheet(ws, df)
+    out = io.BytesIO()
+    wb.save(out)
+    return out.getvalue()
+
+
+class VersaoAlterada(Exception):
+    """Escrita condicional recusada: o arquivo não está mais na versão informada (412 no Graph)."""
+
+
+class ArmazenamentoPlanilha(ABC):
+    """
+    Onde a planilha mora. O resto do app (cache por ETag, parse, escrita por zip, fila de
+    escrita) só depende destas operações:
+    - versao(): (etag, last_modified) atuais, sem baixar o conteúdo;
+    - ler(se_diferente_de): bytes da versão atual, ou None se ainda for 'se_diferente_de';
+    - gravar(dados, se_versao): grava; com 'se_versao', só se a versão atual for essa
+      (senão levanta VersaoAlterada). Retorna (etag, last_modified) da versão gravada.
+    Por aba, sobre as mesmas operações (um backend que guarde abas separadas pode sobrescrever):
+    - ler_aba(nome): DataFrame de uma aba da versão atual e o ETag dela;
+    - gravar_abas(abas, se_versao, base): troca só as abas informadas, com a mesma condicional.
+    """
+    nome = ""
+    por_zip = False  # True: gravar_abas troca só o XML das abas no zip (SALVAR_POR_ZIP)
+
+    def preparar(self) -> None:
+        """Deixa o acesso pronto (credenciais, IDs); opcional."""
+
+    @abstractmethod
+    def versao(self) -> Tuple[Optional[str], Optional[str]]: ...
+
+    @abstractmethod
+    def ler(self, se_diferente_de: Optional[str] = None) -> Lido: ...
+
+    @abstractmethod
+    def gravar(self, dados: bytes, se_versao: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]: ...
+
+    def ler_aba(self, nome: str) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+        """Uma aba da versão atual (None se não existir), lida sem abrir o workbook inteiro, e o ETag."""
+        dados, etag, _ = self.ler()
+        return ler_aba_xlsx(dados, nome), etag
+
+    def gravar_abas(self, abas: Dict[str, pd.DataFrame], se_versao: Optional[str] = None,
+                    base: Optional[bytes] = None) -> Gravado:
+        """
+        Troca as abas informadas e grava (condicional como em gravar()). 'base' são os bytes da
+        versão 'se_versao' já em mãos; sem eles, parte da versão atual.
+        """
+        if base is None:
+            base, atual, _ = self.ler()
+            if se_versao and atual != se_versao:
+                raise VersaoAlterada(f"versão {atual}, esperada {se_versao}")
+        dados = montar_xlsx(base, abas, por_zip=self.por_zip)
+        etag, modificado = self.gravar(dados, se_versao=se_versao)
+        return dados, etag, modificado
+
+    def estatisticas(self) -> dict:
+        return {}
+
+
+def _etag_de(st: os.stat_result) -> str:
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}-{st.st_ino:x}"'
+
+def _modificado_de(st: os.stat_result) -> str:
+    return datetime.fromtimestamp(st.st_mtime, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class ArmazenamentoLocal(ArmazenamentoPlanilha):
+    """
+    Workbook num arquivo local (.xlsx). O ETag vem do stat (mtime, tamanho, inode): consultar a
+    versão não lê o arquivo. Gravações são atômicas (temporário + os.replace) e a condicional
+    roda sob lock de thread e, onde houver fcntl, lock de arquivo (vale entre processos).
+    Edições externas (ex.: o arquivo aberto e salvo no Excel) aparecem como versão nova.
+    """
+    nome = "local"
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        self._lock = threading.Lock()
+        self.stats = {"leituras": 0, "nao_modificado": 0, "gravacoes": 0, "conflitos": 0}
+
+    @contextmanager
+    def _travado(self) -> Iterator[None]:
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.caminho + ".lock", "a") as trava:
+                fcntl.flock(trava, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(trava, fcntl.LOCK_UN)
+
+    def versao(self) -> Tuple[Optional[str], Optional[str]]:
+        try:
+            st = os.stat(self.caminho)
+        except FileNotFoundError:
+            return None, None
+        return _etag_de(st), _modificado_de(st)
+
+    def ler(self, se_diferente_de: Optional[str] = None) -> Lido:
+        with open(self.caminho, "rb") as f:
+            st = os.fstat(f.fileno())  # mesmo arquivo aberto: versão e bytes sempre batem
+            etag = _etag_de(st)
+            if se_diferente_de and etag == se_diferente_de:
+                self.stats["nao_modificado"] += 1
+                return None, etag, _modificado_de(st)
+            dados = f.read()
+        self.stats["leituras"] += 1
+        return dados, etag, _modificado_de(st)
+
+    def gravar(self, dados: bytes, se_versao: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+        with self._travado():
+            atual, _ = self.versao()
+            if se_versao and atual != se_versao:
+                self.stats["conflitos"] += 1
+                raise VersaoAlterada(f"{self.caminho}: versão {atual}, esperada {se_versao}")
+            gravar_atomico(self.caminho, dados)
+            etag, modificado = self.versao()
+            if etag == atual:
+                # mtime com resolução grossa: garante ETag novo a cada gravação
+                st = os.stat(self.caminho)
+                os.utime(self.caminho, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+                etag, modificado = self.versao()
+            self.stats["gravacoes"] += 1
+            return etag, modificado
+
+    def estatisticas(self) -> dict:
+        return dict(self.stats)
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from api.cache_colunar import codificar_rotulos, decodificar_rotulos
+from api.cache_disco import gravar_atomico
+
+# =====================================================
+# Arquivo frio: revisões antigas da "Base de Dados" em arquivos Arrow, lidas sob demanda
+# =====================================================
+
+_MANIFESTO = "manifesto.json"
+_META_ROTULOS = b"rotulos_colunas"
+
+
+def _tabela_arrow(df: pd.DataFrame) -> pa.Table:
+    """
+    DataFrame → Arrow com colunas posicionais (c0, c1...). Colunas de texto com tipos
+    misturados (ex.: CC ora número, ora texto) vão como texto; nulos continuam nulos.
+    """
+    colunas = {}
+    for i, c in enumerate(df.columns):
+        serie = df.iloc[:, i]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            serie = serie.astype(object)
+        try:
+            colunas[f"c{i}"] = pa.array(serie, from_pandas=True)
+        except (pa.ArrowException, TypeError, ValueError):
+            colunas[f"c{i}"] = pa.array(serie.map(lambda v: None if pd.isna(v) else str(v)), type=pa.string())
+    return pa.table(colunas)
+
+
+class ArquivoRevisoes:
+    """
+    Uma revisão arquivada = um arquivo Arrow IPC em '<diretorio>/<sha1(revisão)>.arrow' com
+    as linhas exatamente como estavam na aba (todos os cenários). O manifesto (JSON) guarda
+    a ordem de arquivamento e o tamanho de cada uma; listar não abre nenhum arquivo.
+    carregar() lê via memory-map só as revisões pedidas e mantém as 'em_memoria' mais
+    recentes. Arquivar de novo a mesma revisão substitui o arquivo (idempotente).
+    O diretório precisa ser persistente: o que sai da planilha passa a existir só aqui.
+    """
+
+    def __init__(self, diretorio: str, em_memoria: int = 8):
+        self.diretorio = diretorio
+        self.em_memoria = em_memoria
+        os.makedirs(diretorio, exist_ok=True)
+        self._lock = threading.Lock()
+        self._memoria: "OrderedDict[Any, pd.DataFrame]" = OrderedDict()
+        self._manifesto: Dict[str, dict] = self._ler_manifesto()
+        self.stats = {"arquivadas": 0, "leituras": 0, "acertos_memoria": 0}
+
+    def _caminho(self, revisao: Any) -> str:
+        return os.path.join(self.diretorio, hashlib.sha1(str(revisao).encode("utf-8")).hexdigest() + ".arrow")
+
+    def _ler_manifesto(self) -> Dict[str, dict]:
+        try:
+            with open(os.path.join(self.diretorio, _MANIFESTO), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    # ---------------- escrita ----------------
+
+    def arquivar(self, revisao: Any, df: pd.DataFrame) -> int:
+        """Grava as linhas da revisão; retorna quantas foram arquivadas."""
+        rotulos = codificar_rotulos(df.columns)
+        if rotulos is None:
+            raise ValueError(f"colunas não representáveis no arquivo: {list(df.columns)!r}")
+        tabela = _tabela_arrow(df)
+        tabela = tabela.replace_schema_metadata({_META_ROTULOS: json.dumps(rotulos).encode("utf-8")})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_file(sink, tabela.schema) as writer:
+            writer.write_table(tabela)
+        dados = sink.getvalue().to_pybytes()
+        with self._lock:
+            gravar_atomico(self._caminho(revisao), dados)
+            anterior = self._manifesto.pop(str(revisao), None)
+            self._manifesto[str(revisao)] = {
+                "linhas": len(df),
+                "bytes": len(dados),
+                "arquivado_em": anterior["arquivado_em"] if anterior else time.time(),
+            }
+            gravar_atomico(os.path.join(self.diretorio, _MANIFESTO),
+                           json.dumps(self._manifesto, ensure_ascii=False).encode("utf-8"))
+            self._memoria.pop(str(revisao), None)
+            self.stats["arquivadas"] += 1
+        return len(df)
+
+    # ---------------- leitura ----------------
+
+    def __contains__(self, revisao: Any) -> bool:
+        return str(revisao) in self._manifesto
+
+    def revisoes(self) -> List[str]:
+        """Revisões arquivadas, na ordem em que foram arquivadas (a mais antiga primeiro)."""
+        with self._lock:
+            return list(self._manifesto)
+
+    def carregar(self, revisao: Any) -> pd.DataFrame:
+        """Linhas da revisão arquivada (vazio se não existir). Somente leitura: copie antes de alterar."""
+        chave = str(revisao)
+        with self._lock:
+            if chave in self._memoria:
+                self._memoria.move_to_end(chave)
+                self.stats["acertos_memoria"] += 1
+                return self._memoria[chave]
+            if chave not in self._manifesto:
+                return pd.DataFrame()
+        with pa.memory_map(self._caminho(chave), "r") as origem:
+            tabela = pa.ipc.open_file(origem).read_all()
+        df = tabela.to_pandas()
+        df.columns = decodificar_rotulos(json.loads(tabela.schema.metadata[_META_ROTULOS]))
+        for c in df.columns[df.dtypes == object]:
+            df[c] = df[c].where(df[c].notna(), np.nan)  # como o read_excel entrega
+        with self._lock:
+            self.stats["leituras"] += 1
+            self._memoria[chave] = df
+            while len(self._memoria) > self.em_memoria:
+                self._memoria.popitem(last=False)
+        return df
+
+    def carregar_varias(self, revisoes: Iterable[Any]) -> pd.DataFrame:
+        """Várias revisões arquivadas, na ordem pedida (as inexistentes são ignoradas)."""
+        fatias = [self.carregar(r) for r in dict.fromkeys(revisoes) if r in self]
+        if not fatias:
+            return pd.DataFrame()
+        return pd.concat(fatias, ignore_index=True)
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            dados = dict(self.stats)
+            dados["revisoes"] = len(self._manifesto)
+            dados["linhas"] = sum(m["linhas"] for m in self._manifesto.values())
+            dados["bytes"] = sum(m["bytes"] for m in self._manifesto.values())
+            dados["em_memoria"] = len(self._memoria)
+        return dados
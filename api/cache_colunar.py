@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from api.cache_disco import gravar_atomico, despejar_lru
+
+# =====================================================
+# Cache colunar (Arrow IPC) das abas já parseadas, por (ETag, aba)
+# =====================================================
+
+_META_ROTULOS = b"rotulos_colunas"
+
+def codificar_rotulos(colunas) -> Optional[List[list]]:
+    """
+    Arrow só aceita nomes de coluna string; as colunas de mês do Excel chegam como datetime.
+    Guarda o tipo original de cada rótulo para restaurar exatamente na leitura.
+    """
+    rotulos = []
+    for c in colunas:
+        if isinstance(c, str):
+            rotulos.append(["s", c])
+        elif isinstance(c, datetime):  # inclui pd.Timestamp
+            rotulos.append(["d", c.isoformat()])
+        elif isinstance(c, (bool, np.bool_)):
+            return None
+        elif isinstance(c, (int, np.integer)):
+            rotulos.append(["i", int(c)])
+        elif isinstance(c, (float, np.floating)):
+            rotulos.append(["f", float(c)])
+        else:
+            return None
+    return rotulos
+
+def decodificar_rotulos(rotulos: List[list]) -> list:
+    colunas = []
+    for tipo, valor in rotulos:
+        if tipo == "d":
+            colunas.append(datetime.fromisoformat(valor))
+        else:
+            colunas.append(valor)
+    return colunas
+
+
+class CacheColunar:
+    """
+    Cada aba parseada vira um arquivo Arrow IPC (sem compressão) em
+    '<diretorio>/<sha1(etag, aba)>.arrow', lido via memory-map em vez de reinterpretar
+    o XML do .xlsx. Abas com colunas de tipos misturados (que o Arrow não representa)
+    simplesmente não são cacheadas. Despejo LRU ao passar de 'limite_bytes'.
+    """
+
+    def __init__(self, diretorio: str, limite_bytes: int):
+        self.diretorio = diretorio
+        self.limite_bytes = limite_bytes
+        os.makedirs(diretorio, exist_ok=True)
+
+    def _caminho(self, etag: str, aba: str) -> str:
+        chave = hashlib.sha1(f"{etag}\0{aba}".encode("utf-8")).hexdigest()
+        return os.path.join(self.diretorio, chave + ".arrow")
+
+    def obter(self, etag: Optional[str], aba: str) -> Optional[pd.DataFrame]:
+        if not etag:
+            return None
+        caminho = self._caminho(etag, aba)
+        if not os.path.exists(caminho):
+            return None
+        try:
+            with pa.memory_map(caminho, "r") as origem:
+                tabela = pa.ipc.open_file(origem).read_all()
+            meta = tabela.schema.metadata or {}
+            colunas = decodificar_rotulos(json.loads(meta[_META_ROTULOS]))
+            df = tabela.to_pandas()
+        except (OSError, KeyError, ValueError, pa.ArrowException):
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+            return None
+        # strings nulas voltam como None; o read_excel entrega NaN
+        for i, campo in enumerate(tabela.schema):
+            if pa.types.is_string(campo.type) and tabela.column(i).null_count:
+                serie = df.iloc[:, i]
+                df.isetitem(i, serie.where(serie.notna(), np.nan))
+        df.columns = colunas
+        try:
+            os.utime(caminho, None)  # marca uso recente (LRU)
+        except OSError:
+            pass
+        return df
+
+    def gravar(self, etag: Optional[str], aba: str, df: pd.DataFrame) -> bool:
+        """Grava a aba; retorna False quando ela não é representável em Arrow."""
+        if not etag or df is None:
+            return False
+        rotulos = codificar_rotulos(df.columns)
+        if rotulos is None:
+            return False
+        tmp = df.copy(deep=False)
+        tmp.columns = [f"c{i}" for i in range(len(tmp.columns))]
+        try:
+            tabela = pa.Table.from_pandas(tmp, preserve_index=False)
+        except (pa.ArrowException, TypeError, ValueError):
+            return False
+        meta = dict(tabela.schema.metadata or {})
+        meta[_META_ROTULOS] = json.dumps(rotulos).encode("utf-8")
+        tabela = tabela.replace_schema_metadata(meta)
+
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_file(sink, tabela.schema) as writer:
+            writer.write_table(tabela)
+        caminho = self._caminho(etag, aba)
+        try:
+            gravar_atomico(caminho, sink.getvalue().to_pybytes())
+            despejar_lru(self.diretorio, self.limite_bytes, ".arrow", manter=caminho)
+        except OSError:
+            return False
+        return True
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Optional, Tuple
+
+# =====================================================
+# Cache em disco dos bytes do workbook, indexado por ETag
+# =====================================================
+
+def gravar_atomico(caminho: str, dados: bytes) -> None:
+    """Grava em arquivo temporário no mesmo diretório e troca com os.replace (nunca deixa arquivo parcial)."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(caminho), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(dados)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, caminho)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+def despejar_lru(diretorio: str, limite_bytes: int, extensao: str,
+                 manter: Optional[str] = None, companheiros: Tuple[str, ...] = ()) -> None:
+    """
+    Remove os arquivos '*<extensao>' menos recentemente usados (mtime) até o total caber
+    em 'limite_bytes'. 'manter' nunca é removido; 'companheiros' são extensões de arquivos
+    auxiliares com o mesmo nome-base (removidos junto).
+    """
+    entradas = []
+    for nome in os.listdir(diretorio):
+        if not nome.endswith(extensao):
+            continue
+        caminho = os.path.join(diretorio, nome)
+        try:
+            info = os.stat(caminho)
+        except OSError:
+            continue
+        entradas.append((info.st_mtime, info.st_size, caminho))
+    total = sum(tamanho for _, tamanho, _ in entradas)
+    for _, tamanho, caminho in sorted(entradas):
+        if total <= limite_bytes:
+            break
+        if caminho == manter:
+            continue
+        base = caminho[:-len(extensao)]
+        for alvo in (caminho,) + tuple(base + ext for ext in companheiros):
+            try:
+                os.remove(alvo)
+            except OSError:
+                pass
+        total -= tamanho
+
+
+class CacheDiscoBytes:
+    """
+    Guarda o conteúdo do .xlsx em '<diretorio>/<hash do etag>.xlsx' com um '.json' ao lado
+    (etag, sha256, tamanho, last_modified). O .json é gravado por último e serve de marcador
+    de entrada completa; na leitura o sha256 é conferido e entradas corrompidas são apagadas.
+    O mtime do .xlsx é atualizado a cada acesso e usado para o despejo LRU ao passar do limite.
+    """
+
+    ULTIMO = "ultimo.json"
+
+    def __init__(self, diretorio: str, limite_bytes: int):
+        self.diretorio = diretorio
+        self.limite_bytes = limite_bytes
+        self._lock = threading.Lock()
+        os.makedirs(diretorio, exist_ok=True)
+
+    def _caminhos(self, etag: str) -> Tuple[str, str]:
+        chave = hashlib.sha1(etag.encode("utf-8")).hexdigest()
+        base = os.path.join(self.diretorio, chave)
+        return base + ".xlsx", base + ".json"
+
+    def _remover(self, etag: str) -> None:
+        for caminho in self._caminhos(etag):
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+
+    def obter(self, etag: Optional[str]) -> Optional[Tuple[bytes, Optional[str]]]:
+        """Retorna (bytes, last_modified) do ETag, ou None se ausente/corrompido."""
+        if not etag:
+            return None
+        caminho_dados, caminho_meta = self._caminhos(etag)
+        try:
+            with open(caminho_meta, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(caminho_dados, "rb") as f:
+                dados = f.read()
+        except (OSError, ValueError):
+            return None
+        if (meta.get("etag") != etag or meta.get("tamanho") != len(dados)
+                or meta.get("sha256") != hashlib.sha256(dados).hexdigest()):
+            self._remover(etag)
+            return None
+        try:
+            os.utime(caminho_dados, None)  # marca uso recente (LRU)
+        except OSError:
+            pass
+        return dados, meta.get("last_modified")
+
+    def gravar(self, etag: Optional[str], dados: bytes, last_modified: Optional[str] = None) -> None:
+        if not etag or dados is None:
+            return
+        caminho_dados, caminho_meta = self._caminhos(etag)
+        meta = {
+            "etag": etag,
+            "sha256": hashlib.sha256(dados).hexdigest(),
+            "tamanho": len(dados),
+            "last_modified": last_modified,
+        }
+        with self._lock:
+            gravar_atomico(caminho_dados, dados)
+            gravar_atomico(caminho_meta, json.dumps(meta).encode("utf-8"))
+            gravar_atomico(os.path.join(self.diretorio, self.ULTIMO), json.dumps({"etag": etag}).encode("utf-8"))
+            self._despejar(manter=caminho_dados)
+
+    def ultimo(self) -> Optional[Tuple[str, bytes, Optional[str]]]:
+        """Última versão gravada: (etag, bytes, last_modified). Usada na partida a frio."""
+        try:
+            with open(os.path.join(self.diretorio, self.ULTIMO), "r", encoding="utf-8") as f:
+                etag = json.load(f).get("etag")
+        except (OSError, ValueError):
+            return None
+        achado = self.obter(etag)
+        if achado is None:
+            return None
+        return etag, achado[0], achado[1]
+
+    def _despejar(self, manter: str) -> None:
+        despejar_lru(self.diretorio, self.limite_bytes, ".xlsx", manter=manter, companheiros=(".json",))
@@ -0,0 +1,90 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+# =====================================================
+# Cache de leituras chaveado pela versão do workbook (ETag)
+# =====================================================
+
+Chave = Tuple[str, Tuple[str, ...], str, Hashable]  # (etag, abas, operação, parâmetros)
+
+
+def congelar(valor: Any) -> Hashable:
+    """Parâmetro como chave: listas/dicts/sets viram tuplas; DataFrame e afins são recusados."""
+    if isinstance(valor, (list, tuple)):
+        return tuple(congelar(v) for v in valor)
+    if isinstance(valor, dict):
+        return tuple(sorted((str(k), congelar(v)) for k, v in valor.items()))
+    if isinstance(valor, (set, frozenset)):
+        return frozenset(congelar(v) for v in valor)
+    if valor is None or isinstance(valor, (str, int, float, bool)):
+        return valor
+    raise TypeError(f"parâmetro de leitura cacheada deve ser simples, não {type(valor).__name__}")
+
+
+class CacheEtag:
+    """
+    Resultados de leituras da planilha chaveados por (ETag, abas, operação, parâmetros):
+    nada do conteúdo dos DataFrames é hasheado. Compartilhado por todas as sessões; uma
+    versão nova do arquivo (salvamento de qualquer sessão, observador) muda o ETag e as
+    entradas antigas deixam de ser usadas — ficam só as das últimas 'max_versoes' ETags.
+    Quem lê recebe o valor compartilhado: copie antes de alterar.
+    """
+
+    def __init__(self, max_versoes: int = 2, max_entradas: int = 256):
+        self.max_versoes = max_versoes
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[Chave, Any]" = OrderedDict()
+        self._versoes: "OrderedDict[str, None]" = OrderedDict()
+        self._por_operacao: Dict[str, Dict[str, int]] = {}
+        self.stats = {"acertos": 0, "faltas": 0, "sem_etag": 0, "descartadas": 0}
+
+    def _contar(self, operacao: str, tipo: str) -> None:
+        self.stats[tipo] += 1
+        op = self._por_operacao.setdefault(operacao, {"acertos": 0, "faltas": 0})
+        op[tipo] += 1
+
+    def obter(self, etag: str, abas: Tuple[str, ...], operacao: str, parametros: Hashable,
+              calcular: Callable[[], Any]) -> Any:
+        """Valor em cache para a chave ou calcular() (guardado sob o ETag informado)."""
+        if not etag:
+            with self._lock:
+                self.stats["sem_etag"] += 1
+            return calcular()
+        chave = (etag, abas, operacao, parametros)
+        with self._lock:
+            if chave in self._entradas:
+                self._entradas.move_to_end(chave)
+                self._contar(operacao, "acertos")
+                return self._entradas[chave]
+            self._contar(operacao, "faltas")
+        valor = calcular()
+        with self._lock:
+            self._versoes[etag] = None
+            self._versoes.move_to_end(etag)
+            while len(self._versoes) > self.max_versoes:
+                antiga, _ = self._versoes.popitem(last=False)
+                for k in [k for k in self._entradas if k[0] == antiga]:
+                    del self._entradas[k]
+                    self.stats["descartadas"] += 1
+            self._entradas[chave] = valor
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.stats["descartadas"] += 1
+        return valor
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+            self._versoes.clear()
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            dados = dict(self.stats)
+            total = dados["acertos"] + dados["faltas"]
+            dados["taxa_acerto"] = round(dados["acertos"] / total, 3) if total else 0.0
+            dados["entradas"] = len(self._entradas)
+            dados["versoes"] = list(self._versoes)
+            dados["por_operacao"] = {k: dict(v) for k, v in self._por_operacao.items()}
+        return dados
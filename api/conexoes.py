@@ -0,0 +1,128 @@
+import socket
+import threading
+import time
+from typing import Dict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from configuracoes.config import HTTP_POOL_MAXSIZE, HTTP_KEEPALIVE_OCIOSO
+
+# =====================================================
+# Contadores de conexões (novas x reutilizadas)
+# =====================================================
+
+_contadores_lock = threading.Lock()
+_contadores = {"requisicoes": 0, "conexoes_novas": 0}
+
+def _incrementar(chave: str) -> None:
+    with _contadores_lock:
+        _contadores[chave] += 1
+
+class _ConexaoHTTP(HTTPConnection):
+    def connect(self):
+        super().connect()
+        _incrementar("conexoes_novas")
+
+    def request(self, *args, **kwargs):
+        _incrementar("requisicoes")
+        return super().request(*args, **kwargs)
+
+class _ConexaoHTTPS(HTTPSConnection):
+    def connect(self):
+        super().connect()
+        _incrementar("conexoes_novas")
+
+    def request(self, *args, **kwargs):
+        _incrementar("requisicoes")
+        return super().request(*args, **kwargs)
+
+class _PoolHTTP(HTTPConnectionPool):
+    ConnectionCls = _ConexaoHTTP
+
+class _PoolHTTPS(HTTPSConnectionPool):
+    ConnectionCls = _ConexaoHTTPS
+
+# =====================================================
+# Pool de sessões keep-alive (uma por host)
+# =====================================================
+
+class _AdapterKeepAlive(HTTPAdapter):
+    """HTTPAdapter com SO_KEEPALIVE nos sockets e conexões instrumentadas."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = HTTPConnection.default_socket_options + [
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+        ]
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _PoolHTTP, "https": _PoolHTTPS}
+
+
+class PoolSessoes:
+    """
+    Mantém uma requests.Session por host, reutilizando conexões TLS entre chamadas
+    e entre sessões do Streamlit. Sessões ociosas por mais de 'keepalive_ocioso'
+    segundos são recicladas (o servidor provavelmente já fechou os sockets).
+    """
+
+    def __init__(self, pool_maxsize: int = HTTP_POOL_MAXSIZE, keepalive_ocioso: float = HTTP_KEEPALIVE_OCIOSO):
+        self.pool_maxsize = pool_maxsize
+        self.keepalive_ocioso = keepalive_ocioso
+        self._lock = threading.Lock()
+        self._sessoes: Dict[str, requests.Session] = {}
+        self._ultimo_uso: Dict[str, float] = {}
+
+    def _nova_sessao(self) -> requests.Session:
+        sessao = requests.Session()
+        adapter = _AdapterKeepAlive(pool_connections=1, pool_maxsize=self.pool_maxsize)
+        sessao.mount("https://", adapter)
+        sessao.mount("http://", adapter)
+        return sessao
+
+    def sessao(self, url: str) -> requests.Session:
+        host = urlsplit(url).netloc.lower()
+        agora = time.monotonic()
+        with self._lock:
+            ultimo = self._ultimo_uso.get(host)
+            if ultimo is not None and agora - ultimo > self.keepalive_ocioso:
+                antiga = self._sessoes.pop(host, None)
+                if antiga is not None:
+                    antiga.close()
+            sessao = self._sessoes.get(host)
+            if sessao is None:
+                sessao = self._nova_sessao()
+                self._sessoes[host] = sessao
+            self._ultimo_uso[host] = agora
+            return sessao
+
+    def hosts(self) -> int:
+        with self._lock:
+            return len(self._sessoes)
+
+    def fechar(self) -> None:
+        with self._lock:
+            for sessao in self._sessoes.values():
+                sessao.close()
+            self._sessoes.clear()
+            self._ultimo_uso.clear()
+
+
+_POOL = PoolSessoes()
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """Equivalente a requests.request, mas usando a sessão keep-alive do host."""
+    return _POOL.sessao(url).request(method, url, **kwargs)
+
+def estatisticas_conexoes() -> Dict[str, int]:
+    """
+    Contadores de reutilização do pool desde o início do processo:
+    {"requisicoes", "conexoes_novas", "conexoes_reutilizadas", "hosts"}
+    """
+    with _contadores_lock:
+        stats = dict(_contadores)
+    stats["conexoes_reutilizadas"] = max(stats["requisicoes"] - stats["conexoes_novas"], 0)
+    stats["hosts"] = _POOL.hosts()
+    return stats
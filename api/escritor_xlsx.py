@@ -0,0 +1,458 @@
+import io
+import math
+import re
+import struct
+import time
+import zipfile
+import zlib
+from datetime import date, datetime, time as dtime
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+import pandas as pd
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.utils import get_column_letter
+
+from api.leitor_xlsx import caminho_aba, data_1904, estilos_data
+
+# =====================================================
+# Escritor no nível do zip: troca SÓ o XML das abas salvas
+# =====================================================
+# Em vez de load_workbook + wb.save (que reserializa todas as abas), gera apenas o
+# <sheetData> das abas alteradas e copia os demais membros do zip byte a byte (dados já
+# comprimidos, sem descomprimir/recomprimir). O custo passa a ser proporcional às abas salvas.
+# O <sheetData> é serializado por coluna tipada (sem objetos de célula), em blocos de linhas
+# que vão direto para o compressor — memória constante por linha, mesmo no arquivo inteiro.
+# Quando a estrutura não é a esperada (zip64, estilos fora do padrão, nome de aba inválido)
+# retorna None e quem chamou usa o caminho openpyxl.
+
+_RE_ABRE_SHEETDATA = re.compile(rb"<(?P<p>(?:\w+:)?)sheetData\b[^>]*?(?P<vazio>/?)>")
+_RE_DIMENSAO = re.compile(rb"<((?:\w+:)?)dimension\b[^>]*?/>")
+_RE_NOME_INVALIDO = re.compile(r"[\\/*?:\[\]]")
+_FORMATO_DATA = "yyyy-mm-dd h:mm:ss"  # o mesmo que o openpyxl usa para datetime
+_CALC_CHAIN = "xl/calcChain.xml"
+_LIMITE_ZIP32 = 0xFFFFFFFF
+_LINHAS_POR_BLOCO = 5000
+
+_NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_TIPO_WORKSHEET = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+_XML_ABA_NOVA = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<worksheet xmlns="{_NS_MAIN}" xmlns:r="{_NS_REL}"><dimension ref="A1"/><sheetData/></worksheet>'
+).encode("utf-8")
+
+Partes = Union[bytes, Iterable[bytes]]
+
+
+# ---------- células ----------
+
+def _numero(x: float) -> str:
+    return str(int(x)) if float(x).is_integer() else repr(float(x))
+
+def _serial_data(v, base: datetime) -> float:
+    if isinstance(v, pd.Timestamp):
+        v = v.tz_localize(None).to_pydatetime() if v.tzinfo is not None else v.to_pydatetime()
+    elif isinstance(v, datetime):
+        v = v.replace(tzinfo=None)
+    elif isinstance(v, date):
+        v = datetime(v.year, v.month, v.day)
+    return (v - base).total_seconds() / 86400
+
+def _texto_celula(p: str, ref: str, v) -> str:
+    texto = ILLEGAL_CHARACTERS_RE.sub("", str(v))
+    espaco = ' xml:space="preserve"' if texto != texto.strip() else ""
+    return f'<{p}c r="{ref}" t="inlineStr"><{p}is><{p}t{espaco}>{escape(texto)}</{p}t></{p}is></{p}c>'
+
+def _celula(p: str, ref: str, v, estilo_data: int, base: datetime) -> str:
+    """XML de uma célula; '' para vazios (NaN/None/NaT não são gravados, como no openpyxl)."""
+    if v is None or v is pd.NaT:
+        return ""
+    if isinstance(v, str):
+        return _texto_celula(p, ref, v)
+    if isinstance(v, (bool, np.bool_)):
+        return f'<{p}c r="{ref}" t="b"><{p}v>{int(v)}</{p}v></{p}c>'
+    if isinstance(v, (int, np.integer)):
+        return f'<{p}c r="{ref}" t="n"><{p}v>{int(v)}</{p}v></{p}c>'
+    if isinstance(v, (float, np.floating)):
+        if not math.isfinite(v):
+            return ""
+        return f'<{p}c r="{ref}" t="n"><{p}v>{_numero(v)}</{p}v></{p}c>'
+    if isinstance(v, (datetime, date, np.datetime64)):
+        if isinstance(v, np.datetime64):
+            if np.isnat(v):
+                return ""
+            v = pd.Timestamp(v)
+        return f'<{p}c r="{ref}" s="{estilo_data}" t="n"><{p}v>{_numero(_serial_data(v, base))}</{p}v></{p}c>'
+    if isinstance(v, dtime):
+        fracao = (v.hour * 3600 + v.minute * 60 + v.second + v.microsecond / 1e6) / 86400
+        return f'<{p}c r="{ref}" s="{estilo_data}" t="n"><{p}v>{_numero(fracao)}</{p}v></{p}c>'
+    return _texto_celula(p, ref, v)
+
+def _numeros_texto(valores: np.ndarray) -> List[str]:
+    """float64 → texto como no openpyxl ('5' para inteiros, repr curto nos demais); '' para NaN/inf."""
+    textos = valores.astype(str).astype(object)
+    finitos = np.isfinite(valores)
+    inteiros = finitos & (np.abs(valores) < 1e15) & (valores == np.trunc(valores))
+    textos[inteiros] = valores[inteiros].astype(np.int64).astype(str)
+    textos[~finitos] = ""
+    return textos.tolist()
+
+def _fragmentos_coluna(p: str, serie: pd.Series, letra: str, linhas: List[str],
+                       estilo_data: int, base: datetime) -> List[str]:
+    """
+    XML das células de uma coluna, decidido pelo dtype uma vez por coluna (não por célula).
+    'linhas' são os números das linhas já em texto; vazios viram ''.
+    """
+    dtype = serie.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        serie = serie.astype(object)
+        dtype = serie.dtype
+    abre, fecha = f'<{p}c r="{letra}', f"</{p}v></{p}c>"
+
+    if pd.api.types.is_bool_dtype(dtype) and not isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        return [f'{abre}{n}" t="b"><{p}v>{int(v)}{fecha}' for n, v in zip(linhas, serie.to_numpy())]
+    if pd.api.types.is_integer_dtype(dtype) and not isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        return [f'{abre}{n}" t="n"><{p}v>{v}{fecha}' for n, v in zip(linhas, serie.to_numpy().tolist())]
+    if pd.api.types.is_float_dtype(dtype) and not isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        textos = _numeros_texto(serie.to_numpy(dtype="float64"))
+        return [f'{abre}{n}" t="n"><{p}v>{v}{fecha}' if v else "" for n, v in zip(linhas, textos)]
+    if pd.api.types.is_datetime64_dtype(dtype):
+        valores = serie.to_numpy(dtype="datetime64[us]")
+        nat = np.isnat(valores)
+        seriais = (valores - np.datetime64(base, "us")).astype("float64") / 86_400_000_000
+        seriais[nat] = np.nan
+        textos = _numeros_texto(seriais)
+        return [f'{abre}{n}" s="{estilo_data}" t="n"><{p}v>{v}{fecha}' if v else ""
+                for n, v in zip(linhas, textos)]
+
+    # object (strings, misturas) e extension dtypes: por célula, com atalho para texto
+    fragmentos = []
+    for n, v in zip(linhas, serie.tolist()):
+        if isinstance(v, str):
+            fragmentos.append(_texto_celula(p, letra + n, v))
+        elif v is None or (isinstance(v, float) and v != v) or v is pd.NA:
+            fragmentos.append("")
+        else:
+            fragmentos.append(_celula(p, letra + n, v, estilo_data, base))
+    return fragmentos
+
+def _linhas_sheet_data(df: pd.DataFrame, p: str, estilo_data: int, base: datetime,
+                       linhas_por_bloco: int = _LINHAS_POR_BLOCO) -> Iterator[bytes]:
+    """Gera o <sheetData> em blocos de bytes: cabeçalho + 'linhas_por_bloco' linhas por vez."""
+    letras = [get_column_letter(i + 1) for i in range(len(df.columns))]
+    cabecalho = "".join(_celula(p, f"{letra}1", v, estilo_data, base) for letra, v in zip(letras, df.columns))
+    yield f'<{p}sheetData><{p}row r="1">{cabecalho}</{p}row>'.encode("utf-8")
+    for ini in range(0, len(df), linhas_por_bloco):
+        bloco = df.iloc[ini:ini + linhas_por_bloco]
+        linhas = [str(n) for n in range(ini + 2, ini + 2 + len(bloco))]
+        colunas = [_fragmentos_coluna(p, bloco.iloc[:, i], letras[i], linhas, estilo_data, base)
+                   for i in range(len(letras))]
+        abre_linha = f'<{p}row r="'
+        fecha_linha = f"</{p}row>"
+        yield "".join(
+            f'{abre_linha}{n}">{"".join(celulas)}{fecha_linha}' for n, celulas in zip(linhas, zip(*colunas))
+        ).encode("utf-8")
+    yield f"</{p}sheetData>".encode("utf-8")
+
+def _tem_datas(df: pd.DataFrame) -> bool:
+    if any(isinstance(c, (datetime, date, dtime)) for c in df.columns):
+        return True
+    for i in range(df.shape[1]):
+        serie = df.iloc[:, i]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            return True
+        if serie.dtype == object and serie.map(lambda v: isinstance(v, (datetime, date, dtime))).any():
+            return True
+    return False
+
+def _xml_aba(xml: bytes, df: pd.DataFrame, estilo_data: int, base: datetime) -> Optional[Iterator[bytes]]:
+    """Partes do XML da aba com o <sheetData> regerado; o restante (cols, merges, margens...) é mantido."""
+    achado = _RE_ABRE_SHEETDATA.search(xml)
+    if achado is None:
+        return None
+    p = achado.group("p")
+    if achado.group("vazio"):
+        fim = achado.end()
+    else:
+        fecha = b"</" + p + b"sheetData>"
+        j = xml.rfind(fecha)
+        if j < 0:
+            return None
+        fim = j + len(fecha)
+    n_colunas = len(df.columns)
+    ref = f"A1:{get_column_letter(n_colunas)}{len(df) + 1}" if n_colunas else "A1"
+    antes = _RE_DIMENSAO.sub(lambda m: b"<" + m.group(1) + f'dimension ref="{ref}"/>'.encode(), xml[:achado.start()], count=1)
+    depois = xml[fim:]
+
+    def _partes():
+        yield antes
+        yield from _linhas_sheet_data(df, p.decode("utf-8"), estilo_data, base)
+        yield depois
+    return _partes()
+
+
+# ---------- estilos ----------
+
+def _garantir_estilo_data(styles: str, xfs_data: List[bool]) -> Optional[Tuple[str, int]]:
+    """Índice de um cellXfs de data; acrescenta um (yyyy-mm-dd h:mm:ss) se não existir."""
+    for i, eh_data in enumerate(xfs_data):
+        if eh_data:
+            return styles, i
+    if "<styleSheet" not in styles or "</cellXfs>" not in styles:
+        return None
+    ids = [int(x) for x in re.findall(r'<numFmt\b[^>]*\bnumFmtId="(\d+)"', styles)]
+    novo_id = max(ids + [163]) + 1
+    num_fmt = f'<numFmt numFmtId="{novo_id}" formatCode="{_FORMATO_DATA}"/>'
+    styles = re.sub(r"<numFmts\b[^>]*/>", '<numFmts count="0"></numFmts>', styles, count=1)
+    if "</numFmts>" in styles:
+        styles = styles.replace("</numFmts>", num_fmt + "</numFmts>", 1)
+        styles = re.sub(r'(<numFmts\b[^>]*\bcount=")(\d+)"',
+                        lambda m: f'{m.group(1)}{int(m.group(2)) + 1}"', styles, count=1)
+    else:
+        styles = re.sub(r"(<styleSheet\b[^>]*>)", lambda m: m.group(1) + f'<numFmts count="1">{num_fmt}</numFmts>',
+                        styles, count=1)
+    xf = f'<xf numFmtId="{novo_id}" fontId="0" fillId="0" borderId="0" applyNumberFormat="1" xfId="0"/>'
+    styles = styles.replace("</cellXfs>", xf + "</cellXfs>", 1)
+    styles = re.sub(r'(<cellXfs\b[^>]*\bcount=")(\d+)"', lambda m: f'{m.group(1)}{len(xfs_data) + 1}"', styles, count=1)
+    return styles, len(xfs_data)
+
+
+# ---------- zip ----------
+
+def _dos(date_time) -> Tuple[int, int]:
+    a, m, d, h, mi, s = date_time
+    return h << 11 | mi << 5 | (s // 2), (a - 1980) << 9 | m << 5 | d
+
+def _bruto(content: bytes, info: zipfile.ZipInfo) -> memoryview:
+    """Cabeçalho local + dados comprimidos (+ data descriptor) do membro, sem descomprimir."""
+    ini = info.header_offset
+    cab = content[ini:ini + zipfile.sizeFileHeader]
+    if cab[:4] != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile(f"cabeçalho local inválido em {info.filename}")
+    n_nome, n_extra = struct.unpack("<HH", cab[26:30])
+    fim = ini + zipfile.sizeFileHeader + n_nome + n_extra + info.compress_size
+    if info.flag_bits & 0x08:
+        fim += 16 if content[fim:fim + 4] == b"PK\x07\x08" else 12
+    return memoryview(content)[ini:fim]
+
+def _registro_central(info: zipfile.ZipInfo, offset: int) -> bytes:
+    nome = info.orig_filename.encode("utf-8" if info.flag_bits & 0x800 else "cp437")
+    hora, data = _dos(info.date_time)
+    cab = struct.pack(
+        zipfile.structCentralDir, zipfile.stringCentralDir,
+        info.create_version, info.create_system, info.extract_version, info.reserved,
+        info.flag_bits, info.compress_type, hora, data, info.CRC, info.compress_size,
+        info.file_size, len(nome), len(info.extra), len(info.comment), 0,
+        info.internal_attr, info.external_attr, offset,
+    )
+    return cab + nome + info.extra + info.comment
+
+def _info_nova(nome: str) -> zipfile.ZipInfo:
+    info = zipfile.ZipInfo(nome, date_time=time.localtime()[:6])
+    info.external_attr = 0o600 << 16
+    return info
+
+def _membro_novo(base: zipfile.ZipInfo, partes: Partes) -> Tuple[List[bytes], zipfile.ZipInfo]:
+    """
+    Comprime (deflate) as partes à medida que chegam e monta o cabeçalho local, mantendo
+    nome/atributos do membro original. Só os dados comprimidos ficam em memória.
+    """
+    if isinstance(partes, bytes):
+        partes = (partes,)
+    comp = zlib.compressobj(6, zlib.DEFLATED, -15)
+    comprimido: List[bytes] = []
+    crc = tamanho = 0
+    for parte in partes:
+        crc = zlib.crc32(parte, crc)
+        tamanho += len(parte)
+        comprimido.append(comp.compress(parte))
+    comprimido.append(comp.flush())
+
+    info = zipfile.ZipInfo(base.orig_filename, date_time=base.date_time)
+    info.orig_filename = base.orig_filename
+    info.create_version, info.create_system = base.create_version, base.create_system
+    info.extract_version = max(base.extract_version, 20)
+    info.internal_attr, info.external_attr = base.internal_attr, base.external_attr
+    info.flag_bits = base.flag_bits & 0x800  # sem data descriptor: tamanhos vão no cabeçalho
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.CRC = crc
+    info.compress_size, info.file_size = sum(len(c) for c in comprimido), tamanho
+    info.extra, info.comment = b"", base.comment
+    if info.compress_size >= _LIMITE_ZIP32 or tamanho >= _LIMITE_ZIP32:
+        raise zipfile.LargeZipFile(info.filename)
+    nome = info.orig_filename.encode("utf-8" if info.flag_bits & 0x800 else "cp437")
+    hora, data = _dos(info.date_time)
+    cab = struct.pack(
+        zipfile.structFileHeader, zipfile.stringFileHeader,
+        info.extract_version, 0, info.flag_bits, info.compress_type, hora, data,
+        info.CRC, info.compress_size, info.file_size, len(nome), 0,
+    )
+    return [cab + nome] + comprimido, info
+
+def reescrever_zip(content: bytes, substituir: Dict[str, Partes], remover: Set[str] = frozenset(),
+                   acrescentar: Optional[Dict[str, Partes]] = None) -> bytes:
+    """
+    Novo zip com os membros de 'substituir' trocados, os de 'remover' omitidos e os de
+    'acrescentar' no final; todos os outros são copiados byte a byte (cabeçalho local +
+    dados comprimidos), na ordem original. O conteúdo novo pode vir em partes (iterável de bytes).
+    """
+    acrescentar = acrescentar or {}
+    with zipfile.ZipFile(io.BytesIO(content)) as zf:
+        infos = zf.infolist()
+        comentario = zf.comment
+        if len(content) >= _LIMITE_ZIP32 or len(infos) + len(acrescentar) >= 0xFFFF:
+            return _reescrever_zip_recomprimindo(zf, substituir, remover, acrescentar)
+
+    out = io.BytesIO()
+    centrais = []
+    membros = [(info, substituir.get(info.filename)) for info in infos if info.filename not in remover]
+    membros += [(_info_nova(nome), partes) for nome, partes in acrescentar.items()]
+    for info, partes in membros:
+        offset = out.tell()
+        if partes is None:
+            out.write(_bruto(content, info))
+            centrais.append(_registro_central(info, offset))
+        else:
+            local, info_nova = _membro_novo(info, partes)
+            for pedaco in local:
+                out.write(pedaco)
+            centrais.append(_registro_central(info_nova, offset))
+    inicio_central = out.tell()
+    if inicio_central >= _LIMITE_ZIP32:
+        raise zipfile.LargeZipFile("arquivo resultante excede 4 GiB")
+    for registro in centrais:
+        out.write(registro)
+    out.write(struct.pack(
+        zipfile.structEndArchive, zipfile.stringEndArchive, 0, 0,
+        len(centrais), len(centrais), out.tell() - inicio_central, inicio_central, len(comentario),
+    ))
+    out.write(comentario)
+    return out.getvalue()
+
+def _reescrever_zip_recomprimindo(zf: zipfile.ZipFile, substituir: Dict[str, Partes], remover: Set[str],
+                                  acrescentar: Dict[str, Partes]) -> bytes:
+    """Caminho para zip64 (arquivos enormes): conteúdo idêntico, mas recomprime tudo."""
+    def _juntar(partes: Partes) -> bytes:
+        return partes if isinstance(partes, bytes) else b"".join(partes)
+
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as novo:
+        for info in zf.infolist():
+            if info.filename in remover:
+                continue
+            partes = substituir.get(info.filename)
+            novo.writestr(info, zf.read(info) if partes is None else _juntar(partes))
+        for nome, partes in acrescentar.items():
+            novo.writestr(nome, _juntar(partes))
+    return out.getvalue()
+
+
+# ---------- partes do pacote (workbook, rels, content types) ----------
+
+class _Pacote:
+    """Textos das partes de estrutura do pacote, alterados em memória e gravados no fim."""
+
+    def __init__(self, zf: zipfile.ZipFile):
+        self._zf = zf
+        self.nomes = set(zf.namelist())
+        self.textos: Dict[str, str] = {}
+
+    def texto(self, nome: str) -> str:
+        if nome not in self.textos:
+            self.textos[nome] = self._zf.read(nome).decode("utf-8")
+        return self.textos[nome]
+
+    def sem_calc_chain(self) -> Set[str]:
+        """
+        O calcChain lista células com fórmula; após regravar uma aba ele pode apontar para
+        células que não existem mais (o Excel "repara" o arquivo). Removemos a parte e suas
+        referências — o Excel o recria no próximo cálculo.
+        """
+        if _CALC_CHAIN not in self.nomes:
+            return set()
+        self.textos["[Content_Types].xml"] = re.sub(
+            r'<Override\b[^>]*PartName="/xl/calcChain\.xml"[^>]*/>', "", self.texto("[Content_Types].xml"))
+        self.textos["xl/_rels/workbook.xml.rels"] = re.sub(
+            r'<Relationship\b[^>]*Target="/?(?:xl/)?calcChain\.xml"[^>]*/>', "", self.texto("xl/_rels/workbook.xml.rels"))
+        return {_CALC_CHAIN}
+
+    def nova_aba(self, nome_aba: str) -> Optional[str]:
+        """Registra uma aba nova (workbook.xml, rels, content types); retorna o caminho da parte."""
+        workbook = self.texto("xl/workbook.xml")
+        rels = self.texto("xl/_rels/workbook.xml.rels")
+        tipos = self.texto("[Content_Types].xml")
+        fecha_sheets = re.search(r"</((?:\w+:)?)sheets>", workbook)
+        prefixo_r = re.search(r"<(?:\w+:)?sheet\b[^>]*\s(\w+):id=", workbook)
+        if fecha_sheets is None or prefixo_r is None or "</Relationships>" not in rels or "</Types>" not in tipos:
+            return None
+
+        n = 1
+        while f"xl/worksheets/sheet{n}.xml" in self.nomes:
+            n += 1
+        caminho = f"xl/worksheets/sheet{n}.xml"
+        ids_rel = set(re.findall(r'\bId="([^"]+)"', rels))
+        k = len(ids_rel) + 1
+        while f"rId{k}" in ids_rel:
+            k += 1
+        rid = f"rId{k}"
+        sheet_id = max([int(x) for x in re.findall(r'<(?:\w+:)?sheet\b[^>]*\bsheetId="(\d+)"', workbook)] + [0]) + 1
+
+        p = fecha_sheets.group(1)
+        sheet = f'<{p}sheet name={quoteattr(nome_aba)} sheetId="{sheet_id}" {prefixo_r.group(1)}:id="{rid}"/>'
+        self.textos["xl/workbook.xml"] = workbook[:fecha_sheets.start()] + sheet + workbook[fecha_sheets.start():]
+        self.textos["xl/_rels/workbook.xml.rels"] = rels.replace(
+            "</Relationships>",
+            f'<Relationship Id="{rid}" Type="{_NS_REL}/worksheet" Target="worksheets/sheet{n}.xml"/></Relationships>', 1)
+        self.textos["[Content_Types].xml"] = tipos.replace(
+            "</Types>", f'<Override PartName="/{caminho}" ContentType="{_TIPO_WORKSHEET}"/></Types>', 1)
+        self.nomes.add(caminho)
+        return caminho
+
+
+# ---------- API ----------
+
+def substituir_abas_xlsx(content: bytes, abas: Dict[str, pd.DataFrame]) -> Optional[bytes]:
+    """
+    Retorna os bytes do .xlsx com cada aba de 'abas' regravada a partir do DataFrame
+    (cabeçalho + linhas, sem índice); abas inexistentes são criadas no fim, na ordem dada.
+    Só o XML dessas abas (e, se preciso, styles/workbook/rels/content types) muda.
+    None se o arquivo ou algum nome de aba fugir do formato suportado.
+    """
+    with zipfile.ZipFile(io.BytesIO(content)) as zf:
+        pacote = _Pacote(zf)
+        estilo_data = 0
+        if any(_tem_datas(df) for df in abas.values()):
+            if "xl/styles.xml" not in pacote.nomes:
+                return None
+            garantido = _garantir_estilo_data(pacote.texto("xl/styles.xml"), estilos_data(zf))
+            if garantido is None:
+                return None
+            pacote.textos["xl/styles.xml"], estilo_data = garantido
+        base = datetime(1904, 1, 1) if data_1904(zf) else datetime(1899, 12, 30)
+
+        substituir: Dict[str, Partes] = {}
+        acrescentar: Dict[str, Partes] = {}
+        for nome_aba, df in abas.items():
+            caminho = caminho_aba(zf, nome_aba)
+            if caminho is not None and caminho in pacote.nomes:
+                partes = _xml_aba(zf.read(caminho), df, estilo_data, base)
+                destino = substituir
+            else:
+                if len(nome_aba) > 31 or not nome_aba or _RE_NOME_INVALIDO.search(nome_aba):
+                    return None
+                caminho = pacote.nova_aba(nome_aba)
+                if caminho is None:
+                    return None
+                partes = _xml_aba(_XML_ABA_NOVA, df, estilo_data, base)
+                destino = acrescentar
+            if partes is None:
+                return None
+            destino[caminho] = partes
+
+        remover = pacote.sem_calc_chain()
+        for nome, texto in pacote.textos.items():
+            substituir[nome] = texto.encode("utf-8")
+
+    return reescrever_zip(content, substituir, remover, acrescentar)
@@ -0,0 +1,82 @@
+import warnings
+from datetime import date, datetime
+from types import MappingProxyType
+from typing import Any, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import pandas as pd
+
+# =====================================================
+# Esquema da "Base de Dados": colunas de ID e de mês (um por ETag, somente leitura)
+# =====================================================
+
+MESES_PT = ("Jan", "Fev", "Mar", "Abr", "Mai", "Jun", "Jul", "Ago", "Set", "Out", "Nov", "Dez")
+
+
+def data_da_coluna(coluna: Any) -> Optional[pd.Timestamp]:
+    """Data representada pelo cabeçalho (datetime da planilha ou texto de data); None se não for mês."""
+    if isinstance(coluna, (datetime, date)):
+        return pd.Timestamp(coluna)
+    texto = str(coluna)
+    if texto.startswith("Unnamed"):
+        return None
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # "could not infer format" para cabeçalhos de texto
+        # "2026-02-01" (ISO, ex.: str() de um datetime) é ano-mês-dia; o resto segue dia/mês
+        data = pd.to_datetime(texto, errors="coerce", dayfirst=not texto[:4].isdigit())
+    return None if pd.isna(data) else data
+
+def rotulo_mes(data: pd.Timestamp) -> str:
+    """'Jan/26'."""
+    return f"{MESES_PT[data.month - 1]}/{str(data.year)[2:]}"
+
+
+class EsquemaPlanilha:
+    """
+    Colunas de ID presentes (na ordem de COLUNAS_ID) e colunas de mês em ordem de calendário,
+    com a data e o rótulo de exibição ('Jan/26') de cada uma, calculados uma única vez.
+    Imutável: pode ser compartilhado entre sessões/threads sem lock.
+    """
+    __slots__ = ("colunas_id", "meses", "datas", "_datas", "_rotulos")
+
+    def __init__(self, colunas: Iterable[Any], colunas_id: Sequence[str]):
+        colunas = list(colunas)
+        pares: List[Tuple[Any, pd.Timestamp]] = []
+        for c in colunas:
+            if c in colunas_id:
+                continue
+            data = data_da_coluna(c)
+            if data is not None:
+                pares.append((c, data))
+        pares.sort(key=lambda p: p[1])
+        definir = super().__setattr__
+        definir("colunas_id", tuple(c for c in colunas_id if c in colunas))
+        definir("meses", tuple(c for c, _ in pares))
+        definir("datas", tuple(d for _, d in pares))
+        definir("_datas", MappingProxyType(dict(pares)))
+        definir("_rotulos", MappingProxyType({c: rotulo_mes(d) for c, d in pares}))
+
+    def __setattr__(self, nome: str, valor: Any) -> None:
+        raise AttributeError("EsquemaPlanilha é somente leitura")
+
+    @property
+    def rotulos(self) -> Mapping[Any, str]:
+        return self._rotulos
+
+    def eh_mes(self, coluna: Any) -> bool:
+        return coluna in self._datas
+
+    def data(self, coluna: Any) -> Optional[pd.Timestamp]:
+        """Data da coluna de mês (também aceita cabeçalhos fora do esquema, ex.: str(coluna))."""
+        return self._datas[coluna] if coluna in self._datas else data_da_coluna(coluna)
+
+    def rotulo(self, coluna: Any) -> str:
+        """Rótulo 'Jan/26' da coluna; str(coluna) se não for data."""
+        if coluna in self._rotulos:
+            return self._rotulos[coluna]
+        data = data_da_coluna(coluna)
+        return rotulo_mes(data) if data is not None else str(coluna)
+
+    def meses_em(self, df: pd.DataFrame) -> List[Any]:
+        """Colunas de mês do esquema presentes em 'df', em ordem de calendário."""
+        presentes = set(df.columns)
+        return [c for c in self.meses if c in presentes]
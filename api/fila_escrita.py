@@ -0,0 +1,129 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+# =====================================================
+# Fila de escrita do processo: um único gravador, alterações pendentes agrupadas
+# =====================================================
+
+Abas = Dict[str, List[Any]]  # aba -> alterações na ordem de chegada (DataFrame ou função da aba atual)
+
+
+def compor(alteracoes: List[Any]) -> Any:
+    """Uma alteração equivalente a aplicar 'alteracoes' em ordem (DataFrame substitui a aba)."""
+    if len(alteracoes) == 1:
+        return alteracoes[0]
+
+    def _aplicar(atual):
+        for alteracao in alteracoes:
+            atual = alteracao(atual) if callable(alteracao) else alteracao
+        return atual
+    return _aplicar
+
+
+class PedidoEscrita:
+    """Um salvamento enviado à fila; quem enviou espera com aguardar() e confere 'erro'."""
+
+    def __init__(self, abas: Abas):
+        self.abas = abas
+        self.erro: Optional[BaseException] = None
+        self.resultado: Any = None      # o que 'gravar' retornou para o upload que incluiu o pedido
+        self.avisos: List[tuple] = []   # argumentos de ao_esperar repassados pelo gravador
+        self.agrupados = 0              # quantos pedidos foram no mesmo upload
+        self._concluido = threading.Event()
+
+    def aguardar(self, timeout: Optional[float] = None) -> bool:
+        return self._concluido.wait(timeout)
+
+    def _concluir(self, erro: Optional[BaseException], agrupados: int, resultado: Any = None) -> None:
+        self.erro = erro
+        self.resultado = resultado
+        self.agrupados = agrupados
+        self._concluido.set()
+
+
+class FilaEscrita:
+    """
+    Serializa os salvamentos de todas as sessões numa única thread gravadora. Pedidos que
+    chegam enquanto um upload está em andamento (ou dentro de 'janela_s' do primeiro) são
+    juntados: as alterações de cada aba são compostas na ordem de chegada e vão num único
+    'gravar(abas, ao_esperar)'. Em vez de dez PUTs disputando o bloqueio (423) do arquivo,
+    um ou dois.
+    Se o upload conjunto falhar por erro de um dos pedidos (ex.: exceção no merge), cada
+    pedido é regravado sozinho para que só o culpado receba o erro; erros de
+    'erros_compartilhados' (rede, 423/429 esgotados, disjuntor) valem para todos.
+    """
+
+    def __init__(self, gravar: Callable[[Abas, Callable], Any], janela_s: float = 0.05,
+                 erros_compartilhados: Tuple[Type[BaseException], ...] = ()):
+        self._gravar = gravar
+        self.janela_s = janela_s
+        self.erros_compartilhados = erros_compartilhados
+        self._cond = threading.Condition()
+        self._pendentes: List[PedidoEscrita] = []
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"pedidos": 0, "uploads": 0, "agrupados": 0, "maior_grupo": 0, "falhas": 0, "isolados": 0}
+
+    def enviar(self, abas: Abas) -> PedidoEscrita:
+        pedido = PedidoEscrita(abas)
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="fila-escrita", daemon=True)
+                self._thread.start()
+            self._pendentes.append(pedido)
+            self.stats["pedidos"] += 1
+            self._cond.notify()
+        return pedido
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pendentes:
+                    self._cond.wait()
+            if self.janela_s > 0:
+                time.sleep(self.janela_s)  # pedidos simultâneos entram no mesmo upload
+            with self._cond:
+                grupo, self._pendentes = self._pendentes, []
+            self._processar(grupo)
+
+    def _executar(self, grupo: List[PedidoEscrita]) -> Any:
+        abas: Abas = {}
+        for pedido in grupo:
+            for aba, alteracoes in pedido.abas.items():
+                abas.setdefault(aba, []).extend(alteracoes)
+
+        def _ao_esperar(*args) -> None:
+            for pedido in grupo:
+                pedido.avisos.append(args)
+
+        with self._cond:
+            self.stats["uploads"] += 1
+        return self._gravar(abas, _ao_esperar)
+
+    def _processar(self, grupo: List[PedidoEscrita]) -> None:
+        with self._cond:
+            self.stats["agrupados"] += len(grupo) - 1
+            self.stats["maior_grupo"] = max(self.stats["maior_grupo"], len(grupo))
+        try:
+            resultado = self._executar(grupo)
+        except BaseException as e:
+            if len(grupo) == 1 or isinstance(e, self.erros_compartilhados):
+                with self._cond:
+                    self.stats["falhas"] += len(grupo)
+                for pedido in grupo:
+                    pedido._concluir(e, len(grupo))
+                return
+            # falha de um dos pedidos: regrava um a um para não derrubar os outros
+            with self._cond:
+                self.stats["isolados"] += len(grupo)
+            for pedido in grupo:
+                self._processar([pedido])
+            return
+        for pedido in grupo:
+            pedido._concluir(None, len(grupo), resultado)
+
+    def estatisticas(self) -> dict:
+        with self._cond:
+            dados = dict(self.stats)
+            dados["na_fila"] = len(self._pendentes)
+        return dados
@@ -0,0 +1,99 @@
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+# =====================================================
+# Token de acesso compartilhado: validade real + renovação antecipada
+# =====================================================
+
+class GerenciadorToken:
+    """
+    Guarda o token do processo e sua expiração real ('expires_in' da resposta).
+    - Em regime normal, obter() só lê o token em memória (não bloqueia).
+    - Uma thread de fundo renova 'margem_s' segundos antes de expirar; se falhar,
+      tenta de novo em 'espera_falha_s' enquanto o token atual ainda vale.
+    - Se o token já expirou (ou não existe), a busca é single-flight: só uma
+      requisição sai; as demais chamadas esperam e reaproveitam o resultado.
+    'buscar' retorna (access_token, expires_in em segundos).
+    """
+
+    def __init__(self, buscar: Callable[[], Tuple[str, float]], margem_s: float = 300.0,
+                 espera_falha_s: float = 30.0):
+        self._buscar = buscar
+        self.margem_s = margem_s
+        self.espera_falha_s = espera_falha_s
+        self._lock = threading.Lock()        # protege estado e estatísticas
+        self._lock_busca = threading.Lock()  # single-flight da requisição ao endpoint de token
+        self._token: Optional[str] = None
+        self._expira_em = 0.0
+        self._timer: Optional[threading.Timer] = None
+        self.stats = {"buscas": 0, "renovacoes_fundo": 0, "falhas": 0, "esperas": 0, "acertos": 0,
+                      "invalidacoes": 0}
+
+    def _valido(self, folga: float = 0.0) -> bool:
+        return self._token is not None and time.time() + folga < self._expira_em
+
+    def obter(self) -> str:
+        with self._lock:
+            if self._valido():
+                self.stats["acertos"] += 1
+                return self._token
+            self.stats["esperas"] += 1
+        return self._renovar(forcar=False)
+
+    def invalidar(self, token: Optional[str] = None) -> None:
+        """
+        Descarta o token atual (ex.: 401 do Graph); a próxima chamada busca outro. Com 'token',
+        só descarta se ele ainda for o atual (vários 401 do mesmo token = uma única busca).
+        """
+        with self._lock:
+            if token is not None and token != self._token:
+                return
+            self._token = None
+            self._expira_em = 0.0
+            self.stats["invalidacoes"] += 1
+
+    def _renovar(self, forcar: bool) -> str:
+        with self._lock_busca:
+            with self._lock:
+                # outra thread pode ter renovado enquanto esperávamos o lock
+                if self._valido(self.margem_s if forcar else 0.0):
+                    return self._token
+            try:
+                token, expires_in = self._buscar()
+            except Exception:
+                with self._lock:
+                    self.stats["falhas"] += 1
+                    ainda_vale = self._valido()
+                if ainda_vale:
+                    self._agendar(self.espera_falha_s)
+                raise
+            with self._lock:
+                self.stats["buscas"] += 1
+                self._token = token
+                self._expira_em = time.time() + float(expires_in)
+            # margem maior que a validade (tokens curtos): renova na metade da vida
+            self._agendar(max(float(expires_in) - self.margem_s, float(expires_in) / 2))
+            return token
+
+    def _agendar(self, atraso: float) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(atraso, self._renovar_fundo)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _renovar_fundo(self) -> None:
+        try:
+            self._renovar(forcar=True)
+            with self._lock:
+                self.stats["renovacoes_fundo"] += 1
+        except Exception:
+            pass  # já reagendado em _renovar enquanto o token atual valer
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            dados = dict(self.stats)
+            dados["expira_em_s"] = max(self._expira_em - time.time(), 0.0) if self._token else 0.0
+        return dados
@@ -1,21 +1,58 @@
+import functools
+import inspect
 import io
+import itertools
+import os
 import time
-import random
-from typing import Dict, Optional, List, Tuple
+import threading
+from typing import Any, Callable, Dict, Optional, List, Tuple, Union
 
 import requests
 import pandas as pd
 import streamlit as st
-from openpyxl import load_workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
 import urllib.parse
 
+from api.conexoes import request as _request_pool
+from api.cache_disco import CacheDiscoBytes
+from api.cache_colunar import CacheColunar
+from api.planilha_parseada import PlanilhaParseada, RegistroPlanilhas
+from api.gerenciador_token import GerenciadorToken
+from api.voo_unico import VooUnico
+from api.observador_etag import ObservadorEtag
+from api.resolvedor_ids import ResolvedorIds, Ids
+from api.lote_graph import executar_lote, RespostaLote
+from api.politica_retry import PoliticaRetry, CircuitoAberto, STATUS_SOBRECARGA, status_http
+from api.limitador_taxa import LimitadorTaxa, prioridade, PRIORIDADE_SALVAR, PRIORIDADE_FUNDO
+from api.armazenamento import ArmazenamentoPlanilha, ArmazenamentoLocal, VersaoAlterada, Lido
+from api.cache_etag import CacheEtag, congelar
+from configuracoes.config import (
+    DOWNLOAD_CONDICIONAL,
+    CACHE_DISCO_DIR, CACHE_DISCO_LIMITE_MB,
+    CACHE_COLUNAR_DIR, CACHE_COLUNAR_LIMITE_MB,
+    SALVAR_POR_ZIP,
+    TOKEN_MARGEM_RENOVACAO,
+    ETAG_POLL_SEGUNDOS, ETAG_MAX_DEFASAGEM, ETAG_PREAQUECER_ABAS,
+    GRAPH_IDS_ARQUIVO, GRAPH_LOTE,
+    RETRY_LIMIAR_DISJUNTOR, RETRY_JANELA_DISJUNTOR, RETRY_ORCAMENTO_RAZAO, RETRY_ORCAMENTO_MAX,
+    GRAPH_TAXA_LEITURA, GRAPH_RAJADA_LEITURA, GRAPH_TAXA_ESCRITA, GRAPH_RAJADA_ESCRITA,
+    SALVAR_MAX_REBASES,
+    ARMAZENAMENTO, ARMAZENAMENTO_LOCAL_DIR,
+)
+
 # =====================================================
 # CONFIGURAÇÕES DO AZURE (Secrets do Streamlit)
 # =====================================================
-CLIENT_ID = st.secrets["AZURE_CLIENT_ID"]
-CLIENT_SECRET = st.secrets["AZURE_CLIENT_SECRET"]
-TENANT_ID = st.secrets["AZURE_TENANT_ID"]
+
+def _segredo(nome: str) -> str:
+    """Lê dos Secrets do Streamlit; sem secrets.toml (ex.: servidor falso local), usa variável de ambiente."""
+    try:
+        return st.secrets[nome]
+    except (KeyError, FileNotFoundError):
+        return os.getenv(nome, "")
+
+CLIENT_ID = _segredo("AZURE_CLIENT_ID")
+CLIENT_SECRET = _segredo("AZURE_CLIENT_SECRET")
+TENANT_ID = _segredo("AZURE_TENANT_ID")
 
 # =====================================================
 # CONFIGURAÇÕES DO SHAREPOINT
@@ -28,9 +65,10 @@ ARQUIVO = "Teste_Refinado - Preenchimento dos gerentes.xlsx"
 # =====================================================
 # ENDPOINTS DO GRAPH API
 # =====================================================
-AUTHORITY = f"https://login.microsoftonline.com/{TENANT_ID}/oauth2/v2.0/token"
+# GRAPH_AUTHORITY / GRAPH_ROOT podem apontar para o servidor falso (api/servidor_graph_falso.py)
+AUTHORITY = os.getenv("GRAPH_AUTHORITY", f"https://login.microsoftonline.com/{TENANT_ID}/oauth2/v2.0/token")
 RESOURCE = "https://graph.microsoft.com/.default"
-GRAPH_ROOT = "https://graph.microsoft.com/v1.0"
+GRAPH_ROOT = os.getenv("GRAPH_ROOT", "https://graph.microsoft.com/v1.0")
 
 DEFAULT_TIMEOUT = 25  # segundos
 
@@ -38,100 +76,242 @@ DEFAULT_TIMEOUT = 25  # segundos
 # Retry / backoff util
 # =====================================================
 
-def _backoff_sleep(tentativa: int, base: float = 1.6, jitter: float = 0.8):
-    espera = (base ** (tentativa - 1)) + random.uniform(0, jitter)
-    time.sleep(min(espera, 10.0))
+@st.cache_resource(show_spinner=False)
+def politica_retry() -> PoliticaRetry:
+    """Uma política por processo: Retry-After, disjuntor e orçamento compartilhados pelas sessões."""
+    return PoliticaRetry(limiar_falhas=RETRY_LIMIAR_DISJUNTOR, janela_s=RETRY_JANELA_DISJUNTOR,
+                         razao_orcamento=RETRY_ORCAMENTO_RAZAO, orcamento_max=RETRY_ORCAMENTO_MAX)
 
-def _request_with_retry(method: str, url: str, headers: dict = None, **kwargs) -> requests.Response:
-    tentativas = kwargs.pop("tentativas", 5)
-    for tentativa in range(1, tentativas + 1):
-        try:
-            resp = requests.request(method, url, headers=headers, timeout=DEFAULT_TIMEOUT, **kwargs)
-            resp.raise_for_status()
-            return resp
-        except requests.exceptions.HTTPError as e:
-            status = getattr(getattr(e, "response", None), "status_code", None)
-            if status in (423, 429, 502, 503, 504):
-                if tentativa == tentativas:
-                    raise
-                _backoff_sleep(tentativa)
-            else:
-                raise
-        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
-            if tentativa == tentativas:
-                raise
-            _backoff_sleep(tentativa)
+def estatisticas_retry() -> dict:
+    """Por classe de endpoint: chamadas, repetições, Retry-After, estado do disjuntor e orçamento."""
+    return politica_retry().estatisticas()
+
+@st.cache_resource(show_spinner=False)
+def _limitador() -> LimitadorTaxa:
+    """Limite agregado de todas as sessões do processo (o Graph limita por app/tenant)."""
+    return LimitadorTaxa(GRAPH_TAXA_LEITURA, GRAPH_RAJADA_LEITURA, GRAPH_TAXA_ESCRITA, GRAPH_RAJADA_ESCRITA)
+
+def estatisticas_limitador() -> dict:
+    """Por balde (leitura/escrita): chamadas, espera na fila por chamada (média, p50, p95, máx.) e por prioridade."""
+    return _limitador().estatisticas()
+
+_LOCK_IDAS = threading.Lock()
+_IDAS_E_VOLTAS = {"total": 0, "lotes": 0, "requisicoes_em_lote": 0, "rebases": 0}
+_IDAS_THREAD = threading.local()
+
+def _contar_ida_e_volta() -> None:
+    with _LOCK_IDAS:
+        _IDAS_E_VOLTAS["total"] += 1
+    _IDAS_THREAD.n = getattr(_IDAS_THREAD, "n", 0) + 1
+
+def idas_e_voltas_thread() -> int:
+    """
+    Idas e voltas HTTP (Graph + token) feitas pela thread atual desde o início do processo.
+    Para medir um carregamento de página ou um salvamento, use a diferença entre dois pontos.
+    """
+    return getattr(_IDAS_THREAD, "n", 0)
+
+def creditar_idas_e_voltas(n: int) -> None:
+    """Atribui à thread atual 'n' idas e voltas feitas por outra em nome dela (ex.: fila de escrita)."""
+    _IDAS_THREAD.n = getattr(_IDAS_THREAD, "n", 0) + n
+
+def estatisticas_idas_e_voltas() -> dict:
+    """Total de idas e voltas do processo, quantos $batch (e requisições neles) e rebases de salvamento (412)."""
+    with _LOCK_IDAS:
+        return dict(_IDAS_E_VOLTAS)
+
+def _requisicao(method: str, url: str, headers: dict = None, **kwargs) -> requests.Response:
+    """
+    Uma única tentativa (limite de taxa + contagem de idas e voltas); o retry fica com quem chama.
+    Um 401 do Graph descarta o token do processo e repete a chamada uma vez com um novo.
+    """
+    tipo = "leitura" if method in ("GET", "HEAD") or url.endswith("/$batch") else "escrita"
+    fichas = 1
+    if url.endswith("/$batch") and "json" in kwargs:
+        fichas = len(kwargs["json"].get("requests", [])) or 1  # o Graph conta cada requisição do lote
+    for renovado in (False, True):
+        if url.startswith(GRAPH_ROOT):
+            _limitador().adquirir(tipo, fichas)
+        _contar_ida_e_volta()
+        # sessão keep-alive compartilhada por host (evita novo handshake TLS a cada chamada)
+        resp = _request_pool(method, url, headers=headers, timeout=DEFAULT_TIMEOUT, **kwargs)
+        autorizacao = (headers or {}).get("Authorization", "")
+        if resp.status_code != 401 or renovado or not autorizacao.startswith("Bearer "):
+            break
+        # token revogado/expirado antes do previsto
+        _gerenciador_token().invalidar(autorizacao[len("Bearer "):])
+        headers = dict(headers, **_headers(obter_token()))
+    resp.raise_for_status()
+    return resp
+
+def _request_with_retry(method: str, url: str, headers: dict = None, classe: str = "metadados",
+                        **kwargs) -> requests.Response:
+    """
+    Requisição com a política de retry compartilhada ('classe': metadados, download, upload
+    ou token). Com o disjuntor da classe aberto, levanta CircuitoAberto sem ir à rede.
+    """
+    tentativas = kwargs.pop("tentativas", None)
+    return politica_retry().executar(
+        classe, lambda: _requisicao(method, url, headers=headers, **kwargs), tentativas=tentativas)
+
+def lote_graph(token: str, requisicoes: List[dict]) -> List[RespostaLote]:
+    """
+    Executa requisições de metadados independentes ({"method", "url" relativo a GRAPH_ROOT})
+    em um único POST /$batch. O POST e as requisições a repetir (423/429/5xx) passam juntos
+    pela política de retry de metadados (ver api.lote_graph.executar_lote).
+    """
+    def _enviar(corpo: dict) -> dict:
+        with _LOCK_IDAS:
+            _IDAS_E_VOLTAS["lotes"] += 1
+            _IDAS_E_VOLTAS["requisicoes_em_lote"] += len(corpo["requests"])
+        return _requisicao("POST", f"{GRAPH_ROOT}/$batch", headers=_headers(token), json=corpo).json()
+    return executar_lote(_enviar, requisicoes, politica_retry(), classe="metadados")
 
 # =====================================================
 # Autenticação e IDs (cacheados)
 # =====================================================
 
-@st.cache_resource(show_spinner=False)
-def _token_cache() -> dict:
-    # armazena {"token": str, "ts": float}
-    return {}
-
-def obter_token() -> str:
-    cache = _token_cache()
-    token = cache.get("token")
-    # 58 minutos de margem
-    if token and time.time() - cache.get("ts", 0) < 58 * 60:
-        return token
-
+def _buscar_token() -> Tuple[str, float]:
     payload = {
         "grant_type": "client_credentials",
         "client_id": CLIENT_ID,
         "client_secret": CLIENT_SECRET,
         "scope": RESOURCE
     }
-    resp = _request_with_retry("POST", AUTHORITY, data=payload)
-    token = resp.json()["access_token"]
-    cache["token"] = token
-    cache["ts"] = time.time()
-    return token
+    resp = _request_with_retry("POST", AUTHORITY, classe="token", data=payload)
+    dados = resp.json()
+    # validade real informada pelo Azure AD (normalmente ~3599s)
+    return dados["access_token"], float(dados.get("expires_in", 3599))
 
 @st.cache_resource(show_spinner=False)
-def _ids_cache() -> dict:
-    # armazena {"site_id": str, "drive_id": str, "item_id": str}
-    return {}
+def _gerenciador_token() -> GerenciadorToken:
+    """Um token por processo, compartilhado por todas as sessões (e por api.acesso)."""
+    return GerenciadorToken(_buscar_token, margem_s=TOKEN_MARGEM_RENOVACAO)
 
-def buscar_site_id(token: str) -> str:
-    cache = _ids_cache()
-    if "site_id" in cache:
-        return cache["site_id"]
-    url = f"{GRAPH_ROOT}/sites/{DOMINIO}"
-    headers = {"Authorization": f"Bearer {token}"}
-    resp = _request_with_retry("GET", url, headers=headers)
-    cache["site_id"] = resp.json()["id"]
-    return cache["site_id"]
+def obter_token() -> str:
+    return _gerenciador_token().obter()
 
-def buscar_drive_id(site_id: str, token: str) -> str:
-    cache = _ids_cache()
-    if "drive_id" in cache:
-        return cache["drive_id"]
-    url = f"{GRAPH_ROOT}/sites/{site_id}/drives"
-    headers = {"Authorization": f"Bearer {token}"}
-    resp = _request_with_retry("GET", url, headers=headers)
-    for drive in resp.json().get("value", []):
-        if drive.get("name") == BIBLIOTECA:
-            cache["drive_id"] = drive["id"]
-            return cache["drive_id"]
-    raise FileNotFoundError(f"Biblioteca '{BIBLIOTECA}' não encontrada.")
+def estatisticas_token() -> dict:
+    """Buscas ao endpoint de token, renovações em segundo plano, esperas, invalidações (401) e segundos até expirar."""
+    return _gerenciador_token().estatisticas()
+
+def _headers(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+def _status_http(e: requests.exceptions.HTTPError) -> Optional[int]:
+    return getattr(getattr(e, "response", None), "status_code", None)
+
+def _resolver_ids_em_cadeia(token: str) -> Ids:
+    """Caminho antigo: site → drives (procura BIBLIOTECA) → item por caminho (3 chamadas)."""
+    resp = _request_with_retry("GET", f"{GRAPH_ROOT}/sites/{DOMINIO}", headers=_headers(token))
+    site_id = resp.json()["id"]
+
+    resp = _request_with_retry("GET", f"{GRAPH_ROOT}/sites/{site_id}/drives", headers=_headers(token))
+    drive_id = next((d["id"] for d in resp.json().get("value", []) if d.get("name") == BIBLIOTECA), None)
+    if drive_id is None:
+        raise FileNotFoundError(f"Biblioteca '{BIBLIOTECA}' não encontrada.")
 
-def buscar_item_id(site_id: str, drive_id: str, token: str) -> str:
-    cache = _ids_cache()
-    if "item_id" in cache:
-        return cache["item_id"]
     caminho_arquivo = f"{PASTA}/{ARQUIVO}"
     caminho_arquivo_encoded = urllib.parse.quote(caminho_arquivo)
     url = f"{GRAPH_ROOT}/sites/{site_id}/drives/{drive_id}/root:/{caminho_arquivo_encoded}"
-    headers = {"Authorization": f"Bearer {token}"}
-    resp = _request_with_retry("GET", url, headers=headers)
-    rid = resp.json().get("id")
+    rid = _request_with_retry("GET", url, headers=_headers(token)).json().get("id")
     if not rid:
         raise FileNotFoundError(f"Arquivo '{caminho_arquivo}' não encontrado no SharePoint.")
-    cache["item_id"] = rid
-    return rid
+    return site_id, drive_id, rid
+
+def _ids_do_item(dados: dict) -> Optional[Ids]:
+    ref = dados.get("parentReference") or {}
+    if dados.get("id") and ref.get("driveId"):
+        # sem siteId na resposta, o próprio host endereça o site raiz
+        return ref.get("siteId") or DOMINIO, ref["driveId"], dados["id"]
+    return None
+
+def _resolver_ids_em_lote(token: str) -> Ids:
+    """
+    Um único $batch com o item por host + caminho, o site e as bibliotecas. Se o arquivo
+    não estiver na biblioteca padrão, site e drives já vieram: falta só o item (2 idas e voltas).
+    """
+    caminho_arquivo = f"{PASTA}/{ARQUIVO}"
+    caminho_arquivo_encoded = urllib.parse.quote(caminho_arquivo)
+    direto, site, drives = lote_graph(token, [
+        {"method": "GET", "url": f"/sites/{DOMINIO}/drive/root:/{caminho_arquivo_encoded}?$select=id,parentReference"},
+        {"method": "GET", "url": f"/sites/{DOMINIO}?$select=id"},
+        {"method": "GET", "url": f"/sites/{DOMINIO}/drives?$select=id,name"},
+    ])
+    if direto.status_code != 404:
+        direto.raise_for_status()
+        ids = _ids_do_item(direto.json())
+        if ids is not None:
+            return ids
+
+    site.raise_for_status()
+    drives.raise_for_status()
+    site_id = site.json()["id"]
+    drive_id = next((d["id"] for d in drives.json().get("value", []) if d.get("name") == BIBLIOTECA), None)
+    if drive_id is None:
+        raise FileNotFoundError(f"Biblioteca '{BIBLIOTECA}' não encontrada.")
+    url = f"{GRAPH_ROOT}/sites/{site_id}/drives/{drive_id}/root:/{caminho_arquivo_encoded}"
+    rid = _request_with_retry("GET", url, headers=_headers(token)).json().get("id")
+    if not rid:
+        raise FileNotFoundError(f"Arquivo '{caminho_arquivo}' não encontrado no SharePoint.")
+    return site_id, drive_id, rid
+
+def _resolver_ids() -> Ids:
+    """
+    Endereça o arquivo direto por host + caminho na biblioteca padrão do site ('Documentos')
+    e tira site/drive do parentReference: 1 chamada em vez de 3. Se o arquivo não estiver
+    na biblioteca padrão (404), cai na cadeia site → drives → item.
+    Com GRAPH_LOTE, as chamadas independentes vão juntas em um $batch.
+    """
+    token = obter_token()
+    if GRAPH_LOTE:
+        return _resolver_ids_em_lote(token)
+    caminho_arquivo_encoded = urllib.parse.quote(f"{PASTA}/{ARQUIVO}")
+    url = f"{GRAPH_ROOT}/sites/{DOMINIO}/drive/root:/{caminho_arquivo_encoded}"
+    try:
+        resp = _request_with_retry("GET", url, headers=_headers(token),
+                                   params={"$select": "id,parentReference"})
+        ids = _ids_do_item(resp.json())
+    except requests.exceptions.HTTPError as e:
+        if _status_http(e) != 404:
+            raise
+        ids = None
+    return ids if ids is not None else _resolver_ids_em_cadeia(token)
+
+@st.cache_resource(show_spinner=False)
+def _resolvedor_ids() -> ResolvedorIds:
+    chave = "/".join((DOMINIO, BIBLIOTECA, PASTA, ARQUIVO))
+    return ResolvedorIds(_resolver_ids, GRAPH_IDS_ARQUIVO, chave)
+
+def estatisticas_ids() -> dict:
+    """Resoluções pela rede, IDs lidos do arquivo local e invalidações por 404."""
+    return _resolvedor_ids().estatisticas()
+
+def _revalidar_ids_em_404(func):
+    """
+    IDs persistidos são conferidos só no uso: se a chamada der 404 com IDs já conhecidos
+    (memória/arquivo), descarta-os e repete a chamada uma vez, resolvendo de novo.
+    """
+    @functools.wraps(func)
+    def _envolvida(*args, **kwargs):
+        ids_antes = _resolvedor_ids().conhecidos()
+        try:
+            return func(*args, **kwargs)
+        except requests.exceptions.HTTPError as e:
+            if ids_antes is None or _status_http(e) != 404:
+                raise
+            _resolvedor_ids().invalidar(ids_antes)
+            return func(*args, **kwargs)
+    return _envolvida
+
+def buscar_site_id(token: str) -> str:
+    return _resolvedor_ids().obter()[0]
+
+def buscar_drive_id(site_id: str, token: str) -> str:
+    return _resolvedor_ids().obter()[1]
+
+def buscar_item_id(site_id: str, drive_id: str, token: str) -> str:
+    return _resolvedor_ids().obter()[2]
 
 # =====================================================
 # Cache persistente de BYTES + ETag (por sessão)
@@ -145,6 +325,48 @@ def _excel_bytes_store() -> dict:
     """
     return {"etag": None, "bytes": None, "last_modified": None}
 
+# etag/bytes/last_modified mudam juntos: leitura e escrita sempre sob este lock
+_LOCK_STORE = threading.Lock()
+
+def _ler_store() -> Tuple[Optional[str], Optional[bytes], Optional[str]]:
+    store = _excel_bytes_store()
+    with _LOCK_STORE:
+        return store["etag"], store["bytes"], store["last_modified"]
+
+def _atualizar_store(etag: Optional[str], content: Optional[bytes], last_modified: Optional[str] = None,
+                     somente_se_vazio: bool = False) -> None:
+    store = _excel_bytes_store()
+    with _LOCK_STORE:
+        if somente_se_vazio and store["bytes"] is not None:
+            return
+        store["etag"], store["bytes"], store["last_modified"] = etag, content, last_modified
+
+@st.cache_resource(show_spinner=False)
+def _downloads_em_voo() -> VooUnico:
+    """Coalesce downloads concorrentes do mesmo ETag entre todas as sessões."""
+    return VooUnico()
+
+def estatisticas_downloads() -> dict:
+    """execucoes = downloads feitos; coalescidas = sessões que aproveitaram um download em andamento."""
+    return _downloads_em_voo().estatisticas()
+
+@st.cache_resource(show_spinner=False)
+def _cache_disco() -> Optional[CacheDiscoBytes]:
+    """Segundo nível (opcional) do cache de bytes: disco, sobrevive a restart/deploy."""
+    if not CACHE_DISCO_DIR:
+        return None
+    return CacheDiscoBytes(CACHE_DISCO_DIR, CACHE_DISCO_LIMITE_MB * 1024 * 1024)
+
+def _guardar_bytes(etag: Optional[str], content: bytes, last_modified: Optional[str] = None) -> None:
+    """Atualiza o store em memória e, se ligado, o cache em disco."""
+    _atualizar_store(etag, content, last_modified)
+    disco = _cache_disco()
+    if disco is not None:
+        try:
+            disco.gravar(etag, content, last_modified)
+        except OSError:
+            pass  # disco é só otimização; nunca derruba a leitura
+
 def _get_item_etag(token: str, site_id: str, drive_id: str, item_id: str) -> Tuple[Optional[str], Optional[str]]:
     """
     Busca metadados mínimos do item (eTag e lastModifiedDateTime) sem baixar o conteúdo.
@@ -155,132 +377,449 @@ def _get_item_etag(token: str, site_id: str, drive_id: str, item_id: str) -> Tup
     js = resp.json()
     return js.get("eTag"), js.get("lastModifiedDateTime")
 
-def _baixar_arquivo_excel_bytes(version_token: int = 0, force: bool = False) -> bytes:
+def _baixar_conteudo(token: str, site_id: str, drive_id: str, item_id: str,
+                     if_none_match: Optional[str] = None) -> Tuple[Optional[bytes], Optional[str]]:
     """
-    Retorna os bytes do Excel usando cache por ETag.
-    - Se o ETag do SharePoint não mudou, reutiliza os bytes já baixados.
-    - Se 'version_token' mudou (após salvamento) ou 'force=True', baixa novamente.
+    GET em /content. Com 'if_none_match', envia o ETag em cache e o servidor responde
+    304 (sem corpo) quando o arquivo não mudou.
+    Retorna (bytes | None se 304, ETag da resposta | None se o servidor não informou).
     """
-    store = _excel_bytes_store()
+    url = f"{GRAPH_ROOT}/sites/{site_id}/drives/{drive_id}/items/{item_id}/content"
+    headers = {"Authorization": f"Bearer {token}"}
+    if if_none_match:
+        headers["If-None-Match"] = if_none_match
+    resp = _request_with_retry("GET", url, headers=headers, classe="download")
+    if resp.status_code == 304:
+        return None, if_none_match
+    return resp.content, resp.headers.get("ETag")
 
-    token = obter_token()
-    site_id = buscar_site_id(token)
-    drive_id = buscar_drive_id(site_id, token)
-    item_id = buscar_item_id(site_id, drive_id, token)
+# =====================================================
+# Armazenamento da planilha (Graph ou diretório local)
+# =====================================================
+
+class ArmazenamentoGraph(ArmazenamentoPlanilha):
+    """A planilha no SharePoint: token + IDs cacheados, /content condicional e PUT com If-Match."""
+    nome = "graph"
+
+    def preparar(self) -> None:
+        obter_token()
+        _resolvedor_ids().obter()
+
+    @_revalidar_ids_em_404
+    def versao(self) -> Tuple[Optional[str], Optional[str]]:
+        return _get_item_etag(obter_token(), *_resolvedor_ids().obter())
+
+    @_revalidar_ids_em_404
+    def ler(self, se_diferente_de: Optional[str] = None) -> Lido:
+        token = obter_token()
+        ids = _resolvedor_ids().obter()
+        content, etag = _baixar_conteudo(token, *ids, if_none_match=se_diferente_de)
+        if content is None:
+            return None, se_diferente_de, None
+        lm = None
+        if not etag:
+            # servidor não devolveu ETag no download: completa com a consulta de metadados
+            etag, lm = _get_item_etag(token, *ids)
+        return content, etag, lm
+
+    @_revalidar_ids_em_404
+    def gravar(self, dados: bytes, se_versao: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+        token = obter_token()
+        site_id, drive_id, item_id = _resolvedor_ids().obter()
+        url = f"{GRAPH_ROOT}/sites/{site_id}/drives/{drive_id}/items/{item_id}/content"
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        }
+        if se_versao:
+            headers["If-Match"] = se_versao
+        try:
+            resp = _request_with_retry("PUT", url, headers=headers, classe="upload", data=dados)
+        except requests.exceptions.HTTPError as e:
+            if status_http(e) == 412:
+                raise VersaoAlterada(str(e)) from e
+            raise
+        # O PUT já devolve o driveItem com o ETag novo; só consulta à parte se ele não vier.
+        try:
+            item = resp.json()
+        except ValueError:
+            item = {}
+        etag_new, lm_new = item.get("eTag"), item.get("lastModifiedDateTime")
+        if not etag_new:
+            etag_new, lm_new = _get_item_etag(token, site_id, drive_id, item_id)
+        return etag_new, lm_new
+
+@st.cache_resource(show_spinner=False)
+def _armazenamento() -> ArmazenamentoPlanilha:
+    if ARMAZENAMENTO == "local":
+        arm = ArmazenamentoLocal(os.path.join(ARMAZENAMENTO_LOCAL_DIR, ARQUIVO))
+    elif ARMAZENAMENTO == "graph":
+        arm = ArmazenamentoGraph()
+    else:
+        raise ValueError(f"ARMAZENAMENTO desconhecido: {ARMAZENAMENTO!r} (use 'graph' ou 'local')")
+    arm.por_zip = SALVAR_POR_ZIP
+    return arm
+
+def estatisticas_armazenamento() -> dict:
+    arm = _armazenamento()
+    return {"backend": arm.nome, **arm.estatisticas()}
+
+def _bytes_em_cache() -> Optional[Tuple[bytes, Optional[str]]]:
+    """Últimos bytes conhecidos (memória, senão a versão mais recente em disco), sem rede."""
+    etag, content, _ = _ler_store()
+    if content is not None:
+        return content, etag
+    disco = _cache_disco()
+    ultimo = disco.ultimo() if disco is not None else None
+    if ultimo is None:
+        return None
+    _atualizar_store(*ultimo, somente_se_vazio=True)
+    etag, content, _ = _ler_store()
+    return (content, etag) if content is not None else None
+
+def _graph_disponivel_para_leitura() -> bool:
+    politica = politica_retry()
+    return politica.disponivel("metadados") and politica.disponivel("download")
+
+def _cache_se_graph_indisponivel(func):
+    """
+    Leituras não esperam o Graph se recuperar: com o disjuntor aberto (ou um Retry-After
+    pendente), devolvem os últimos bytes em cache. Salvamentos (force=True) não usam isso.
+    """
+    @functools.wraps(func)
+    def _envolvida(version_token: int = 0, force: bool = False):
+        if not force and not _graph_disponivel_para_leitura():
+            em_cache = _bytes_em_cache()
+            if em_cache is not None:
+                return em_cache
+        try:
+            return func(version_token=version_token, force=force)
+        except (CircuitoAberto, requests.exceptions.RequestException) as e:
+            sobrecarga = isinstance(e, CircuitoAberto) or status_http(e) in (None, *STATUS_SOBRECARGA)
+            em_cache = None if force or not sobrecarga or _graph_disponivel_para_leitura() else _bytes_em_cache()
+            if em_cache is None:
+                raise
+            return em_cache
+    return _envolvida
+
+@_cache_se_graph_indisponivel
+def _obter_bytes_e_etag(version_token: int = 0, force: bool = False) -> Tuple[bytes, Optional[str]]:
+    """
+    Retorna (bytes do Excel, ETag desses bytes) usando cache por ETag.
+    - Modo condicional (DOWNLOAD_CONDICIONAL): uma única chamada a /content com
+      If-None-Match; 304 reaproveita os bytes do store, 200 traz o arquivo novo.
+    - Modo legado: consulta o ETag e só então baixa o conteúdo se ele mudou.
+    - 'force=True' ignora o cache e baixa tudo.
+    Ordem de consulta: memória → disco (CACHE_DISCO_DIR) → rede.
+    Downloads concorrentes da mesma versão (mesmo If-None-Match / mesmo ETag) são feitos
+    uma única vez; as outras sessões esperam e recebem o mesmo resultado.
+    Com o observador de ETag ligado e em dia, devolve direto os bytes em memória.
+    """
+    observador = _observador()
+    if not force and observador is not None and observador.recente():
+        etag_store, cached, _ = _ler_store()
+        if cached is not None:
+            return cached, etag_store
+
+    disco = _cache_disco()
+    voos = _downloads_em_voo()
+    arm = _armazenamento()
+
+    if DOWNLOAD_CONDICIONAL:
+        etag_cache, cached, _ = _ler_store()
+        if not force and cached is None and disco is not None:
+            # partida a frio: a última versão em disco vira candidata para o If-None-Match
+            ultimo = disco.ultimo()
+            if ultimo is not None:
+                _atualizar_store(*ultimo, somente_se_vazio=True)
+                etag_cache, cached, _ = _ler_store()
+        if force or cached is None:
+            etag_cache = None
+
+        def _baixar_condicional() -> Tuple[Optional[bytes], Optional[str]]:
+            content, etag, lm = arm.ler(se_diferente_de=etag_cache)
+            if content is None:
+                return None, etag_cache
+            _guardar_bytes(etag, content, lm)
+            return content, etag
+
+        if force:
+            # salvamento quer o estado atual: não pega carona em download iniciado antes
+            content, etag = _baixar_condicional()
+        else:
+            content, etag = voos.executar(("condicional", etag_cache), _baixar_condicional)
+        if content is None:
+            return cached, etag_cache
+        return content, etag
 
     # Se forçar (por salvamento), ignora ETag e baixa tudo
     if force or version_token:
-        url = f"{GRAPH_ROOT}/sites/{site_id}/drives/{drive_id}/items/{item_id}/content"
-        headers = {"Authorization": f"Bearer {token}"}
-        resp = _request_with_retry("GET", url, headers=headers)
-        store["bytes"] = resp.content
-        # atualiza ETag para refletir o estado atual
-        etag, lm = _get_item_etag(token, site_id, drive_id, item_id)
-        store["etag"], store["last_modified"] = etag, lm
-        return store["bytes"]
+        content, etag, lm = arm.ler()
+        _guardar_bytes(etag, content, lm)
+        return content, etag
 
     # Consulta rápida do ETag
-    etag_remote, lm_remote = _get_item_etag(token, site_id, drive_id, item_id)
+    etag_remote, lm_remote = arm.versao()
 
     # Se temos bytes e o ETag é o mesmo → reutiliza
-    if store.get("bytes") is not None and store.get("etag") == etag_remote:
-        return store["bytes"]
+    etag_store, cached, _ = _ler_store()
+    if cached is not None and etag_store == etag_remote:
+        return cached, etag_remote
 
-    # Caso contrário, baixa bytes e atualiza o store
-    url = f"{GRAPH_ROOT}/sites/{site_id}/drives/{drive_id}/items/{item_id}/content"
-    headers = {"Authorization": f"Bearer {token}"}
-    resp = _request_with_retry("GET", url, headers=headers)
-    store["bytes"] = resp.content
-    store["etag"] = etag_remote
-    store["last_modified"] = lm_remote
-    return store["bytes"]
+    # Mesmo ETag já gravado em disco (ex.: após restart) → evita o download
+    achado = disco.obter(etag_remote) if disco is not None else None
+    if achado is not None:
+        _atualizar_store(etag_remote, achado[0], lm_remote)
+        return achado[0], etag_remote
+
+    # Caso contrário, baixa bytes (uma vez por ETag, mesmo com várias sessões) e atualiza o store
+    def _baixar_versao() -> bytes:
+        content, _, _ = arm.ler()
+        _guardar_bytes(etag_remote, content, lm_remote)
+        return content
+
+    return voos.executar(("etag", etag_remote), _baixar_versao), etag_remote
+
+def _baixar_arquivo_excel_bytes(version_token: int = 0, force: bool = False) -> bytes:
+    """Retorna os bytes do Excel (ver _obter_bytes_e_etag)."""
+    return _obter_bytes_e_etag(version_token=version_token, force=force)[0]
 
 def _bytes_to_excel_file(xls_bytes: bytes) -> pd.ExcelFile:
     return pd.ExcelFile(io.BytesIO(xls_bytes), engine="openpyxl")
 
 # =====================================================
-# Leitura de abas (a partir dos bytes cacheados)
+# Workbook parseado por ETag (+ cache colunar opcional)
 # =====================================================
 
-@st.cache_data(ttl=None, show_spinner=False, max_entries=2)
-def baixar_arquivo_excel(version_token: int = 0) -> Dict[str, pd.DataFrame]:
+@st.cache_resource(show_spinner=False)
+def _cache_colunar() -> Optional[CacheColunar]:
+    if not CACHE_COLUNAR_DIR:
+        return None
+    return CacheColunar(CACHE_COLUNAR_DIR, CACHE_COLUNAR_LIMITE_MB * 1024 * 1024)
+
+@st.cache_resource(show_spinner=False)
+def _registro_planilhas() -> RegistroPlanilhas:
+    """Workbooks parseados compartilhados entre sessões e páginas (um por ETag)."""
+    return RegistroPlanilhas(max_versoes=2, colunar=_cache_colunar())
+
+_LOCK_VALIDADOS = threading.Lock()
+
+@st.cache_resource(show_spinner=False)
+def _tokens_validados() -> set:
+    """version_tokens cuja versão já foi conferida na rede (valem para todas as sessões)."""
+    return set()
+
+@st.cache_resource(show_spinner=False)
+def _contador_versao() -> "itertools.count":
+    """Fonte única de version_tokens do processo: nenhum número é entregue duas vezes."""
+    return itertools.count(1)
+
+def novo_version_token() -> int:
     """
-    Retorna todas as abas como {nome: DataFrame} a partir de um único download cacheado por ETag.
+    Token ainda não validado por nenhuma sessão: a primeira leitura com ele faz um GET
+    condicional (nova sessão, "Sincronizar Tudo") e enxerga edições externas.
     """
-    content = _baixar_arquivo_excel_bytes(version_token=version_token)
-    xls = _bytes_to_excel_file(content)
-    sheets = {}
-    for name in xls.sheet_names:
-        sheets[name] = pd.read_excel(xls, sheet_name=name)
-    return sheets
+    with _LOCK_VALIDADOS:
+        return next(_contador_versao())
 
-@st.cache_data(ttl=None, show_spinner=False, max_entries=16)
-def baixar_aba_excel(nome_aba: str, version_token: int = 0) -> pd.DataFrame:
+def _bytes_validados(version_token: int = 0) -> Tuple[bytes, Optional[str]]:
     """
-    Retorna apenas uma aba específica, sem novo download.
+    Bytes e ETag que as leituras com 'version_token' devem ver. A primeira leitura com um
+    token confere a versão (If-None-Match, em geral 304); as seguintes usam o store em
+    memória, que já reflete os salvamentos deste processo e o observador de ETag.
     """
-    content = _baixar_arquivo_excel_bytes(version_token=version_token)
-    xls = _bytes_to_excel_file(content)
-    if nome_aba not in xls.sheet_names:
-        return pd.DataFrame()
-    return pd.read_excel(xls, sheet_name=nome_aba)
+    validados = _tokens_validados()
+    with _LOCK_VALIDADOS:
+        validado = version_token in validados
+    if validado:
+        etag, content, _ = _ler_store()
+        if content is not None and etag:
+            return content, etag
+    content, etag = _obter_bytes_e_etag(version_token=version_token)
+    with _LOCK_VALIDADOS:
+        validados.add(version_token)
+    return content, etag
+
+def etag_atual(version_token: int = 0) -> Optional[str]:
+    """ETag da versão que as leituras com 'version_token' enxergam."""
+    return _bytes_validados(version_token=version_token)[1]
+
+def _planilha(version_token: int = 0) -> PlanilhaParseada:
+    content, etag = _bytes_validados(version_token=version_token)
+    return _registro_planilhas().obter(etag, content)
+
+def aba_derivada(nome_aba: str, chave: str, funcao: Callable[[pd.DataFrame], Any],
+                 version_token: int = 0) -> Any:
+    """funcao(aba) calculada uma vez por ETag e compartilhada entre sessões (somente leitura)."""
+    return _planilha(version_token=version_token).derivado(nome_aba, chave, funcao)
+
+def estatisticas_parse() -> dict:
+    """Parses feitos x reaproveitados e o tempo de parse economizado (segundos)."""
+    return _registro_planilhas().estatisticas()
 
 # =====================================================
-# Escrita (salvar) no Excel
+# Cache de leituras por ETag (no lugar de st.cache_data)
 # =====================================================
 
-def _write_df_to_worksheet(ws, df: pd.DataFrame):
-    ws.delete_rows(1, ws.max_row if ws.max_row else 1)
-    for row in dataframe_to_rows(df, index=False, header=True):
-        ws.append(row)
+@st.cache_resource(show_spinner=False)
+def _cache_etag() -> CacheEtag:
+    """Leituras derivadas da planilha, compartilhadas entre sessões e chaveadas pelo ETag."""
+    return CacheEtag(max_versoes=2)
 
-def _abrir_workbook_bytes(version_token: int = 0):
-    # Quando version_token>0, forçamos baixar os bytes atuais (sem reutilizar ETag antigo)
-    content = _baixar_arquivo_excel_bytes(version_token=version_token, force=bool(version_token))
-    return load_workbook(io.BytesIO(content))
+def cache_por_etag(*abas: str) -> Callable:
+    """
+    Decorador para leituras da planilha: a chave é (ETag, abas, função, parâmetros).
+    'version_token' só decide quando reconferir o ETag; nenhum DataFrame é hasheado
+    (parâmetros devem ser simples: str, número, listas deles). O valor devolvido é o
+    compartilhado por todas as sessões, sem cópia: somente leitura — copie antes de alterar.
+    """
+    def decorador(funcao: Callable) -> Callable:
+        assinatura = inspect.signature(funcao)
+        operacao = f"{funcao.__module__}.{funcao.__qualname__}"
+
+        @functools.wraps(funcao)
+        def _cacheada(*args, **kwargs):
+            ligados = assinatura.bind(*args, **kwargs)
+            ligados.apply_defaults()
+            parametros = dict(ligados.arguments)
+            version_token = parametros.pop("version_token", 0)
+            return _cache_etag().obter(etag_atual(version_token), abas, operacao, congelar(parametros),
+                                       lambda: funcao(*args, **kwargs))
+        return _cacheada
+    return decorador
+
+def estatisticas_cache_etag() -> dict:
+    """Acertos/faltas (total e por função), entradas e ETags em memória."""
+    return _cache_etag().estatisticas()
 
-def _upload_workbook(wb) -> bool:
-    token = obter_token()
-    site_id = buscar_site_id(token)
-    drive_id = buscar_drive_id(site_id, token)
-    item_id = buscar_item_id(site_id, drive_id, token)
+# =====================================================
+# Observador de ETag (opcional, ETAG_POLL_SEGUNDOS > 0)
+# =====================================================
 
-    out = io.BytesIO()
-    wb.save(out)
-    out.seek(0)
+_ABAS_STREAMING = ("Controle", "Usuarios")
 
-    url = f"{GRAPH_ROOT}/sites/{site_id}/drives/{drive_id}/items/{item_id}/content"
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    }
-    _request_with_retry("PUT", url, headers=headers, data=out.read())
+@prioridade(PRIORIDADE_FUNDO)
+def _verificar_e_preaquecer() -> bool:
+    """
+    Executado pelo observador: detecta versão nova, baixa e parseia as abas de
+    ETAG_PREAQUECER_ABAS e só então troca o store (troca atômica): o ETag novo passa a
+    valer para as leituras cacheadas e a próxima interação de cada sessão já encontra tudo pronto.
+    """
+    arm = _armazenamento()
+    etag_store, cached, _ = _ler_store()
+    if DOWNLOAD_CONDICIONAL:
+        content, etag, lm = arm.ler(se_diferente_de=etag_store if cached is not None else None)
+        if content is None:
+            return False
+    else:
+        etag, lm = arm.versao()
+        if cached is not None and etag == etag_store:
+            return False
+        disco = _cache_disco()
+        achado = disco.obter(etag) if disco is not None else None
+        content = achado[0] if achado is not None else arm.ler()[0]
+
+    planilha = _registro_planilhas().obter(etag, content)
+    for aba in ETAG_PREAQUECER_ABAS:
+        planilha.aba(aba, engine="streaming" if aba in _ABAS_STREAMING else "openpyxl")
+    _guardar_bytes(etag, content, lm)
+    return True
 
-    # Atualiza o cache de bytes com o que acabamos de enviar (evita re-download no próximo acesso)
-    store = _excel_bytes_store()
-    store["bytes"] = out.getvalue()
-    etag_new, lm_new = _get_item_etag(token, site_id, drive_id, item_id)
-    store["etag"], store["last_modified"] = etag_new, lm_new
+@st.cache_resource(show_spinner=False)
+def _observador() -> Optional[ObservadorEtag]:
+    if ETAG_POLL_SEGUNDOS <= 0:
+        return None
+    return ObservadorEtag(_verificar_e_preaquecer, ETAG_POLL_SEGUNDOS, ETAG_MAX_DEFASAGEM).iniciar()
+
+def estatisticas_observador() -> Optional[dict]:
+    """Verificações, mudanças detectadas, falhas e idade da última verificação (None se desligado)."""
+    observador = _observador()
+    return observador.estatisticas() if observador is not None else None
+
+# =====================================================
+# Leitura de abas (a partir dos bytes cacheados)
+# =====================================================
+
+@cache_por_etag()
+def baixar_arquivo_excel(version_token: int = 0) -> Dict[str, pd.DataFrame]:
+    """
+    Retorna todas as abas como {nome: DataFrame} a partir de um único download cacheado por ETag.
+    """
+    planilha = _planilha(version_token=version_token)
+    return {name: planilha.aba(name) for name in planilha.nomes_abas()}
+
+@cache_por_etag()
+def baixar_aba_excel(nome_aba: str, version_token: int = 0, engine: str = "openpyxl") -> pd.DataFrame:
+    """
+    Retorna apenas uma aba específica, sem novo download nem novo parse para o mesmo ETag.
+    engine="streaming" lê só o XML dessa aba (e as shared strings que ela usa) direto do zip:
+    abas pequenas como "Controle" e "Usuarios" saem em milissegundos, qualquer que seja
+    o tamanho da "Base de Dados".
+    """
+    df = _planilha(version_token=version_token).aba(nome_aba, engine=engine)
+    return pd.DataFrame() if df is None else df
+
+# =====================================================
+# Escrita (salvar) no Excel
+# =====================================================
+
+class ConflitoEdicao(Exception):
+    """O arquivo continuou mudando no SharePoint (412) após SALVAR_MAX_REBASES tentativas de rebase."""
+
+# Uma aba a gravar: DataFrame (substitui a aba inteira) ou função que recebe a aba atual
+# (None se não existir) e devolve a nova — refeita sobre a versão nova em caso de conflito.
+AbaNova = Union[pd.DataFrame, Callable[[Optional[pd.DataFrame]], pd.DataFrame]]
+
+def _base_para_salvar() -> Tuple[bytes, Optional[str]]:
+    """Bytes e ETag em cache (o If-Match do PUT confirma se ainda são os atuais); sem cache, baixa."""
+    etag, content, _ = _ler_store()
+    if content is not None and etag:
+        return content, etag
+    return _obter_bytes_e_etag()
+
+def _aplicar_abas(content: bytes, etag: Optional[str], abas: Dict[str, AbaNova]) -> Dict[str, pd.DataFrame]:
+    """DataFrames finais das abas: as funções são aplicadas à aba da versão 'etag' (parse compartilhado)."""
+    planilha = _registro_planilhas().obter(etag, content)
+    return {nome: aba(planilha.aba(nome)) if callable(aba) else aba for nome, aba in abas.items()}
+
+def _gravar_abas_armazenamento(content: bytes, etag: Optional[str], abas: Dict[str, AbaNova]) -> bool:
+    dados, etag_new, lm_new = _armazenamento().gravar_abas(_aplicar_abas(content, etag, abas),
+                                                           se_versao=etag, base=content)
+    # Atualiza o cache de bytes com o que acabamos de enviar (evita re-download no próximo acesso).
+    _guardar_bytes(etag_new, dados, lm_new)
     return True
 
-def salvar_arquivo_excel_modificado(sheets_dict: Dict[str, pd.DataFrame], version_token: int = 0) -> bool:
-    wb = _abrir_workbook_bytes(version_token=version_token)
-    for sheet_name, df in sheets_dict.items():
-        if sheet_name in wb.sheetnames:
-            ws = wb[sheet_name]
-        else:
-            ws = wb.create_sheet(title=sheet_name)
-        _write_df_to_worksheet(ws, df)
-    return _upload_workbook(wb)
-
-def salvar_apenas_aba(nome_aba: str, df_novo: pd.DataFrame, version_token: int = 0) -> bool:
-    wb = _abrir_workbook_bytes(version_token=version_token)
-    if nome_aba in wb.sheetnames:
-        ws = wb[nome_aba]
-    else:
-        ws = wb.create_sheet(title=nome_aba)
-    _write_df_to_worksheet(ws, df_novo)
-    return _upload_workbook(wb)
+@prioridade(PRIORIDADE_SALVAR)
+def _salvar_abas(abas: Dict[str, AbaNova]) -> bool:
+    """
+    Salvamento otimista: monta o arquivo sobre os bytes em cache e envia com If-Match.
+    Caso comum: uma única chamada (o PUT). Se outra sessão salvou antes (412), baixa a
+    versão atual e refaz as abas sobre ela — nada do que o outro gravou é sobrescrito.
+    """
+    content, etag = _base_para_salvar()
+    for tentativa in range(SALVAR_MAX_REBASES + 1):
+        if not etag:
+            # servidor sem ETag: não há como detectar conflito, então parte do estado atual
+            content, etag = _obter_bytes_e_etag(force=True)
+        try:
+            return _gravar_abas_armazenamento(content, etag, abas)
+        except VersaoAlterada:
+            pass
+        with _LOCK_IDAS:
+            _IDAS_E_VOLTAS["rebases"] += 1
+        content, etag = _obter_bytes_e_etag(force=True)
+    raise ConflitoEdicao("O arquivo foi alterado por outra pessoa durante o salvamento. Tente novamente.")
+
+def salvar_arquivo_excel_modificado(sheets_dict: Dict[str, AbaNova], version_token: int = 0) -> bool:
+    """Grava as abas informadas (ver _salvar_abas). 'version_token' mantido por compatibilidade."""
+    return _salvar_abas(sheets_dict)
+
+def salvar_apenas_aba(nome_aba: str, df_novo: AbaNova, version_token: int = 0) -> bool:
+    """
+    Grava uma aba (ver _salvar_abas). 'df_novo' pode ser uma função da aba atual, para que
+    merges/appends sejam refeitos sobre a versão nova em caso de conflito.
+    """
+    return _salvar_abas({nome_aba: df_novo})
 
 # =====================================================
 # Funções de negócio
@@ -288,24 +827,27 @@ def salvar_apenas_aba(nome_aba: str, df_novo: pd.DataFrame, version_token: int =
 
 def load_users(version_token: int = 0) -> pd.DataFrame:
     try:
-        df_users = baixar_aba_excel("Usuarios", version_token=version_token)
+        df_users = baixar_aba_excel("Usuarios", version_token=version_token, engine="streaming")
         if df_users is None or df_users.empty:
             return pd.DataFrame(columns=["username", "password_hash", "role", "created_at"])
         return df_users
     except Exception:
         return pd.DataFrame(columns=["username", "password_hash", "role", "created_at"])
 
-def salvar_aba_controle(semana: str, meses_permitidos: Optional[List[str]] = None, version_token: int = 0) -> bool:
+def df_controle(semana: str, meses_permitidos: Optional[List[str]] = None) -> pd.DataFrame:
+    """Conteúdo da aba 'Controle' (semana ativa + meses permitidos separados por ';')."""
     meses_str = ";".join(meses_permitidos) if meses_permitidos else ""
-    controle_df = pd.DataFrame({
+    return pd.DataFrame({
         "Semana Ativa": [semana],
         "Meses Permitidos": [meses_str]
     })
-    return salvar_apenas_aba("Controle", controle_df, version_token=version_token)
+
+def salvar_aba_controle(semana: str, meses_permitidos: Optional[List[str]] = None, version_token: int = 0) -> bool:
+    return salvar_apenas_aba("Controle", df_controle(semana, meses_permitidos), version_token=version_token)
 
 def carregar_semana_ativa(version_token: int = 0) -> Optional[dict]:
     try:
-        controle_df = baixar_aba_excel("Controle", version_token=version_token)
+        controle_df = baixar_aba_excel("Controle", version_token=version_token, engine="streaming")
         if controle_df is None or controle_df.empty:
             return None
 
@@ -340,38 +882,26 @@ def baixar_aba_excel_stepwise(nome_aba: str, version_token: int = 0, on_update=N
     Usa o cache por ETag sob o capô, então não baixa novamente se não mudou.
     """
     t0 = time.perf_counter()
+    idas0 = idas_e_voltas_thread()
     def _say(msg):
         if on_update:
             on_update(msg)
 
-    _say("🔑 Obtendo token…")
-    token = obter_token()
-    t1 = time.perf_counter(); _say(f"✅ Token em {t1 - t0:.2f}s")
-
-    _say("🧭 Buscando site_id…")
-    site_id = buscar_site_id(token)
-    t2 = time.perf_counter(); _say(f"✅ site_id em {t2 - t1:.2f}s")
-
-    _say("📁 Buscando drive_id…")
-    drive_id = buscar_drive_id(site_id, token)
-    t3 = time.perf_counter(); _say(f"✅ drive_id em {t3 - t2:.2f}s")
-
-    _say("📄 Buscando item_id…")
-    item_id = buscar_item_id(site_id, drive_id, token)
-    t4 = time.perf_counter(); _say(f"✅ item_id em {t4 - t3:.2f}s")
+    _say("🔑 Preparando acesso ao arquivo (token e IDs)…")
+    _armazenamento().preparar()
+    t4 = time.perf_counter(); _say(f"✅ Acesso pronto em {t4 - t0:.2f}s")
 
     _say("⬇️ Resolvendo cache de bytes (ETag)…")
-    content = _baixar_arquivo_excel_bytes(version_token=version_token)
+    planilha = _planilha(version_token=version_token)
     t5 = time.perf_counter(); _say(f"✅ Bytes prontos em {t5 - t4:.2f}s")
 
     _say(f"🧩 Lendo aba '{nome_aba}'…")
-    xls = pd.ExcelFile(io.BytesIO(content), engine="openpyxl")
-    if nome_aba not in xls.sheet_names:
+    df = planilha.aba(nome_aba)
+    if df is None:
         _say("⚠️ Aba não encontrada — retornando vazio.")
         return pd.DataFrame()
-    df = pd.read_excel(xls, sheet_name=nome_aba)
     t6 = time.perf_counter(); _say(f"✅ Parse em {t6 - t5:.2f}s")
-    _say(f"🏁 Concluído em {t6 - t0:.2f}s")
+    _say(f"🏁 Concluído em {t6 - t0:.2f}s ({idas_e_voltas_thread() - idas0} idas e voltas)")
     return df
 
 # =====================================================
@@ -384,12 +914,8 @@ def recarregar_dados() -> None:
     Esta função limpa o cache de bytes/etag do Excel e invalida caches de leitura.
     """
     # limpa store de bytes/etag
-    store = _excel_bytes_store()
-    store["etag"] = None
-    store["bytes"] = None
-    store["last_modified"] = None
-    # limpa somente caches de leitura deste módulo
-    try:
-        st.cache_data.clear()  # invalida baixar_aba_excel / baixar_arquivo_excel
-    except Exception:
-        pass
+    _atualizar_store(None, None, None)
+    # leituras por ETag e tokens já conferidos: a próxima leitura vai à rede
+    _cache_etag().limpar()
+    with _LOCK_VALIDADOS:
+        _tokens_validados().clear()
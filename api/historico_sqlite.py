@@ -0,0 +1,188 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# =====================================================
+# Histórico de edições: log só de acréscimo em SQLite, compactado na aba depois
+# =====================================================
+
+COLUNA_ID = "ID Histórico"  # gravada na aba: permite compactar/importar sem duplicar linhas
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS historico (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    semana TEXT,
+    gerencia TEXT,
+    indice TEXT,
+    mes TEXT,
+    criado_em REAL NOT NULL,
+    compactado INTEGER NOT NULL DEFAULT 0,
+    dados TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_historico_semana ON historico (semana);
+CREATE INDEX IF NOT EXISTS ix_historico_gerencia ON historico (gerencia, semana);
+CREATE INDEX IF NOT EXISTS ix_historico_celula ON historico (indice, mes);
+CREATE INDEX IF NOT EXISTS ix_historico_pendentes ON historico (id) WHERE compactado = 0;
+CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor TEXT);
+"""
+
+
+def _chave(valor: Any) -> Optional[str]:
+    """Valor de coluna indexada como texto comparável (datas em ISO)."""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    if isinstance(valor, (datetime, date, np.datetime64)):
+        return pd.Timestamp(valor).isoformat()
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+def _para_json(valor: Any):
+    if isinstance(valor, (datetime, date, np.datetime64)):
+        return {"$ts": pd.Timestamp(valor).isoformat()}
+    if isinstance(valor, np.generic):
+        return valor.item()
+    return str(valor)
+
+def _de_json(obj: dict):
+    return pd.Timestamp(obj["$ts"]) if set(obj) == {"$ts"} else obj
+
+def _chave_coluna(nome: Any):
+    # Timestamp volta como datetime, igual ao nome de coluna lido da planilha
+    return nome.to_pydatetime() if isinstance(nome, pd.Timestamp) else nome
+
+
+class HistoricoSQLite:
+    """
+    Linhas do histórico num SQLite local (WAL): acrescentar custa O(linhas novas), sem baixar
+    nem regravar a aba. Cada linha guarda o registro inteiro (JSON, datas preservadas) e as
+    colunas de consulta indexadas: semana (Semana/Revisão), Gerência e célula (index + Mês).
+    As linhas ainda não copiadas para a aba 'Histórico' ficam com compactado = 0; quem
+    compacta lê pendentes(), grava na aba e chama marcar_compactado().
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        self._con.executescript(_ESQUEMA)
+        self.stats = {"anexadas": 0, "consultas": 0, "compactadas": 0, "importadas": 0}
+
+    # ---------------- escrita ----------------
+
+    @staticmethod
+    def _linhas(df: pd.DataFrame, compactado: int) -> Iterable[tuple]:
+        agora = time.time()
+        registros = df.astype(object).where(df.notna(), None).to_dict("records")
+        for r in registros:
+            id_linha = r.pop(COLUNA_ID, None)
+            yield (
+                int(id_linha) if id_linha is not None else None,
+                _chave(r.get("Semana", r.get("Revisão"))),
+                _chave(r.get("Gerência")),
+                _chave(r.get("index")),
+                _chave(r.get("Mês")),
+                agora,
+                compactado,
+                # pares [coluna, valor]: nomes de coluna podem ser datas (meses)
+                json.dumps(list(r.items()), default=_para_json, ensure_ascii=False),
+            )
+
+    def _inserir(self, df: pd.DataFrame, compactado: int) -> int:
+        if df is None or df.empty:
+            return 0
+        with self._lock:
+            antes = self._con.total_changes
+            self._con.execute("BEGIN")
+            self._con.executemany(
+                "INSERT OR IGNORE INTO historico (id, semana, gerencia, indice, mes, criado_em, compactado, dados) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                self._linhas(df, compactado),
+            )
+            self._con.execute("COMMIT")
+            return self._con.total_changes - antes
+
+    def anexar(self, df: pd.DataFrame) -> int:
+        """Acrescenta as linhas de 'df' (pendentes de compactação); retorna quantas entraram."""
+        n = self._inserir(df, compactado=0)
+        with self._lock:
+            self.stats["anexadas"] += n
+        return n
+
+    def importar(self, df: Optional[pd.DataFrame]) -> int:
+        """
+        Carga única das linhas que já estão na aba (marcadas como compactadas). Linhas com
+        COLUNA_ID já conhecida são ignoradas. Depois da primeira chamada, importado() é True.
+        """
+        n = self._inserir(df, compactado=1) if df is not None else 0
+        with self._lock:
+            self._con.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES ('importado', ?)", (str(time.time()),))
+            self.stats["importadas"] += n
+        return n
+
+    def importado(self) -> bool:
+        with self._lock:
+            return self._con.execute("SELECT 1 FROM meta WHERE chave = 'importado'").fetchone() is not None
+
+    # ---------------- leitura ----------------
+
+    @staticmethod
+    def _dataframe(linhas: List[Tuple[int, str]]) -> pd.DataFrame:
+        registros = []
+        for id_linha, dados in linhas:
+            r = {_chave_coluna(k): v for k, v in json.loads(dados, object_hook=_de_json)}
+            r[COLUNA_ID] = id_linha
+            registros.append(r)
+        return pd.DataFrame.from_records(registros)
+
+    def consultar(self, semana: Any = None, gerencia: Any = None, indice: Any = None, mes: Any = None) -> pd.DataFrame:
+        """Linhas do histórico (em ordem de gravação) filtradas pelas colunas indexadas informadas."""
+        filtros, valores = [], []
+        for coluna, valor in (("semana", semana), ("gerencia", gerencia), ("indice", indice), ("mes", mes)):
+            if valor is not None:
+                filtros.append(f"{coluna} = ?")
+                valores.append(_chave(valor))
+        sql = "SELECT id, dados FROM historico"
+        if filtros:
+            sql += " WHERE " + " AND ".join(filtros)
+        with self._lock:
+            linhas = self._con.execute(sql + " ORDER BY id", valores).fetchall()
+            self.stats["consultas"] += 1
+        return self._dataframe(linhas)
+
+    def pendentes(self) -> Tuple[pd.DataFrame, int]:
+        """Linhas ainda não compactadas na aba e o maior id entre elas (0 se nenhuma)."""
+        with self._lock:
+            linhas = self._con.execute("SELECT id, dados FROM historico WHERE compactado = 0 ORDER BY id").fetchall()
+        return self._dataframe(linhas), (linhas[-1][0] if linhas else 0)
+
+    def marcar_compactado(self, ate_id: int) -> None:
+        with self._lock:
+            cur = self._con.execute("UPDATE historico SET compactado = 1 WHERE compactado = 0 AND id <= ?", (ate_id,))
+            self.stats["compactadas"] += cur.rowcount
+
+    def situacao_pendentes(self) -> Tuple[int, float]:
+        """(quantidade de linhas pendentes, idade em segundos da mais antiga)."""
+        with self._lock:
+            n, mais_antiga = self._con.execute(
+                "SELECT COUNT(*), MIN(criado_em) FROM historico WHERE compactado = 0").fetchone()
+        return n, (time.time() - mais_antiga) if mais_antiga else 0.0
+
+    def estatisticas(self) -> dict:
+        n, idade = self.situacao_pendentes()
+        with self._lock:
+            dados = dict(self.stats)
+            dados["linhas"] = self._con.execute("SELECT COUNT(*) FROM historico").fetchone()[0]
+        dados["pendentes"] = n
+        dados["pendente_mais_antiga_s"] = round(idade, 1)
+        return dados
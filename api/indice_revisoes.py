@@ -0,0 +1,69 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# =====================================================
+# Base de Dados particionada por Revisão (uma vez por ETag)
+# =====================================================
+
+
+class IndiceRevisoes:
+    """
+    Linhas da base reordenadas (ordenação estável) para que cada revisão fique contígua,
+    na ordem em que as revisões aparecem na aba. Cada revisão é um slice posicional
+    (iloc[a:b], sem cópia) encontrado num dict: buscar a semana ativa não varre as demais
+    revisões, e o custo não cresce com o histórico. Os índices originais das linhas são
+    preservados; 'original' é a base recebida, na ordem da aba. Compartilhado entre sessões:
+    os slices são somente leitura.
+    """
+
+    def __init__(self, df: Optional[pd.DataFrame], coluna: str = "Revisão"):
+        self.coluna = coluna
+        self._limites: Dict[Any, Tuple[int, int]] = {}
+        self.original = pd.DataFrame() if df is None else df
+        if df is None or df.empty or coluna not in df.columns:
+            self.df = self.original
+            return
+        codigos, revisoes = pd.factorize(df[coluna], sort=False)  # ordem de aparição; NaN = -1
+        ordem = np.argsort(codigos, kind="stable")
+        self.df = df.take(ordem)
+        codigos = codigos[ordem]
+        posicoes = np.arange(len(revisoes))
+        inicios = np.searchsorted(codigos, posicoes, side="left")
+        fins = np.searchsorted(codigos, posicoes, side="right")
+        self._limites = {rev: (int(a), int(b)) for rev, a, b in zip(revisoes, inicios, fins)}
+
+    def __contains__(self, revisao: Any) -> bool:
+        return revisao in self._limites
+
+    def __len__(self) -> int:
+        return len(self._limites)
+
+    def revisoes(self) -> List[Any]:
+        """Revisões na ordem em que aparecem na aba (a mais recente por último)."""
+        return list(self._limites)
+
+    def linhas(self, revisao: Any) -> int:
+        a, b = self._limites.get(revisao, (0, 0))
+        return b - a
+
+    def revisao(self, revisao: Any) -> pd.DataFrame:
+        """Linhas de uma revisão (slice sem cópia; vazio se não existir)."""
+        a, b = self._limites.get(revisao, (0, 0))
+        return self.df.iloc[a:b]
+
+    def varias(self, revisoes: Iterable[Any]) -> pd.DataFrame:
+        """Linhas de várias revisões, na ordem pedida (revisões inexistentes são ignoradas)."""
+        fatias = [self.revisao(r) for r in dict.fromkeys(revisoes) if r in self._limites]
+        if not fatias:
+            return self.df.iloc[0:0]
+        return fatias[0] if len(fatias) == 1 else pd.concat(fatias)
+
+    def estatisticas(self) -> dict:
+        tamanhos = [b - a for a, b in self._limites.values()]
+        return {
+            "revisoes": len(tamanhos),
+            "linhas": len(self.df),
+            "maior_revisao": max(tamanhos, default=0),
+        }
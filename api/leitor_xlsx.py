@@ -0,0 +1,302 @@
+import io
+import posixpath
+import re
+import zipfile
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+from xml.etree.ElementTree import iterparse
+
+import numpy as np
+import pandas as pd
+
+# =====================================================
+# Leitor streaming de UMA aba do .xlsx (sem openpyxl)
+# =====================================================
+# Lê do zip só a parte da aba pedida (xl/worksheets/sheetN.xml), os estilos (para saber
+# quais células são datas) e apenas as shared strings referenciadas por ela. As linhas são
+# processadas uma a uma direto para arrays por coluna, com custo constante por linha.
+# O resultado segue as regras do pd.read_excel(header=0): células vazias/NA viram NaN,
+# colunas numéricas viram int64/float64, cabeçalho vazio vira "Unnamed: i".
+
+_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# numFmtId embutidos do Excel que representam data/hora
+_FORMATOS_DATA_EMBUTIDOS = set(range(14, 23)) | set(range(27, 37)) | set(range(45, 48)) | set(range(50, 59))
+_RE_CODIGO_DATA = re.compile(r"[dmyhs]", re.IGNORECASE)
+_RE_LIMPA_FORMATO = re.compile(r'"[^"]*"|\[[^\]]*\]|\\.|_.|\*.')
+
+# textos lidos como NaN pelo read_excel (na_values padrão do pandas; cópia para não depender
+# de pandas._libs, que é privado)
+_NA = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+}
+
+
+class _RefSS:
+    """Referência a uma shared string, resolvida depois da leitura da aba."""
+    __slots__ = ("idx",)
+
+    def __init__(self, idx: int):
+        self.idx = idx
+
+
+def _codigo_eh_data(codigo: str) -> bool:
+    codigo = _RE_LIMPA_FORMATO.sub("", codigo)
+    if codigo.lower() == "general":
+        return False
+    return bool(_RE_CODIGO_DATA.search(codigo))
+
+def caminho_aba(zf: zipfile.ZipFile, nome_aba: str) -> Optional[str]:
+    """Resolve 'nome_aba' → caminho da parte XML via workbook.xml + workbook.xml.rels."""
+    rid = None
+    with zf.open("xl/workbook.xml") as f:
+        for _, el in iterparse(f):
+            if el.tag == _NS + "sheet" and el.get("name") == nome_aba:
+                rid = el.get(_NS_REL + "id")
+                break
+    if rid is None:
+        return None
+    with zf.open("xl/_rels/workbook.xml.rels") as f:
+        for _, el in iterparse(f):
+            if el.tag == _NS_PKG_REL + "Relationship" and el.get("Id") == rid:
+                alvo = el.get("Target")
+                if alvo.startswith("/"):
+                    return alvo.lstrip("/")
+                return posixpath.normpath(posixpath.join("xl", alvo))
+    return None
+
+def data_1904(zf: zipfile.ZipFile) -> bool:
+    with zf.open("xl/workbook.xml") as f:
+        for _, el in iterparse(f):
+            if el.tag == _NS + "workbookPr":
+                return el.get("date1904") in ("1", "true")
+    return False
+
+def estilos_data(zf: zipfile.ZipFile) -> List[bool]:
+    """Para cada índice de cellXfs (atributo s da célula), se o formato é de data."""
+    if "xl/styles.xml" not in zf.namelist():
+        return []
+    formatos: Dict[int, str] = {}
+    xfs: List[bool] = []
+    dentro_cellxfs = False
+    with zf.open("xl/styles.xml") as f:
+        for evento, el in iterparse(f, events=("start", "end")):
+            if el.tag == _NS + "cellXfs":
+                dentro_cellxfs = evento == "start"
+            elif evento == "end" and el.tag == _NS + "numFmt":
+                formatos[int(el.get("numFmtId"))] = el.get("formatCode") or ""
+            elif evento == "end" and el.tag == _NS + "xf" and dentro_cellxfs:
+                num_fmt = int(el.get("numFmtId") or 0)
+                if num_fmt in formatos:
+                    xfs.append(_codigo_eh_data(formatos[num_fmt]))
+                else:
+                    xfs.append(num_fmt in _FORMATOS_DATA_EMBUTIDOS)
+    return xfs
+
+def _serial_para_data(valor: float, data_1904: bool):
+    if data_1904:
+        base = datetime(1904, 1, 1)
+    elif valor < 60:
+        base = datetime(1899, 12, 31)  # bug do 29/02/1900 do Excel
+    else:
+        base = datetime(1899, 12, 30)
+    dt = base + timedelta(days=valor)
+    # arredonda para o microssegundo mais próximo do milissegundo (como o openpyxl)
+    micro = round(dt.microsecond / 1000) * 1000
+    if micro >= 1_000_000:
+        dt = dt.replace(microsecond=0) + timedelta(seconds=1)
+    else:
+        dt = dt.replace(microsecond=micro)
+    if 0 <= valor < 1:
+        return dt.time()
+    return dt
+
+def _indice_coluna(ref: str) -> int:
+    n = 0
+    for ch in ref:
+        if "A" <= ch <= "Z":
+            n = n * 26 + (ord(ch) - 64)
+        else:
+            break
+    return n - 1
+
+def _texto(el) -> str:
+    """Texto de <is>/<si>: concatena os <t>, ignorando a fonética (<rPh>)."""
+    partes = []
+    for filho in el:
+        if filho.tag == _NS + "t":
+            partes.append(filho.text or "")
+        elif filho.tag == _NS + "r":
+            t = filho.find(_NS + "t")
+            if t is not None:
+                partes.append(t.text or "")
+    return "".join(partes)
+
+def _converter_numero(texto: str):
+    valor = float(texto)
+    inteiro = int(valor)
+    return inteiro if inteiro == valor else valor
+
+def _ler_shared_strings(zf: zipfile.ZipFile, necessarias: Set[int]) -> Dict[int, str]:
+    """Lê só as shared strings usadas pela aba; para no maior índice necessário."""
+    if not necessarias or "xl/sharedStrings.xml" not in zf.namelist():
+        return {}
+    maior = max(necessarias)
+    achadas: Dict[int, str] = {}
+    idx = 0
+    with zf.open("xl/sharedStrings.xml") as f:
+        for _, el in iterparse(f):
+            if el.tag != _NS + "si":
+                continue
+            if idx in necessarias:
+                achadas[idx] = _texto(el)
+            el.clear()
+            if idx >= maior:
+                break
+            idx += 1
+    return achadas
+
+def _ler_colunas(zf: zipfile.ZipFile, caminho: str, estilos_data: List[bool], data_1904: bool):
+    """Percorre as linhas da aba acumulando os valores diretamente em arrays por coluna."""
+    colunas: List[list] = []
+    necessarias: Set[int] = set()
+    n_linhas = 0          # linhas já materializadas (inclui vazias intermediárias)
+    ultima_com_dado = -1  # índice da última linha com algum valor
+    sheet_data = None
+
+    with zf.open(caminho) as f:
+        for evento, el in iterparse(f, events=("start", "end")):
+            if evento == "start":
+                if el.tag == _NS + "sheetData":
+                    sheet_data = el
+                continue
+            if el.tag != _NS + "row":
+                continue
+
+            r = el.get("r")
+            idx_linha = int(r) - 1 if r else n_linhas
+            # linhas puladas no XML (vazias) entram como vazias
+            while n_linhas < idx_linha:
+                for col in colunas:
+                    col.append(None)
+                n_linhas += 1
+
+            valores: Dict[int, object] = {}
+            proxima_col = 0
+            for c in el:
+                if c.tag != _NS + "c":
+                    continue
+                ref = c.get("r")
+                idx_col = _indice_coluna(ref) if ref else proxima_col
+                proxima_col = idx_col + 1
+                tipo = c.get("t", "n")
+                if tipo == "inlineStr":
+                    is_ = c.find(_NS + "is")
+                    valor = _texto(is_) if is_ is not None else None
+                else:
+                    v = c.find(_NS + "v")
+                    texto = v.text if v is not None else None
+                    if texto is None:
+                        valor = None
+                    elif tipo == "s":
+                        valor = _RefSS(int(texto))
+                        necessarias.add(valor.idx)
+                    elif tipo == "n":
+                        s = c.get("s")
+                        if s is not None and int(s) < len(estilos_data) and estilos_data[int(s)]:
+                            valor = _serial_para_data(float(texto), data_1904)
+                        else:
+                            valor = _converter_numero(texto)
+                    elif tipo == "b":
+                        valor = texto == "1"
+                    elif tipo == "d":
+                        valor = datetime.fromisoformat(texto)
+                    elif tipo == "e":
+                        valor = None
+                    else:  # "str" (resultado de fórmula)
+                        valor = texto
+                if valor is not None and valor != "":
+                    valores[idx_col] = valor
+
+            if valores:
+                largura = max(valores) + 1
+                while len(colunas) < largura:
+                    colunas.append([None] * n_linhas)
+                ultima_com_dado = n_linhas
+            for i, col in enumerate(colunas):
+                col.append(valores.get(i))
+            n_linhas += 1
+
+            el.clear()
+            if sheet_data is not None:
+                sheet_data.clear()  # mantém a memória constante por linha
+
+    # descarta linhas vazias no final (como o read_excel)
+    for col in colunas:
+        del col[ultima_com_dado + 1:]
+    return colunas, necessarias
+
+def _serie(valores: list) -> pd.Series:
+    """Inferência de tipo por coluna no estilo do read_excel."""
+    valores = [None if (isinstance(v, str) and v in _NA) else v for v in valores]
+    s = pd.Series(valores, dtype=object)
+    presentes = s.dropna()
+    if presentes.empty:
+        return s.astype("float64") if len(s) else s
+    if presentes.map(lambda v: isinstance(v, bool)).all():
+        # com vazios o read_excel entrega 1.0/0.0/NaN
+        return s.astype("float64") if s.isna().any() else s.astype(bool)
+    if presentes.map(lambda v: isinstance(v, datetime)).all():
+        return pd.to_datetime(s)
+    try:
+        return pd.to_numeric(s)
+    except (ValueError, TypeError):
+        return s.where(s.notna(), np.nan)
+
+def _nomes_colunas(cabecalho: list) -> list:
+    nomes = []
+    vistos: Dict[object, int] = {}
+    for i, v in enumerate(cabecalho):
+        nome = f"Unnamed: {i}" if v is None else v
+        if nome in vistos:
+            vistos[nome] += 1
+            novo = f"{nome}.{vistos[nome]}"
+            while novo in vistos:
+                vistos[nome] += 1
+                novo = f"{nome}.{vistos[nome]}"
+            vistos[novo] = 0
+            nome = novo
+        else:
+            vistos[nome] = 0
+        nomes.append(nome)
+    return nomes
+
+def ler_aba_xlsx(content: bytes, nome_aba: str) -> Optional[pd.DataFrame]:
+    """
+    Lê uma única aba do .xlsx em streaming, sem carregar o workbook inteiro.
+    Retorna None se a aba não existir.
+    """
+    with zipfile.ZipFile(io.BytesIO(content)) as zf:
+        caminho = caminho_aba(zf, nome_aba)
+        if caminho is None or caminho not in zf.namelist():
+            return None
+        colunas, necessarias = _ler_colunas(zf, caminho, estilos_data(zf), data_1904(zf))
+        strings = _ler_shared_strings(zf, necessarias)
+
+    if necessarias:
+        for col in colunas:
+            for i, v in enumerate(col):
+                if isinstance(v, _RefSS):
+                    col[i] = strings.get(v.idx)
+
+    if not colunas or not colunas[0]:
+        return pd.DataFrame()
+    cabecalho = [col[0] if col else None for col in colunas]
+    nomes = _nomes_colunas(cabecalho)
+    dados = {i: _serie(col[1:]) for i, col in enumerate(colunas)}
+    df = pd.DataFrame(dados)
+    df.columns = nomes
+    return df
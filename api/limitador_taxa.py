@@ -0,0 +1,121 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+# =====================================================
+# Limitador de taxa (token bucket) com fila por prioridade
+# =====================================================
+
+# prioridades: menor número passa na frente
+PRIORIDADE_SALVAR = 0
+PRIORIDADE_INTERATIVA = 1
+PRIORIDADE_FUNDO = 2
+
+_NOMES_PRIORIDADE = {PRIORIDADE_SALVAR: "salvar", PRIORIDADE_INTERATIVA: "interativa", PRIORIDADE_FUNDO: "fundo"}
+_PRIORIDADE_THREAD = threading.local()
+
+
+@contextmanager
+def prioridade(valor: int) -> Iterator[None]:
+    """Define a prioridade das chamadas feitas pela thread atual dentro do bloco."""
+    anterior = getattr(_PRIORIDADE_THREAD, "valor", PRIORIDADE_INTERATIVA)
+    _PRIORIDADE_THREAD.valor = valor
+    try:
+        yield
+    finally:
+        _PRIORIDADE_THREAD.valor = anterior
+
+def prioridade_atual() -> int:
+    return getattr(_PRIORIDADE_THREAD, "valor", PRIORIDADE_INTERATIVA)
+
+
+class BaldeTokens:
+    """
+    Token bucket compartilhado por todas as threads: 'taxa' fichas por segundo, até
+    'capacidade' acumuladas (rajada). Quem não encontra ficha espera numa fila ordenada
+    por (prioridade, chegada): um salvamento passa na frente de uma atualização de fundo.
+    taxa <= 0 desliga o limite (adquirir() retorna na hora).
+    """
+
+    def __init__(self, taxa: float, capacidade: float, amostras: int = 1000):
+        self.taxa = taxa
+        self.capacidade = max(capacidade, 1.0)
+        self._cond = threading.Condition()
+        self._fichas = self.capacidade
+        self._ultimo = time.monotonic()
+        self._fila: list = []
+        self._seq = itertools.count()
+        self._esperas = deque(maxlen=amostras)
+        self.stats = {"chamadas": 0, "esperaram": 0, "espera_total_s": 0.0, "espera_max_s": 0.0}
+        self._por_prioridade: Dict[str, Dict[str, float]] = {}
+
+    def _repor(self) -> None:
+        agora = time.monotonic()
+        self._fichas = min(self.capacidade, self._fichas + (agora - self._ultimo) * self.taxa)
+        self._ultimo = agora
+
+    def adquirir(self, fichas: float = 1.0, prioridade: int = PRIORIDADE_INTERATIVA) -> float:
+        """Bloqueia até haver 'fichas' disponíveis; retorna o tempo de espera na fila (s)."""
+        if self.taxa <= 0:
+            return 0.0
+        fichas = min(fichas, self.capacidade)
+        t0 = time.monotonic()
+        with self._cond:
+            senha = (prioridade, next(self._seq))
+            heapq.heappush(self._fila, senha)
+            while True:
+                self._repor()
+                if self._fila[0] == senha:
+                    if self._fichas >= fichas:
+                        heapq.heappop(self._fila)
+                        self._fichas -= fichas
+                        self._cond.notify_all()  # o próximo da fila reavalia
+                        break
+                    self._cond.wait((fichas - self._fichas) / self.taxa)
+                else:
+                    self._cond.wait()
+            espera = time.monotonic() - t0
+            self._registrar(espera, prioridade)
+        return espera
+
+    def _registrar(self, espera: float, prioridade: int) -> None:
+        self.stats["chamadas"] += 1
+        self.stats["esperaram"] += int(espera > 0.001)
+        self.stats["espera_total_s"] += espera
+        self.stats["espera_max_s"] = max(self.stats["espera_max_s"], espera)
+        self._esperas.append(espera)
+        nome = _NOMES_PRIORIDADE.get(prioridade, str(prioridade))
+        p = self._por_prioridade.setdefault(nome, {"chamadas": 0, "espera_total_s": 0.0})
+        p["chamadas"] += 1
+        p["espera_total_s"] += espera
+
+    def estatisticas(self) -> dict:
+        with self._cond:
+            dados = dict(self.stats)
+            esperas = sorted(self._esperas)
+            dados["espera_p50_ms"] = round(esperas[len(esperas) // 2] * 1000, 1) if esperas else 0.0
+            dados["espera_p95_ms"] = round(esperas[int(len(esperas) * 0.95)] * 1000, 1) if esperas else 0.0
+            dados["espera_media_ms"] = round(dados["espera_total_s"] / dados["chamadas"] * 1000, 1) if dados["chamadas"] else 0.0
+            dados["na_fila"] = len(self._fila)
+            dados["por_prioridade"] = {k: dict(v) for k, v in self._por_prioridade.items()}
+        return dados
+
+
+class LimitadorTaxa:
+    """Dois baldes independentes: leituras (GET e $batch) e escritas (PUT/PATCH/POST/DELETE)."""
+
+    def __init__(self, taxa_leitura: float, rajada_leitura: float, taxa_escrita: float, rajada_escrita: float):
+        self.baldes = {
+            "leitura": BaldeTokens(taxa_leitura, rajada_leitura),
+            "escrita": BaldeTokens(taxa_escrita, rajada_escrita),
+        }
+
+    def adquirir(self, tipo: str, fichas: float = 1.0) -> float:
+        return self.baldes[tipo].adquirir(fichas, prioridade_atual())
+
+    def estatisticas(self) -> Dict[str, dict]:
+        return {nome: balde.estatisticas() for nome, balde in self.baldes.items()}
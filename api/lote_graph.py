@@ -0,0 +1,97 @@
+import base64
+import json
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from api.politica_retry import (
+    STATUS_REPETIR,
+    STATUS_SOBRECARGA,
+    CircuitoAberto,
+    PoliticaRetry,
+    retry_after,
+)
+
+# =====================================================
+# JSON $batch do Graph: várias chamadas de metadados em uma ida e volta
+# =====================================================
+
+LIMITE_POR_LOTE = 20  # máximo de requisições por $batch aceito pelo Graph
+
+
+class RespostaLote:
+    """Resposta de uma requisição dentro do $batch (interface mínima de requests.Response)."""
+    __slots__ = ("status_code", "headers", "corpo")
+
+    def __init__(self, status_code: int, headers: Optional[dict], corpo):
+        self.status_code = status_code
+        self.headers = {k.lower(): v for k, v in (headers or {}).items()}
+        self.corpo = corpo
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status_code < 400
+
+    def json(self):
+        if isinstance(self.corpo, str):
+            # corpos não JSON vêm em base64; JSON embutido como texto também acontece
+            try:
+                return json.loads(self.corpo)
+            except ValueError:
+                return json.loads(base64.b64decode(self.corpo))
+        return self.corpo
+
+    def raise_for_status(self) -> None:
+        if not self.ok:
+            raise requests.exceptions.HTTPError(f"{self.status_code} em requisição do $batch", response=self)
+
+    def __repr__(self) -> str:
+        return f"RespostaLote({self.status_code})"
+
+
+def _pedido(resposta: RespostaLote) -> Tuple[float, bool]:
+    """Ordem de gravidade: maior Retry-After e, no empate, sobrecarga (conta para o disjuntor)."""
+    erro = requests.exceptions.HTTPError(response=resposta)
+    return retry_after(erro) or 0.0, resposta.status_code in STATUS_SOBRECARGA
+
+def executar_lote(enviar: Callable[[dict], dict], requisicoes: List[dict], politica: PoliticaRetry,
+                  classe: str = "metadados", tentativas: int = 4) -> List[RespostaLote]:
+    """
+    Envia 'requisicoes' ({"method", "url" relativo à versão, "headers"?, "body"?}) em lotes
+    de até LIMITE_POR_LOTE via 'enviar' (uma tentativa de POST em /$batch, devolve o JSON).
+    Cada rodada passa pela 'politica' da 'classe' (disjuntor, pausa do Retry-After, orçamento):
+    respostas 423/429/5xx de requisições individuais fazem a rodada falhar com a mais grave
+    delas, e a próxima reenvia só essas, até 'tentativas' vezes; se a política desistir, elas
+    ficam como vieram. Retorna as respostas na mesma ordem das requisições.
+    """
+    respostas: Dict[int, RespostaLote] = {}
+    pendentes = list(range(len(requisicoes)))
+
+    def _rodada() -> None:
+        repetir: List[int] = []
+        for ini in range(0, len(pendentes), LIMITE_POR_LOTE):
+            grupo = pendentes[ini:ini + LIMITE_POR_LOTE]
+            corpo = {"requests": [dict(requisicoes[i], id=str(i)) for i in grupo]}
+            for item in enviar(corpo).get("responses", []):
+                i = int(item["id"])
+                respostas[i] = RespostaLote(int(item.get("status", 500)), item.get("headers"), item.get("body"))
+                if respostas[i].status_code in STATUS_REPETIR:
+                    repetir.append(i)
+        pendentes[:] = sorted(repetir)
+        if repetir:
+            pior = max((respostas[i] for i in repetir), key=_pedido)
+            raise requests.exceptions.HTTPError(
+                f"{len(repetir)} requisição(ões) do $batch a repetir ({pior.status_code})", response=pior)
+
+    try:
+        politica.executar(classe, _rodada, tentativas=tentativas)
+    except requests.exceptions.HTTPError as e:
+        if not isinstance(e.response, RespostaLote):
+            raise  # o próprio POST do lote falhou
+    except CircuitoAberto:
+        if len(respostas) < len(requisicoes):
+            raise
+    faltando = [i for i in range(len(requisicoes)) if i not in respostas]
+    if faltando:
+        raise RuntimeError(f"$batch sem resposta para as requisições {faltando}")
+    return [respostas[i] for i in range(len(requisicoes))]
@@ -0,0 +1,72 @@
+import threading
+import time
+from typing import Callable, Optional
+
+# =====================================================
+# Observador do ETag em segundo plano (pré-aquece antes do usuário pedir)
+# =====================================================
+
+class ObservadorEtag:
+    """
+    Thread que chama 'verificar' a cada 'intervalo_s' segundos (ou imediatamente após
+    notificar(), p.ex. a partir de um webhook). 'verificar' retorna True quando encontrou
+    e publicou uma versão nova. Enquanto a última verificação bem-sucedida tiver no máximo
+    'max_defasagem_s' segundos, recente() é True e as leituras podem dispensar a consulta
+    de metadados no momento da requisição.
+    """
+
+    def __init__(self, verificar: Callable[[], bool], intervalo_s: float, max_defasagem_s: float):
+        self._verificar = verificar
+        self.intervalo_s = intervalo_s
+        self.max_defasagem_s = max_defasagem_s
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._ultima_ok = 0.0
+        self.stats = {"verificacoes": 0, "mudancas": 0, "falhas": 0}
+
+    def iniciar(self) -> "ObservadorEtag":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="observador-etag", daemon=True)
+            self._thread.start()
+        return self
+
+    def parar(self) -> None:
+        self._parar.set()
+        self._acordar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def notificar(self) -> None:
+        """Força uma verificação agora (ex.: notificação de alteração recebida)."""
+        self._acordar.set()
+
+    def recente(self) -> bool:
+        with self._lock:
+            return self._ultima_ok > 0 and time.time() - self._ultima_ok <= self.max_defasagem_s
+
+    def _loop(self) -> None:
+        # a primeira verificação espera um intervalo: na partida quem baixa é a própria requisição
+        while True:
+            self._acordar.wait(self.intervalo_s)
+            self._acordar.clear()
+            if self._parar.is_set():
+                break
+            try:
+                mudou = self._verificar()
+            except Exception:
+                with self._lock:
+                    self.stats["falhas"] += 1
+            else:
+                with self._lock:
+                    self.stats["verificacoes"] += 1
+                    self.stats["mudancas"] += int(bool(mudou))
+                    self._ultima_ok = time.time()
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            dados = dict(self.stats)
+            dados["ultima_verificacao_ha_s"] = time.time() - self._ultima_ok if self._ultima_ok else None
+        return dados
@@ -0,0 +1,180 @@
+import io
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from api.cache_colunar import CacheColunar
+from api.leitor_xlsx import ler_aba_xlsx
+
+# =====================================================
+# Workbook parseado uma única vez por ETag
+# =====================================================
+
+class PlanilhaParseada:
+    """
+    Visão de uma versão (ETag) do workbook: abre o zip uma vez (pd.ExcelFile) e parseia
+    cada aba no máximo uma vez, sob demanda. Os DataFrames devolvidos são compartilhados
+    entre sessões — trate-os como somente leitura (copie antes de alterar).
+    Ordem de consulta por aba: memória → cache colunar (se houver) → XML (read_excel).
+    Com engine="streaming" o XML da aba é lido direto do zip (api.leitor_xlsx), sem abrir
+    o workbook inteiro nem esperar o parse de outras abas — ideal para abas pequenas.
+    """
+
+    ENGINES = ("openpyxl", "streaming")
+
+    def __init__(self, etag: Optional[str], content: bytes, colunar: Optional[CacheColunar] = None):
+        self.etag = etag
+        self._content = content
+        self._colunar = colunar
+        self._lock = threading.RLock()  # ExcelFile não é thread-safe: parse serializado
+        self._lock_stats = threading.Lock()
+        self._xls: Optional[pd.ExcelFile] = None
+        self._abas: Dict[Tuple[str, str], Optional[pd.DataFrame]] = {}  # (aba, engine)
+        self._derivados: Dict[Tuple[str, str], Any] = {}
+        self._lock_derivados = threading.Lock()
+        self._tempo_parse: Dict[Tuple[str, str], float] = {}
+        self.stats = {"parses": 0, "acertos": 0, "acertos_colunar": 0,
+                      "tempo_parse_s": 0.0, "tempo_economizado_s": 0.0}
+
+    def _excel_file(self) -> pd.ExcelFile:
+        if self._xls is None:
+            t0 = time.perf_counter()
+            self._xls = pd.ExcelFile(io.BytesIO(self._content), engine="openpyxl")
+            with self._lock_stats:
+                self.stats["tempo_parse_s"] += time.perf_counter() - t0
+        return self._xls
+
+    def nomes_abas(self) -> List[str]:
+        with self._lock:
+            return list(self._excel_file().sheet_names)
+
+    @staticmethod
+    def _chave_colunar(nome: str, engine: str) -> str:
+        # openpyxl mantém a chave antiga (só a aba): os arquivos já gravados continuam valendo
+        return nome if engine == "openpyxl" else f"{nome}@{engine}"
+
+    def aba(self, nome: str, engine: str = "openpyxl") -> Optional[pd.DataFrame]:
+        """
+        DataFrame da aba (compartilhado) ou None se a aba não existir. Cada engine tem sua
+        própria entrada (memória e cache colunar): os tipos lidos podem diferir entre eles.
+        """
+        if engine not in self.ENGINES:
+            raise ValueError(f"engine inválido: {engine!r} (use {', '.join(self.ENGINES)})")
+        chave = (nome, engine)
+        if chave in self._abas:
+            return self._acerto(chave)
+        if engine == "streaming":
+            return self._aba_streaming(nome)
+        with self._lock:
+            if chave in self._abas:  # outra thread parseou enquanto esperávamos
+                return self._acerto(chave)
+
+            chave_colunar = self._chave_colunar(nome, engine)
+            t0 = time.perf_counter()
+            df = self._colunar.obter(self.etag, chave_colunar) if self._colunar is not None else None
+            if df is not None:
+                with self._lock_stats:
+                    self.stats["acertos_colunar"] += 1
+            else:
+                xls = self._excel_file()
+                if nome in xls.sheet_names:
+                    df = pd.read_excel(xls, sheet_name=nome)
+                    with self._lock_stats:
+                        self.stats["parses"] += 1
+                    if self._colunar is not None:
+                        self._colunar.gravar(self.etag, chave_colunar, df)
+            dt = time.perf_counter() - t0
+            with self._lock_stats:
+                self._tempo_parse[chave] = dt
+                self.stats["tempo_parse_s"] += dt
+            self._abas[chave] = df
+            return df
+
+    def _aba_streaming(self, nome: str) -> Optional[pd.DataFrame]:
+        # fora do lock de parse: uma aba pequena não espera o parse da "Base de Dados"
+        chave = (nome, "streaming")
+        chave_colunar = self._chave_colunar(nome, "streaming")
+        t0 = time.perf_counter()
+        df = self._colunar.obter(self.etag, chave_colunar) if self._colunar is not None else None
+        if df is not None:
+            with self._lock_stats:
+                self.stats["acertos_colunar"] += 1
+        else:
+            df = ler_aba_xlsx(self._content, nome)
+            with self._lock_stats:
+                self.stats["parses"] += 1
+            if df is not None and self._colunar is not None:
+                self._colunar.gravar(self.etag, chave_colunar, df)
+        dt = time.perf_counter() - t0
+        with self._lock:
+            if chave in self._abas:  # outra thread chegou antes: mantém uma única cópia
+                return self._abas[chave]
+            with self._lock_stats:
+                self._tempo_parse[chave] = dt
+                self.stats["tempo_parse_s"] += dt
+            self._abas[chave] = df
+            return df
+
+    def derivado(self, nome: str, chave: str, funcao: Callable[[pd.DataFrame], Any]) -> Any:
+        """
+        funcao(aba) calculada uma única vez nesta versão (ex.: a aba tipada e indexada) e compartilhada
+        como a própria aba — somente leitura. Aba inexistente chega como DataFrame vazio.
+        """
+        if (nome, chave) in self._derivados:
+            return self._derivados[(nome, chave)]
+        df = self.aba(nome)
+        with self._lock_derivados:
+            if (nome, chave) not in self._derivados:
+                self._derivados[(nome, chave)] = funcao(pd.DataFrame() if df is None else df)
+            return self._derivados[(nome, chave)]
+
+    def estatisticas(self) -> dict:
+        with self._lock_stats:
+            return dict(self.stats)
+
+    def _acerto(self, chave: Tuple[str, str]) -> Optional[pd.DataFrame]:
+        with self._lock_stats:
+            self.stats["acertos"] += 1
+            self.stats["tempo_economizado_s"] += self._tempo_parse.get(chave, 0.0)
+        return self._abas[chave]
+
+
+class RegistroPlanilhas:
+    """Mantém as PlanilhaParseada das últimas 'max_versoes' ETags (LRU), compartilhadas no processo."""
+
+    def __init__(self, max_versoes: int = 2, colunar: Optional[CacheColunar] = None):
+        self.max_versoes = max_versoes
+        self.colunar = colunar
+        self._lock = threading.Lock()
+        self._planilhas: "OrderedDict[str, PlanilhaParseada]" = OrderedDict()
+        self._descartadas = {"parses": 0, "acertos": 0, "acertos_colunar": 0,
+                             "tempo_parse_s": 0.0, "tempo_economizado_s": 0.0}
+
+    def obter(self, etag: Optional[str], content: bytes) -> PlanilhaParseada:
+        if not etag:
+            # sem ETag não há como reaproveitar com segurança: visão avulsa
+            return PlanilhaParseada(None, content)
+        with self._lock:
+            planilha = self._planilhas.get(etag)
+            if planilha is None:
+                planilha = PlanilhaParseada(etag, content, self.colunar)
+                self._planilhas[etag] = planilha
+                while len(self._planilhas) > self.max_versoes:
+                    _, antiga = self._planilhas.popitem(last=False)
+                    for k, v in antiga.estatisticas().items():
+                        self._descartadas[k] += v
+            else:
+                self._planilhas.move_to_end(etag)
+            return planilha
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            total = dict(self._descartadas)
+            for planilha in self._planilhas.values():
+                for k, v in planilha.estatisticas().items():
+                    total[k] += v
+            total["versoes_em_memoria"] = len(self._planilhas)
+        return total
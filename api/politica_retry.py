@@ -0,0 +1,219 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+import requests
+
+T = TypeVar("T")
+
+# =====================================================
+# Política de retry única: Retry-After + disjuntor + orçamento por classe de endpoint
+# =====================================================
+
+STATUS_REPETIR = (423, 429, 502, 503, 504)
+STATUS_SOBRECARGA = (429, 502, 503, 504)  # contam para o disjuntor (423 = arquivo em uso, não é sobrecarga)
+
+
+class CircuitoAberto(Exception):
+    """Disjuntor aberto (ou pausa pedida pelo Retry-After) para a classe: não vai à rede agora."""
+
+    def __init__(self, classe: str, restante_s: float):
+        super().__init__(f"Graph indisponível para '{classe}' por mais {restante_s:.1f}s (disjuntor aberto).")
+        self.classe = classe
+        self.restante_s = restante_s
+
+
+def status_http(erro: BaseException) -> Optional[int]:
+    return getattr(getattr(erro, "response", None), "status_code", None)
+
+def retry_after(erro: BaseException) -> Optional[float]:
+    """Segundos pedidos no header Retry-After (número ou data HTTP); None se ausente."""
+    headers = getattr(getattr(erro, "response", None), "headers", None) or {}
+    valor = headers.get("Retry-After") or headers.get("retry-after")
+    if not valor:
+        return None
+    try:
+        return max(float(valor), 0.0)
+    except ValueError:
+        try:
+            return max(parsedate_to_datetime(valor).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return None
+
+
+class _Classe:
+    """Estado compartilhado de uma classe de endpoint (metadados, download, upload, token)."""
+
+    def __init__(self, orcamento_inicial: float):
+        self.falhas_seguidas = 0
+        self.aberto_ate = 0.0     # disjuntor aberto até (epoch)
+        self.pausa_ate = 0.0      # Retry-After recebido por qualquer sessão
+        self.sondando = False     # meio-aberto: uma única chamada de teste em andamento
+        self.orcamento = orcamento_inicial
+        self.stats = {"chamadas": 0, "sucessos": 0, "repeticoes": 0, "falhas": 0, "retry_after": 0,
+                      "sem_orcamento": 0, "rejeitadas": 0, "aberturas": 0}
+
+
+class PoliticaRetry:
+    """
+    Uma instância por processo, compartilhada por todas as sessões.
+    - Respostas 423/429/5xx e erros de rede são repetidos com backoff exponencial, mas se
+      vier Retry-After ele manda: a espera vale para a classe inteira (as outras sessões
+      também aguardam em vez de insistir).
+    - Disjuntor por classe: 'limiar_falhas' falhas de sobrecarga seguidas abrem o circuito
+      por 'janela_s' segundos (ou o Retry-After, se maior); depois, uma chamada de teste
+      fecha (sucesso) ou reabre (falha). Aberto, executar() levanta CircuitoAberto na hora.
+    - Orçamento de retry por classe: cada repetição gasta 1; cada chamada bem-sucedida
+      devolve 'razao_orcamento' (até 'orcamento_max'). Sem saldo, o erro sobe sem repetir.
+    """
+
+    def __init__(self, tentativas: int = 5, base: float = 1.6, jitter: float = 0.8, espera_max: float = 10.0,
+                 retry_after_max: float = 60.0, limiar_falhas: int = 5, janela_s: float = 30.0,
+                 razao_orcamento: float = 0.2, orcamento_max: float = 20.0):
+        self.tentativas = tentativas
+        self.base = base
+        self.jitter = jitter
+        self.espera_max = espera_max            # teto do backoff exponencial
+        self.retry_after_max = retry_after_max  # teto para o Retry-After informado pelo servidor
+        self.limiar_falhas = limiar_falhas
+        self.janela_s = janela_s
+        self.razao_orcamento = razao_orcamento
+        self.orcamento_max = orcamento_max
+        self._lock = threading.Lock()
+        self._classes: Dict[str, _Classe] = {}
+
+    def _classe(self, nome: str) -> _Classe:
+        c = self._classes.get(nome)
+        if c is None:
+            c = self._classes[nome] = _Classe(self.orcamento_max)
+        return c
+
+    def restante_bloqueio(self, classe: str) -> float:
+        """Segundos até a classe voltar a aceitar chamadas (0 = disponível)."""
+        with self._lock:
+            c = self._classe(classe)
+            return max(c.aberto_ate - time.time(), c.pausa_ate - time.time(), 0.0)
+
+    def disponivel(self, classe: str) -> bool:
+        return self.restante_bloqueio(classe) <= 0
+
+    def _antes(self, classe: str) -> None:
+        """Aplica disjuntor e pausa do Retry-After antes de uma tentativa."""
+        with self._lock:
+            c = self._classe(classe)
+            agora = time.time()
+            if c.aberto_ate > agora or (c.aberto_ate and c.sondando):
+                c.stats["rejeitadas"] += 1
+                raise CircuitoAberto(classe, max(c.aberto_ate - agora, 0.0))
+            if c.aberto_ate:
+                c.sondando = True  # meio-aberto: esta chamada testa o serviço
+            c.stats["chamadas"] += 1
+            pausa = c.pausa_ate - agora
+        if pausa > 0:
+            time.sleep(min(pausa, self.retry_after_max))
+
+    def _sucesso(self, classe: str) -> None:
+        with self._lock:
+            c = self._classe(classe)
+            c.stats["sucessos"] += 1
+            c.falhas_seguidas = 0
+            c.aberto_ate = 0.0
+            c.sondando = False
+            c.orcamento = min(c.orcamento + self.razao_orcamento, self.orcamento_max)
+
+    def _falha(self, classe: str, erro: BaseException, ultima: bool) -> Tuple[bool, Optional[float]]:
+        """Registra a falha; retorna (repetir?, espera pedida pelo Retry-After)."""
+        status = status_http(erro)
+        with self._lock:
+            c = self._classe(classe)
+            if isinstance(erro, requests.exceptions.HTTPError) and status not in STATUS_REPETIR:
+                # o serviço respondeu (404, 412...): não é sobrecarga, fecha o circuito
+                c.falhas_seguidas = 0
+                c.aberto_ate = 0.0
+                c.sondando = False
+                return False, None
+            agora = time.time()
+            pedido = retry_after(erro)
+            if pedido is not None:
+                c.stats["retry_after"] += 1
+                c.pausa_ate = max(c.pausa_ate, agora + min(pedido, self.retry_after_max))
+            if status is None or status in STATUS_SOBRECARGA:
+                c.falhas_seguidas += 1
+                if c.sondando or c.falhas_seguidas >= self.limiar_falhas:
+                    c.aberto_ate = agora + max(self.janela_s, pedido or 0.0)
+                    c.sondando = False
+                    c.stats["aberturas"] += 1
+                    return False, pedido
+            if ultima:
+                return False, pedido
+            if c.orcamento < 1:
+                c.stats["sem_orcamento"] += 1
+                return False, pedido
+            c.orcamento -= 1
+            c.stats["repeticoes"] += 1
+            return True, pedido
+
+    def executar(self, classe: str, func: Callable[[], T], tentativas: Optional[int] = None,
+                 espera_inicial: float = 1.0,
+                 ao_esperar: Optional[Callable[[BaseException, float, int, int], None]] = None) -> T:
+        """
+        Executa 'func' com a política da 'classe'. 'ao_esperar(erro, espera, tentativa, total)'
+        é chamado antes de cada nova tentativa (ex.: aviso na tela).
+        """
+        total = tentativas or self.tentativas
+        tentativa = 0
+        while True:
+            tentativa += 1
+            self._antes(classe)
+            try:
+                resultado = func()
+            except (requests.exceptions.HTTPError, requests.exceptions.Timeout,
+                    requests.exceptions.ConnectionError) as e:
+                repetir, pedido = self._falha(classe, e, ultima=tentativa >= total)
+                if not repetir:
+                    with self._lock:
+                        self._classe(classe).stats["falhas"] += 1
+                    raise
+                if pedido is not None:
+                    espera = min(pedido, self.retry_after_max)
+                else:
+                    espera = min(espera_inicial * self.base ** (tentativa - 1) + random.uniform(0, self.jitter),
+                                 self.espera_max)
+                if ao_esperar is not None:
+                    ao_esperar(e, espera, tentativa, total)
+                # com Retry-After, a pausa da classe já cobre a espera (aplicada em _antes)
+                if pedido is None:
+                    time.sleep(espera)
+            except CircuitoAberto as e:
+                # circuito de uma chamada interna (outra classe): espera ele reabrir, sem contar falha aqui
+                with self._lock:
+                    self._classe(classe).sondando = False
+                if tentativa >= total:
+                    raise
+                espera = min(max(e.restante_s, 0.1), self.retry_after_max)
+                if ao_esperar is not None:
+                    ao_esperar(e, espera, tentativa, total)
+                time.sleep(espera)
+            except BaseException:
+                with self._lock:
+                    c = self._classe(classe)
+                    c.sondando = False
+                    c.stats["falhas"] += 1
+                raise
+            else:
+                self._sucesso(classe)
+                return resultado
+
+    def estatisticas(self) -> Dict[str, dict]:
+        with self._lock:
+            agora = time.time()
+            dados = {}
+            for nome, c in self._classes.items():
+                d = dict(c.stats)
+                d["orcamento"] = round(c.orcamento, 2)
+                d["estado"] = "aberto" if c.aberto_ate > agora else ("meio-aberto" if c.aberto_ate else "fechado")
+                d["pausa_s"] = round(max(c.pausa_ate - agora, 0.0), 2)
+                dados[nome] = d
+        return dados
@@ -0,0 +1,95 @@
+import json
+import os
+import threading
+from typing import Callable, Optional, Tuple
+
+from api.cache_disco import gravar_atomico
+
+Ids = Tuple[str, str, str]  # (site_id, drive_id, item_id)
+
+# =====================================================
+# IDs do arquivo no SharePoint: memória → arquivo local → rede
+# =====================================================
+
+class ResolvedorIds:
+    """
+    Guarda (site_id, drive_id, item_id) do arquivo, persistidos em 'caminho_arquivo'
+    (JSON compartilhado, uma entrada por 'chave'). Os IDs persistidos NÃO são conferidos
+    na partida: quem usa chama invalidar() quando o Graph responder 404 e a próxima
+    chamada a obter() resolve de novo pela rede ('resolver').
+    'caminho_arquivo' vazio desliga a persistência (só memória).
+    """
+
+    def __init__(self, resolver: Callable[[], Ids], caminho_arquivo: str, chave: str):
+        self._resolver = resolver
+        self.caminho_arquivo = caminho_arquivo
+        self.chave = chave
+        self._lock = threading.Lock()
+        self._ids: Optional[Ids] = None
+        self._arquivo_lido = False
+        self.stats = {"resolucoes_rede": 0, "lidos_do_arquivo": 0, "invalidacoes": 0}
+
+    def _ler_arquivo(self) -> dict:
+        try:
+            with open(self.caminho_arquivo, "r", encoding="utf-8") as f:
+                dados = json.load(f)
+            return dados if isinstance(dados, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _gravar_arquivo(self, ids: Optional[Ids]) -> None:
+        dados = self._ler_arquivo()
+        if ids is None:
+            dados.pop(self.chave, None)
+        else:
+            dados[self.chave] = dict(zip(("site_id", "drive_id", "item_id"), ids))
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.caminho_arquivo)), exist_ok=True)
+            gravar_atomico(self.caminho_arquivo, json.dumps(dados, ensure_ascii=False, indent=2).encode("utf-8"))
+        except OSError:
+            pass  # persistência é só otimização da partida a frio
+
+    def conhecidos(self) -> Optional[Ids]:
+        """IDs em memória ou no arquivo local, sem ir à rede (None se ainda não resolvidos)."""
+        with self._lock:
+            if self._ids is None and not self._arquivo_lido and self.caminho_arquivo:
+                self._arquivo_lido = True
+                entrada = self._ler_arquivo().get(self.chave) or {}
+                ids = tuple(entrada.get(k) for k in ("site_id", "drive_id", "item_id"))
+                if all(isinstance(v, str) and v for v in ids):
+                    self._ids = ids
+                    self.stats["lidos_do_arquivo"] += 1
+            return self._ids
+
+    def obter(self) -> Ids:
+        ids = self.conhecidos()
+        if ids is not None:
+            return ids
+        # resolução sob o lock: sessões simultâneas na partida fazem uma única resolução
+        with self._lock:
+            if self._ids is None:
+                self._ids = tuple(self._resolver())
+                self.stats["resolucoes_rede"] += 1
+                if self.caminho_arquivo:
+                    self._gravar_arquivo(self._ids)
+            return self._ids
+
+    def invalidar(self, ids: Ids) -> bool:
+        """
+        Descarta 'ids' (os que receberam 404). Se outra thread já os trocou, não faz nada,
+        para não jogar fora uma resolução nova. Retorna True se descartou.
+        """
+        with self._lock:
+            if self._ids != tuple(ids):
+                return False
+            self._ids = None
+            self.stats["invalidacoes"] += 1
+            if self.caminho_arquivo:
+                self._gravar_arquivo(None)
+            return True
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            dados = dict(self.stats)
+            dados["resolvidos"] = self._ids is not None
+        return dados
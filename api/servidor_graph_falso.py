@@ -0,0 +1,297 @@
+"""
+Servidor Graph falso (local) para medir e exercitar o acesso ao SharePoint sem rede.
+
+Implementa só o subconjunto de rotas usado por api/graph_api.py. Para apontar o app
+para ele, defina antes de importar api.graph_api:
+
+    GRAPH_ROOT=<servidor.url_graph>  GRAPH_AUTHORITY=<servidor.url_token>
+
+Uso típico:
+
+    with ServidorGraphFalso(conteudo_xlsx, latencia=0.05) as srv:
+        os.environ["GRAPH_ROOT"] = srv.url_graph
+        ...
+        print(srv.contagem)
+"""
+import base64
+import json
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import unquote, urlsplit
+
+SITE_ID = "osgestora.sharepoint.com,site-falso"
+DRIVE_ID = "drive-falso"
+ITEM_ID = "item-falso"
+BIBLIOTECA = "Documentos"
+
+_ROTAS = [
+    ("site", re.compile(r"^/v1\.0/sites/(?P<site>[^/]+)$")),
+    ("drives", re.compile(r"^/v1\.0/sites/(?P<site>[^/]+)/drives$")),
+    ("item_por_caminho", re.compile(r"^/v1\.0/sites/(?P<site>[^/]+)/drives/(?P<drive>[^/]+)/root:/(?P<caminho>.+)$")),
+    ("item_direto", re.compile(r"^/v1\.0/sites/(?P<site>[^/]+)/drive/root:/(?P<caminho>.+)$")),
+    ("conteudo", re.compile(r"^/v1\.0/sites/(?P<site>[^/]+)/drives/(?P<drive>[^/]+)/items/(?P<item>[^/]+)/content$")),
+    ("item", re.compile(r"^/v1\.0/sites/(?P<site>[^/]+)/drives/(?P<drive>[^/]+)/items/(?P<item>[^/]+)$")),
+]
+
+
+class ServidorGraphFalso:
+    """Graph/SharePoint em memória: um único arquivo, com ETag versionado e latência opcional."""
+
+    def __init__(self, conteudo: bytes, latencia: float = 0.0, host: str = "127.0.0.1", porta: int = 0):
+        self.latencia = latencia
+        self.contagem: Counter = Counter()
+        self._lock = threading.Lock()
+        self._guid = str(uuid.uuid4()).upper()
+        self._versao = 0
+        self._conteudo = b""
+        self._modificado = ""
+        self.item_id = ITEM_ID
+        self._falhas_lote = 0
+        self._limitado_ate = 0.0
+        self._retry_after: Optional[str] = None
+        self._trava_s = 0.0
+        self._travado_ate = 0.0
+        self.atualizar_conteudo(conteudo)
+        self._httpd = ThreadingHTTPServer((host, porta), self._criar_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------------- estado do "arquivo" ----------------
+
+    @property
+    def etag(self) -> str:
+        return f'"{{{self._guid}}},{self._versao}"'
+
+    @property
+    def conteudo(self) -> bytes:
+        return self._conteudo
+
+    def atualizar_conteudo(self, conteudo: bytes, if_match: Optional[str] = None) -> Optional[str]:
+        """
+        Simula uma edição (pelo app ou externa): troca os bytes e gera novo ETag.
+        Com 'if_match', só grava se o ETag atual for o informado (senão retorna None).
+        """
+        with self._lock:
+            if if_match and if_match != self.etag:
+                return None
+            self._conteudo = conteudo
+            self._versao += 1
+            self._modificado = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+            return self.etag
+
+    def recriar_item(self) -> str:
+        """Simula o arquivo apagado e enviado de novo: mesmo caminho, item_id novo (IDs antigos dão 404)."""
+        with self._lock:
+            self.item_id = f"{ITEM_ID}-{uuid.uuid4().hex[:8]}"
+            return self.item_id
+
+    def _metadados(self) -> dict:
+        return {
+            "id": self.item_id,
+            "name": "arquivo.xlsx",
+            "eTag": self.etag,
+            "lastModifiedDateTime": self._modificado,
+            "size": len(self._conteudo),
+            "parentReference": {"driveId": DRIVE_ID, "siteId": SITE_ID},
+        }
+
+    # ---------------- ciclo de vida ----------------
+
+    @property
+    def url_base(self) -> str:
+        host, porta = self._httpd.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    @property
+    def url_graph(self) -> str:
+        return f"{self.url_base}/v1.0"
+
+    @property
+    def url_token(self) -> str:
+        return f"{self.url_base}/token"
+
+    def iniciar(self) -> "ServidorGraphFalso":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "ServidorGraphFalso":
+        return self.iniciar()
+
+    def __exit__(self, *exc) -> None:
+        self.parar()
+
+    def _contar(self, rota: str) -> None:
+        with self._lock:
+            self.contagem[rota] += 1
+
+    def total_requisicoes(self) -> int:
+        """Idas e voltas HTTP recebidas (requisições dentro de um $batch e 423 não contam à parte)."""
+        return sum(n for rota, n in self.contagem.items() if not rota.endswith("@lote") and rota != "bloqueada")
+
+    def zerar_contagem(self) -> None:
+        self.contagem.clear()
+
+    def falhar_no_lote(self, quantidade: int) -> None:
+        """As próximas 'quantidade' requisições dentro de um $batch respondem 429 (Retry-After: 0)."""
+        with self._lock:
+            self._falhas_lote = quantidade
+
+    def limitar(self, segundos: float, retry_after: Optional[float] = 1.0) -> None:
+        """Durante 'segundos', toda requisição ao Graph responde 429 (com Retry-After, se informado)."""
+        with self._lock:
+            self._limitado_ate = time.time() + segundos
+            self._retry_after = None if retry_after is None else f"{retry_after:g}"
+
+    def travar_apos_escrita(self, segundos: float) -> None:
+        """Após cada PUT, o arquivo fica bloqueado por 'segundos': outros PUTs respondem 423."""
+        with self._lock:
+            self._trava_s = segundos
+
+    def _travado(self) -> bool:
+        with self._lock:
+            return time.time() < self._travado_ate
+
+    def _limitado(self) -> Optional[dict]:
+        with self._lock:
+            if time.time() >= self._limitado_ate:
+                return None
+            return {"Retry-After": self._retry_after} if self._retry_after else {}
+
+    # ---------------- rotas ----------------
+
+    @staticmethod
+    def _rota(url: str):
+        caminho = unquote(urlsplit(url).path)
+        for nome, regex in _ROTAS:
+            m = regex.match(caminho)
+            if m:
+                return nome, m.groupdict()
+        return None, {}
+
+    def _executar(self, metodo: str, url: str, headers, corpo: bytes, sufixo: str = ""):
+        """Trata uma requisição do Graph; retorna (status, corpo, headers, content-type)."""
+        rota, params = self._rota(url)
+        self._contar((rota or "desconhecida") + sufixo)
+        if "item" in params and params["item"] != self.item_id:
+            rota = None  # item_id antigo → 404
+
+        def _json(status: int, dados: dict, extra: dict = None):
+            return status, json.dumps(dados).encode("utf-8"), extra or {}, "application/json"
+
+        if rota == "site" and metodo == "GET":
+            return _json(200, {"id": SITE_ID})
+        if rota == "drives" and metodo == "GET":
+            return _json(200, {"value": [{"id": DRIVE_ID, "name": BIBLIOTECA}]})
+        if rota in ("item_por_caminho", "item_direto", "item") and metodo == "GET":
+            return _json(200, self._metadados())
+        if rota == "conteudo" and metodo == "GET":
+            with self._lock:
+                etag, conteudo = self.etag, self._conteudo
+            if headers.get("If-None-Match") == etag:
+                return 304, b"", {"ETag": etag}, "application/json"
+            return 200, conteudo, {"ETag": etag}, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        if rota == "conteudo" and metodo == "PUT":
+            if self._travado():
+                self._contar("bloqueada")
+                return _json(423, {"error": {"code": "resourceLocked"}})
+            if self.atualizar_conteudo(corpo, if_match=headers.get("If-Match")) is None:
+                return _json(412, {"error": {"code": "resourceModified"}})
+            with self._lock:
+                self._travado_ate = time.time() + self._trava_s
+            return _json(200, self._metadados())
+        return _json(404, {"error": {"code": "itemNotFound", "message": url}})
+
+    def _executar_lote(self, pedido: dict) -> dict:
+        """JSON $batch: cada requisição é tratada como se viesse sozinha (contada como '<rota>@lote')."""
+        respostas = []
+        for req in pedido.get("requests", []):
+            with self._lock:
+                falhar = self._falhas_lote > 0
+                self._falhas_lote -= int(falhar)
+            if falhar:
+                respostas.append({"id": req["id"], "status": 429, "headers": {"Retry-After": "0"},
+                                  "body": {"error": {"code": "tooManyRequests"}}})
+                continue
+            corpo = req.get("body")
+            corpo = json.dumps(corpo).encode("utf-8") if isinstance(corpo, (dict, list)) else b""
+            status, dados, headers, tipo = self._executar(req.get("method", "GET"), "/v1.0" + req["url"],
+                                                          req.get("headers") or {}, corpo, sufixo="@lote")
+            headers = dict(headers, **{"Content-Type": tipo})
+            if tipo == "application/json" and dados:
+                body = json.loads(dados)
+            else:
+                body = base64.b64encode(dados).decode("ascii") if dados else None
+            respostas.append({"id": req["id"], "status": status, "headers": headers, "body": body})
+        return {"responses": respostas}
+
+    # ---------------- HTTP ----------------
+
+    def _criar_handler(self):
+        servidor = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, status: int, corpo: bytes = b"", tipo: str = "application/json", headers: dict = None):
+                self.send_response(status)
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                if status != 304:
+                    self.send_header("Content-Type", tipo)
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                if corpo:
+                    self.wfile.write(corpo)
+
+            def _json(self, status: int, dados: dict, headers: dict = None):
+                self._responder(status, json.dumps(dados).encode("utf-8"), headers=headers)
+
+            def _ler_corpo(self) -> bytes:
+                tamanho = int(self.headers.get("Content-Length") or 0)
+                return self.rfile.read(tamanho) if tamanho else b""
+
+            def _tratar(self, metodo: str):
+                if servidor.latencia:
+                    time.sleep(servidor.latencia)
+                corpo = self._ler_corpo()
+                caminho = urlsplit(self.path).path
+
+                if metodo == "POST" and caminho.endswith("/token"):
+                    servidor._contar("token")
+                    return self._json(200, {"access_token": f"falso-{uuid.uuid4().hex}",
+                                            "token_type": "Bearer", "expires_in": 3599})
+                limitacao = servidor._limitado()
+                if limitacao is not None:
+                    servidor._contar("limitada")
+                    return self._json(429, {"error": {"code": "tooManyRequests"}}, headers=limitacao)
+                if metodo == "POST" and caminho.endswith("/$batch"):
+                    servidor._contar("lote")
+                    return self._json(200, servidor._executar_lote(json.loads(corpo or b"{}")))
+
+                status, dados, headers, tipo = servidor._executar(metodo, self.path, self.headers, corpo)
+                self._responder(status, dados, tipo=tipo, headers=headers)
+
+            def do_GET(self):
+                self._tratar("GET")
+
+            def do_POST(self):
+                self._tratar("POST")
+
+            def do_PUT(self):
+                self._tratar("PUT")
+
+        return _Handler
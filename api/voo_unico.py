@@ -0,0 +1,60 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# =====================================================
+# Single-flight: uma execução por chave, as demais esperam o resultado
+# =====================================================
+
+class _Voo:
+    __slots__ = ("evento", "resultado", "erro")
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado: Any = None
+        self.erro: Optional[BaseException] = None
+
+
+class VooUnico:
+    """
+    Coalesce chamadas concorrentes com a mesma chave: a primeira thread executa 'func'
+    e as que chegarem enquanto ela estiver em andamento recebem o mesmo resultado
+    (ou a mesma exceção). Quando termina, a chave é liberada para a próxima chamada.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._voos: Dict[Hashable, _Voo] = {}
+        self.stats = {"execucoes": 0, "coalescidas": 0}
+
+    def executar(self, chave: Hashable, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            voo = self._voos.get(chave)
+            lider = voo is None
+            if lider:
+                voo = self._voos[chave] = _Voo()
+                self.stats["execucoes"] += 1
+            else:
+                self.stats["coalescidas"] += 1
+
+        if not lider:
+            voo.evento.wait()
+            if voo.erro is not None:
+                raise voo.erro
+            return voo.resultado
+
+        try:
+            voo.resultado = func()
+            return voo.resultado
+        except BaseException as e:
+            voo.erro = e
+            raise
+        finally:
+            with self._lock:
+                self._voos.pop(chave, None)
+            voo.evento.set()
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            dados = dict(self.stats)
+            dados["em_andamento"] = len(self._voos)
+        return dados
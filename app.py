@@ -1,22 +1,20 @@
 import streamlit as st
-import pandas as pd
 import time
 import sys
 import os
-from datetime import datetime
-from time import perf_counter
 
 _start_total = time.time()
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
-from configuracoes.config import COLUNAS_ID
 from entrada_saida.funcoes_io import (
     carregar_previsto_semana_ativa,
+    esquema_planilha,
     salvar_base_dados,
-    salvar_em_aba,
     get_version_token,
 )
-from api.graph_api import carregar_semana_ativa
+from api.graph_api import carregar_semana_ativa, idas_e_voltas_thread
+
+_idas_inicio = idas_e_voltas_thread()
 
 # Configuração da página
 st.set_page_config(page_title="Rota 27 - Refinado", layout="wide")
@@ -53,11 +51,6 @@ with col_logo2:
 st.markdown("---") # Linha sutil de separação
 
 # --- Funções de Suporte ---
-def safe_to_datetime(val):
-    if isinstance(val, (datetime, pd.Timestamp)):
-        return val
-    return pd.to_datetime(val, dayfirst=True, errors='coerce')
-
 def init_state():
     defaults = {
         "autenticado": False, "df_previsto": None, "semana_nova": None,
@@ -101,18 +94,14 @@ if st.session_state.df_previsto is None:
         st.stop()
     st.session_state.semana_nova = str(info.get("semana", ""))
     
-    df_raw = carregar_previsto_semana_ativa(get_version_token())
-    if "Cenário" in df_raw.columns:
-        st.session_state.df_previsto = df_raw[df_raw["Cenário"].str.casefold() == "moderado"].copy()
-    else:
-        st.session_state.df_previsto = df_raw.copy()
+    # já vem só Moderado e tipada (categorias nos IDs, meses numéricos)
+    st.session_state.df_previsto = carregar_previsto_semana_ativa(get_version_token()).copy()
 
 df_base = st.session_state.df_previsto
 
 # --- Identificação de Meses (Lógica para 2026) ---
 if not st.session_state.meses_disponiveis:
-    cols = [c for c in df_base.columns if c not in COLUNAS_ID and pd.to_datetime(c, errors='coerce', dayfirst=True) is not pd.NaT]
-    st.session_state.meses_disponiveis = cols
+    st.session_state.meses_disponiveis = esquema_planilha(get_version_token()).meses_em(df_base)
 
 # --- UI Filtros ---
 st.markdown(f"""<div class="info-box"><span class="info-label">Revisão:</span> {st.session_state.semana_nova} | <span class="status-badge">Edição Liberada para Todos os Meses</span></div>""", unsafe_allow_html=True)
@@ -156,8 +145,9 @@ cols_id_fixas = ["Classificação", "Gerência", "Complexo", "Área", "Análise
 df_input = df_work[cols_id_fixas + cols_edit].copy()
 df_input.columns = [str(c) for c in df_input.columns]
 
+esquema = esquema_planilha(get_version_token())
 config_colunas = {
-    str(c): st.column_config.NumberColumn(safe_to_datetime(c).strftime("%b/%y"), format="R$ %.2f") 
+    str(c): st.column_config.NumberColumn(esquema.data(c).strftime("%b/%y"), format="R$ %.2f") 
     for c in cols_edit
 }
 
@@ -178,10 +168,14 @@ if not df_editado.equals(df_input):
                 if df_editado.at[idx, str(c)] != df_input.at[idx, str(c)]:
                     st.session_state.df_previsto.at[idx, c] = df_editado.at[idx, str(c)]
         
+        _idas_salvar = idas_e_voltas_thread()
         salvar_base_dados(st.session_state.df_previsto)
+        st.session_state.idas_ultimo_salvamento = idas_e_voltas_thread() - _idas_salvar
         st.success("Dados salvos com sucesso!")
         st.session_state.has_unsaved_changes = False
         st.rerun()
 
 # --- Rodapé ---
-st.sidebar.caption(f"Interação: {time.time() - _start_total:.2f}s")
\ No newline at end of file
+st.sidebar.caption(f"Interação: {time.time() - _start_total:.2f}s | Graph: {idas_e_voltas_thread() - _idas_inicio} idas e voltas")
+if st.session_state.get("idas_ultimo_salvamento") is not None:
+    st.sidebar.caption(f"Último salvamento: {st.session_state.idas_ultimo_salvamento} idas e voltas")
\ No newline at end of file
@@ -0,0 +1,882 @@
+"""
+Benchmarks offline (sem SharePoint): usa o servidor Graph falso e planilhas sintéticas.
+
+    python bench.py download [--latencia 0.05]
+    python bench.py parse [--revisoes 5 20 50]
+    python bench.py abas [--revisoes 5 20 50]
+    python bench.py escrita [--revisoes 5 20 50]
+    python bench.py serializacao [--celulas 50000 200000 1000000]
+    python bench.py concorrencia [--sessoes 30] [--latencia 0.05]
+    python bench.py idas [--latencia 0.05]
+    python bench.py limitacao [--sessoes 20] [--janela 1.0]
+    python bench.py taxa [--sessoes 20] [--taxa 50] [--rajada 20]
+    python bench.py fila [--sessoes 10] [--trava 0.5]
+    python bench.py historico [--linhas 2000 20000] [--edicoes 20]
+    python bench.py armazenamento [--latencia 0.05] [--sessoes 10]
+    python bench.py esquema [--revisoes 10 50 200]
+    python bench.py revisoes [--revisoes 10 50 200]
+    python bench.py arquivo [--revisoes 20 60] [--manter 8]
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from configuracoes.config import COLUNAS_ID
+
+# ============================================================
+# Planilha sintética (mesmas abas/colunas do arquivo real)
+# ============================================================
+
+def gerar_base(revisoes: int = 10, linhas_por_revisao: int = 300, meses: int = 24, seed: int = 27) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    colunas_meses = [datetime(2026 + m // 12, m % 12 + 1, 1) for m in range(meses)]
+    blocos = []
+    for r in range(revisoes):
+        n = linhas_por_revisao
+        bloco = pd.DataFrame({
+            "Classificação": rng.choice(["O&S", "Rota 27", "Coligada X"], n),
+            "Revisão": f"Semana {r + 1:02d} - v01",
+            "CC": rng.integers(1000, 9999, n).astype(str),
+            "Complexo": rng.choice([f"Complexo {i}" for i in range(12)], n),
+            "Área": rng.choice([f"Área {i}" for i in range(30)], n),
+            "Gerência": rng.choice([f"Gerência {i}" for i in range(8)], n),
+            "Cenário": rng.choice(["Moderado", "moderado", "Otimista"], n, p=[0.6, 0.2, 0.2]),
+            "Análise de emissão": rng.choice(["RECEITA MAO DE OBRA", "RECEITA LOCAÇÃO", "CUSTO COM INSUMOS",
+                                              "CUSTO COM MAO DE OBRA", "LOCAÇÃO DE EQUIPAMENTOS"], n),
+        })
+        for c in colunas_meses:
+            bloco[c] = rng.normal(50_000, 15_000, n).round(2)
+        blocos.append(bloco)
+    return pd.concat(blocos, ignore_index=True)[COLUNAS_ID + colunas_meses]
+
+def gerar_historico(linhas: int, semanas: int = 52, seed: int = 27) -> pd.DataFrame:
+    """Edições como as gravadas pelo app (uma linha por célula alterada)."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "index": rng.integers(0, 3000, linhas),
+        "Gerência": rng.choice([f"Gerência {i}" for i in range(8)], linhas),
+        "Complexo": rng.choice([f"Complexo {i}" for i in range(12)], linhas),
+        "Mês": [datetime(2026, m, 1) for m in rng.integers(1, 13, linhas)],
+        "Novo Valor": rng.normal(50_000, 15_000, linhas).round(2),
+        "Semana": [f"Semana {s:02d} - v01" for s in rng.integers(1, semanas + 1, linhas)],
+        "DataHora": pd.Timestamp("2026-01-05 09:00") + pd.to_timedelta(rng.integers(0, 3e7, linhas), unit="s"),
+    })
+
+def gerar_planilha(revisoes: int = 10, linhas_por_revisao: int = 300, meses: int = 24, historico: int = 0) -> bytes:
+    base = gerar_base(revisoes, linhas_por_revisao, meses)
+    out = io.BytesIO()
+    with pd.ExcelWriter(out, engine="openpyxl") as writer:
+        pd.DataFrame({"Semana Ativa": [base["Revisão"].iloc[-1]], "Meses Permitidos": [""]}).to_excel(
+            writer, sheet_name="Controle", index=False)
+        base.to_excel(writer, sheet_name="Base de Dados", index=False)
+        pd.DataFrame(columns=["username", "password_hash", "role", "created_at"]).to_excel(
+            writer, sheet_name="Usuarios", index=False)
+        hist = gerar_historico(historico) if historico else pd.DataFrame(
+            columns=["Gerência", "Mês", "Novo Valor", "Semana", "DataHora"])
+        hist.to_excel(writer, sheet_name="Histórico", index=False)
+    return out.getvalue()
+
+def _ms(t0: float) -> str:
+    return f"{(time.perf_counter() - t0) * 1000:8.1f} ms"
+
+def _apontar_para(srv) -> None:
+    """Direciona api.graph_api para o servidor falso (precisa vir antes do import)."""
+    os.environ["GRAPH_ROOT"] = srv.url_graph
+    os.environ["GRAPH_AUTHORITY"] = srv.url_token
+    # IDs e histórico do servidor falso não podem ir para os arquivos do app real
+    # (configuracoes.config já foi importado por este módulo: ajusta também o valor lido)
+    import configuracoes.config as config
+    config.GRAPH_IDS_ARQUIVO = os.environ["GRAPH_IDS_ARQUIVO"] = os.path.join(tempfile.mkdtemp(), "graph_ids.json")
+    config.HISTORICO_SQLITE = os.environ["HISTORICO_SQLITE"] = os.path.join(tempfile.mkdtemp(), "historico.sqlite")
+
+# ============================================================
+# download: condicional (If-None-Match) x legado (eTag + /content)
+# ============================================================
+
+def bench_download(args) -> None:
+    from api.servidor_graph_falso import ServidorGraphFalso
+
+    conteudo = gerar_planilha()
+    with ServidorGraphFalso(conteudo, latencia=args.latencia) as srv:
+        _apontar_para(srv)
+        from api import graph_api
+
+        print(f"arquivo: {len(conteudo) / 1024:.0f} KiB | latência simulada: {args.latencia * 1000:.0f} ms")
+        for condicional in (False, True):
+            graph_api.DOWNLOAD_CONDICIONAL = condicional
+            graph_api.recarregar_dados()
+            graph_api._baixar_arquivo_excel_bytes()  # aquece token/IDs
+            graph_api.recarregar_dados()
+            modo = "condicional" if condicional else "legado"
+
+            cenarios = [
+                ("frio (sem bytes)", lambda: None),
+                ("quente (sem mudança)", lambda: None),
+                ("após edição externa", lambda: srv.atualizar_conteudo(conteudo)),
+            ]
+            for nome, preparar in cenarios:
+                preparar()
+                srv.zerar_contagem()
+                t0 = time.perf_counter()
+                graph_api._baixar_arquivo_excel_bytes()
+                print(f"{modo:12s} {nome:22s} {_ms(t0)}  chamadas={srv.total_requisicoes()} {dict(srv.contagem)}")
+
+        # restart do processo: memória vazia, mas o cache em disco já tem a versão atual
+        with tempfile.TemporaryDirectory() as tmp:
+            graph_api.CACHE_DISCO_DIR = tmp
+            graph_api._cache_disco.clear()
+            for condicional in (False, True):
+                graph_api.DOWNLOAD_CONDICIONAL = condicional
+                graph_api.recarregar_dados()
+                graph_api._baixar_arquivo_excel_bytes()  # popula o disco
+                graph_api.recarregar_dados()
+                srv.zerar_contagem()
+                t0 = time.perf_counter()
+                graph_api._baixar_arquivo_excel_bytes()
+                modo = "condicional" if condicional else "legado"
+                print(f"{modo:12s} {'restart (disco quente)':22s} {_ms(t0)}  chamadas={srv.total_requisicoes()} {dict(srv.contagem)}")
+            graph_api.CACHE_DISCO_DIR = ""
+            graph_api._cache_disco.clear()
+
+        # IDs na partida a frio: cadeia site → drives → item x endereço direto x arquivo local
+        from api.resolvedor_ids import ResolvedorIds
+        token = graph_api.obter_token()
+        resolvedor = graph_api._resolvedor_ids()
+        def _sem_lote():
+            graph_api.GRAPH_LOTE = False
+            try:
+                return graph_api._resolver_ids()
+            finally:
+                graph_api.GRAPH_LOTE = True
+        variantes = [
+            ("ids: cadeia", lambda: graph_api._resolver_ids_em_cadeia(token)),
+            ("ids: host + caminho", _sem_lote),
+            ("ids: $batch (item + site + drives)", lambda: graph_api._resolver_ids_em_lote(token)),
+            ("ids: arquivo local", lambda: ResolvedorIds(graph_api._resolver_ids, resolvedor.caminho_arquivo,
+                                                         resolvedor.chave).obter()),
+        ]
+        for nome, resolver in variantes:
+            srv.zerar_contagem()
+            t0 = time.perf_counter()
+            resolver()
+            print(f"{nome:35s} {_ms(t0)}  chamadas={srv.total_requisicoes()} {dict(srv.contagem)}")
+
+        # arquivo recriado no SharePoint: IDs persistidos dão 404 → resolve de novo e repete
+        srv.recriar_item()
+        graph_api.recarregar_dados()
+        srv.zerar_contagem()
+        t0 = time.perf_counter()
+        graph_api._baixar_arquivo_excel_bytes()
+        print(f"{'ids: item recriado (404)':35s} {_ms(t0)}  chamadas={srv.total_requisicoes()} {dict(srv.contagem)} "
+              f"{graph_api.estatisticas_ids()}")
+
+# ============================================================
+# concorrencia: N sessões relendo o arquivo logo após um salvamento
+# ============================================================
+
+def bench_concorrencia(args) -> None:
+    import threading
+    from api.servidor_graph_falso import ServidorGraphFalso
+
+    conteudo = gerar_planilha()
+    with ServidorGraphFalso(conteudo, latencia=args.latencia) as srv:
+        _apontar_para(srv)
+        from api import graph_api
+
+        for condicional in (False, True):
+            graph_api.DOWNLOAD_CONDICIONAL = condicional
+            graph_api.recarregar_dados()
+            graph_api._baixar_arquivo_excel_bytes()  # todas as sessões com a versão atual
+            srv.atualizar_conteudo(conteudo)         # alguém salvou: novo ETag
+            srv.zerar_contagem()
+            antes = graph_api.estatisticas_downloads()
+
+            barreira = threading.Barrier(args.sessoes)
+            def sessao():
+                barreira.wait()
+                graph_api._baixar_arquivo_excel_bytes()
+            threads = [threading.Thread(target=sessao) for _ in range(args.sessoes)]
+            t0 = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            depois = graph_api.estatisticas_downloads()
+            modo = "condicional" if condicional else "legado"
+            print(f"{modo:12s} {args.sessoes} sessões {_ms(t0)}  downloads={srv.contagem['conteudo']} "
+                  f"coalescidos={depois['coalescidas'] - antes['coalescidas']} chamadas={dict(srv.contagem)}")
+
+# ============================================================
+# idas: idas e voltas por carregamento de página e por salvamento
+# ============================================================
+
+def bench_idas(args) -> None:
+    from api.servidor_graph_falso import ServidorGraphFalso
+
+    conteudo = gerar_planilha()
+    with ServidorGraphFalso(conteudo, latencia=args.latencia) as srv:
+        _apontar_para(srv)
+        from api import graph_api
+        from entrada_saida import funcoes_io
+
+        def _medir_idas(nome: str, func) -> None:
+            srv.zerar_contagem()
+            antes = graph_api.idas_e_voltas_thread()
+            t0 = time.perf_counter()
+            func()
+            print(f"{nome:40s} {_ms(t0)}  idas_e_voltas={graph_api.idas_e_voltas_thread() - antes} {dict(srv.contagem)}")
+
+        def _pagina(vt: int = 0):
+            graph_api.carregar_semana_ativa(version_token=vt)
+            funcoes_io.carregar_previsto_semana_ativa(vt)
+
+        for lote in (False, True):
+            graph_api.GRAPH_LOTE = lote
+            graph_api._gerenciador_token.clear()
+            graph_api._resolvedor_ids.clear()
+            graph_api.recarregar_dados()
+            if os.path.exists(os.environ["GRAPH_IDS_ARQUIVO"]):
+                os.remove(os.environ["GRAPH_IDS_ARQUIVO"])
+            modo = "com $batch" if lote else "sem $batch"
+            _medir_idas(f"{modo}: página (partida a frio)", _pagina)
+            _medir_idas(f"{modo}: página (nova interação)", lambda: _pagina(1))
+            base = graph_api.baixar_aba_excel("Base de Dados")
+            _medir_idas(f"{modo}: salvar Base de Dados", lambda: funcoes_io.salvar_base_dados(base.head(50)))
+
+            def _separado():
+                funcoes_io.salvar_base_dados(base.head(50), append=True)
+                funcoes_io.salvar_semana_ativa("S-sep", ["2026-01"])
+
+            def _transacao():
+                with funcoes_io.transacao_planilha() as tx:
+                    tx.salvar_base_dados(base.head(50), append=True)
+                    tx.salvar_semana_ativa("S-tx", ["2026-01"])
+            _medir_idas(f"{modo}: base + controle (separados)", _separado)
+            _medir_idas(f"{modo}: base + controle (transação)", _transacao)
+        print(graph_api.estatisticas_idas_e_voltas())
+
+# ============================================================
+# limitacao: SharePoint respondendo 429 (Retry-After, disjuntor e leitura do cache)
+# ============================================================
+
+def bench_limitacao(args) -> None:
+    import threading
+    from api.servidor_graph_falso import ServidorGraphFalso
+
+    conteudo = gerar_planilha()
+    with ServidorGraphFalso(conteudo, latencia=args.latencia) as srv:
+        _apontar_para(srv)
+        from api import graph_api
+
+        def _sessoes(n: int) -> list:
+            tempos = []
+            def sessao():
+                t0 = time.perf_counter()
+                try:
+                    graph_api._baixar_arquivo_excel_bytes()
+                    tempos.append(time.perf_counter() - t0)
+                except Exception as e:
+                    tempos.append(type(e).__name__)
+            threads = [threading.Thread(target=sessao) for _ in range(n)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            return tempos
+
+        graph_api._baixar_arquivo_excel_bytes()  # bytes em cache antes da limitação
+
+        # 1) limitação curta com Retry-After: as sessões esperam o tempo pedido, juntas
+        srv.limitar(args.janela, retry_after=args.janela)
+        srv.zerar_contagem()
+        t0 = time.perf_counter()
+        tempos = _sessoes(args.sessoes)
+        print(f"retry-after {args.janela:.1f}s, {args.sessoes} sessões {_ms(t0)}  "
+              f"429s={srv.contagem['limitada']} chamadas={dict(srv.contagem)}")
+        print(f"  {graph_api.estatisticas_retry().get('download')}")
+
+        # 2) limitação longa sem Retry-After: o disjuntor abre e as leituras usam o cache
+        srv.limitar(60, retry_after=None)
+        graph_api.politica_retry.clear()
+        for rodada in ("abrindo o disjuntor", "disjuntor aberto"):
+            srv.zerar_contagem()
+            t0 = time.perf_counter()
+            tempos = _sessoes(args.sessoes)
+            ok = [t for t in tempos if isinstance(t, float)]
+            print(f"limitação longa ({rodada}), {args.sessoes} sessões {_ms(t0)}  429s={srv.contagem['limitada']} "
+                  f"leituras ok={len(ok)} (mediana {sorted(ok)[len(ok) // 2] * 1000 if ok else 0:.1f} ms) "
+                  f"erros={len(tempos) - len(ok)}")
+        print(f"  {graph_api.estatisticas_retry().get('download')}")
+        srv.limitar(0)
+
+# ============================================================
+# taxa: limitador de requisições (token bucket) sob rajada de sessões
+# ============================================================
+
+def bench_taxa(args) -> None:
+    import threading
+    from api.servidor_graph_falso import ServidorGraphFalso
+    from api.limitador_taxa import prioridade, PRIORIDADE_SALVAR, PRIORIDADE_FUNDO
+
+    conteudo = gerar_planilha(revisoes=2)
+    with ServidorGraphFalso(conteudo, latencia=args.latencia) as srv:
+        _apontar_para(srv)
+        from api import graph_api
+
+        token = graph_api.obter_token()
+        ids = graph_api._resolvedor_ids().obter()
+        instantes = []
+        lock = threading.Lock()
+
+        def consulta(prio: int) -> float:
+            t0 = time.perf_counter()
+            with prioridade(prio):
+                graph_api._get_item_etag(token, *ids)
+            with lock:
+                instantes.append(time.perf_counter())
+            return time.perf_counter() - t0
+
+        for taxa in (0, args.taxa):
+            graph_api._limitador.clear()
+            graph_api.GRAPH_TAXA_LEITURA = taxa
+            graph_api.GRAPH_RAJADA_LEITURA = args.rajada
+            graph_api._limitador()
+            instantes.clear()
+            salvar = []
+
+            def fundo():
+                for _ in range(args.chamadas):
+                    consulta(PRIORIDADE_FUNDO)
+            threads = [threading.Thread(target=fundo) for _ in range(args.sessoes)]
+            t0 = time.perf_counter()
+            for t in threads:
+                t.start()
+            time.sleep(0.2)  # fila já cheia de atualizações de fundo
+            salvar.append(consulta(PRIORIDADE_SALVAR))
+            for t in threads:
+                t.join()
+            total = time.perf_counter() - t0
+            # pico de requisições em qualquer janela de 1 s
+            pico = max(sum(1 for x in instantes if i <= x < i + 1.0) for i in instantes)
+            est = graph_api.estatisticas_limitador()["leitura"]
+            nome = f"taxa {taxa:g}/s rajada {args.rajada:g}" if taxa else "sem limite"
+            print(f"{nome:24s} {len(instantes)} chamadas em {total:5.2f}s  pico={pico}/s  "
+                  f"espera do salvamento={salvar[0] * 1000:6.1f} ms  fila: média={est['espera_media_ms']} ms "
+                  f"p95={est['espera_p95_ms']} ms máx={est['espera_max_s'] * 1000:.0f} ms")
+
+# ============================================================
+# fila: salvamentos simultâneos com e sem a fila de escrita do processo
+# ============================================================
+
+def bench_fila(args) -> None:
+    import threading
+    from api.servidor_graph_falso import ServidorGraphFalso
+
+    conteudo = gerar_planilha(revisoes=2)
+    with ServidorGraphFalso(conteudo, latencia=args.latencia) as srv:
+        _apontar_para(srv)
+        from api import graph_api
+        from entrada_saida import funcoes_io
+
+        srv.travar_apos_escrita(args.trava)
+        for fila in (False, True):
+            funcoes_io.SALVAR_FILA = fila
+            graph_api.politica_retry.clear()
+            funcoes_io._fila_escrita.clear()
+            time.sleep(args.trava)
+            antes = len(graph_api.baixar_aba_excel("Refinado", version_token=time.time_ns()))
+            srv.zerar_contagem()
+            rebases = graph_api.estatisticas_idas_e_voltas()["rebases"]
+            tempos, erros = [], []
+
+            def sessao(i: int):
+                t0 = time.perf_counter()
+                try:
+                    funcoes_io.salvar_em_aba(pd.DataFrame({"Sessão": [i], "Cenário": ["Moderado"]}), aba="Refinado")
+                    tempos.append(time.perf_counter() - t0)
+                except Exception as e:
+                    erros.append(type(e).__name__)
+            threads = [threading.Thread(target=sessao, args=(i,)) for i in range(args.sessoes)]
+            t0 = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            total = time.perf_counter() - t0
+            graph_api.recarregar_dados()
+            depois = len(graph_api.baixar_aba_excel("Refinado", version_token=time.time_ns()))
+            nome = "com fila" if fila else "sem fila"
+            tempos.sort()
+            print(f"{nome}: {args.sessoes} salvamentos em {total:5.2f}s  chamadas de conteúdo={srv.contagem['conteudo']} "
+                  f"423s={srv.contagem['bloqueada']} rebases={graph_api.estatisticas_idas_e_voltas()['rebases'] - rebases} "
+                  f"linhas +{depois - antes} erros={erros}  "
+                  f"espera mediana={tempos[len(tempos) // 2] * 1000 if tempos else 0:.0f} ms máx={tempos[-1] * 1000 if tempos else 0:.0f} ms")
+            if fila:
+                print(f"  {funcoes_io.estatisticas_fila_escrita()}")
+
+# ============================================================
+# historico: acrescentar edições regravando a aba x SQLite só de acréscimo
+# ============================================================
+
+def bench_historico(args) -> None:
+    from api.servidor_graph_falso import ServidorGraphFalso
+
+    with ServidorGraphFalso(gerar_planilha(revisoes=2), latencia=args.latencia) as srv:
+        _apontar_para(srv)
+        from api import graph_api
+        from entrada_saida import funcoes_io
+        caminho = funcoes_io.HISTORICO_SQLITE
+        novas = gerar_historico(args.edicoes, seed=1)
+        semana = novas["Semana"].iloc[0]
+
+        for linhas in args.linhas:
+            srv.atualizar_conteudo(gerar_planilha(revisoes=2, historico=linhas))
+            graph_api.recarregar_dados()
+            funcoes_io._historico.clear()
+            funcoes_io.HISTORICO_SQLITE = caminho = caminho + "x"
+            print(f"histórico com {linhas} linhas, acrescentando {args.edicoes} edições:")
+
+            funcoes_io.HISTORICO_SQLITE = ""
+            graph_api.baixar_aba_excel("Histórico", version_token=time.time_ns())  # bytes em cache
+            t0 = time.perf_counter()
+            funcoes_io.salvar_em_aba(novas, aba="Histórico")
+            print(f"  regravando a aba          {_ms(t0)}")
+            t0 = time.perf_counter()
+            res = funcoes_io.carregar_historico(semana=semana)
+            print(f"  consulta por semana (aba) {_ms(t0)}  {len(res)} linhas")
+
+            funcoes_io.HISTORICO_SQLITE = caminho
+            t0 = time.perf_counter()
+            funcoes_io.carregar_historico(semana=semana)
+            print(f"  importação única p/ SQLite{_ms(t0)}")
+            t0 = time.perf_counter()
+            funcoes_io.salvar_em_aba(novas, aba="Histórico")
+            print(f"  SQLite (só acréscimo)     {_ms(t0)}")
+            t0 = time.perf_counter()
+            res = funcoes_io.carregar_historico(semana=semana)
+            print(f"  consulta por semana (idx) {_ms(t0)}  {len(res)} linhas")
+            t0 = time.perf_counter()
+            res = funcoes_io.carregar_historico(indice=int(novas["index"].iloc[0]), mes=novas["Mês"].iloc[0])
+            print(f"  consulta por célula (idx) {_ms(t0)}  {len(res)} linhas")
+            t0 = time.perf_counter()
+            n = funcoes_io.compactar_historico()
+            aba = graph_api.baixar_aba_excel("Histórico", version_token=time.time_ns())
+            print(f"  compactação na aba        {_ms(t0)}  {n} linhas copiadas, aba com {len(aba)} linhas")
+            print(f"  {funcoes_io.estatisticas_historico()}")
+
+# ============================================================
+# armazenamento: o mesmo fluxo do app sobre o Graph (servidor falso) e sobre um diretório local
+# ============================================================
+
+def bench_armazenamento(args) -> None:
+    import threading
+    from api.servidor_graph_falso import ServidorGraphFalso
+
+    conteudo = gerar_planilha()
+    with ServidorGraphFalso(conteudo, latencia=args.latencia) as srv:
+        _apontar_para(srv)
+        from api import graph_api
+        from entrada_saida import funcoes_io
+        diretorio = tempfile.mkdtemp()
+        with open(os.path.join(diretorio, graph_api.ARQUIVO), "wb") as f:
+            f.write(conteudo)
+
+        for backend in ("graph", "local"):
+            graph_api.ARMAZENAMENTO = backend
+            graph_api.ARMAZENAMENTO_LOCAL_DIR = diretorio
+            graph_api._armazenamento.clear()
+            graph_api.recarregar_dados()
+            graph_api._registro_planilhas.clear()
+
+            t0 = time.perf_counter()
+            graph_api.carregar_semana_ativa()
+            base = funcoes_io.carregar_previsto_semana_ativa(0)
+            print(f"{backend:6s} página (partida a frio)        {_ms(t0)}")
+            t0 = time.perf_counter()
+            graph_api.carregar_semana_ativa(version_token=1)
+            funcoes_io.carregar_previsto_semana_ativa(1)
+            print(f"{backend:6s} página (nova interação)        {_ms(t0)}")
+            t0 = time.perf_counter()
+            funcoes_io.salvar_base_dados(base.head(50))
+            print(f"{backend:6s} salvar Base de Dados           {_ms(t0)}")
+
+            # salvamentos simultâneos pela fila de escrita (gravação condicional do backend)
+            erros = []
+            def sessao(i: int):
+                try:
+                    funcoes_io.salvar_em_aba(pd.DataFrame({"Sessão": [i]}), aba="Refinado")
+                except Exception as e:
+                    erros.append(type(e).__name__)
+            threads = [threading.Thread(target=sessao, args=(i,)) for i in range(args.sessoes)]
+            t0 = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            graph_api.recarregar_dados()
+            linhas = len(graph_api.baixar_aba_excel("Refinado", version_token=time.time_ns()))
+            print(f"{backend:6s} {args.sessoes} salvamentos simultâneos  {_ms(t0)}  linhas={linhas} erros={erros}")
+            print(f"       {graph_api.estatisticas_armazenamento()}")
+
+# ============================================================
+# arquivo: planilha crescendo a cada ciclo x revisões antigas no arquivo frio
+# ============================================================
+
+def bench_arquivo(args) -> None:
+    from api.servidor_graph_falso import ServidorGraphFalso
+
+    with ServidorGraphFalso(gerar_planilha(revisoes=2), latencia=args.latencia) as srv:
+        _apontar_para(srv)
+        from api import graph_api
+        from entrada_saida import funcoes_io
+
+        def ciclo(rotulo: str) -> None:
+            semana = funcoes_io.carregar_previsto_semana_ativa(time.time_ns())
+            t0 = time.perf_counter()
+            funcoes_io.salvar_base_dados(semana.head(5))
+            t_salvar = _ms(t0)
+            t0 = time.perf_counter()
+            funcoes_io.carregar_previsto_semana_ativa(time.time_ns())  # versão nova: parse da Base
+            print(f"  {rotulo:18s} xlsx {len(srv.conteudo) / 1024:7.0f} KiB | salvar {t_salvar} | "
+                  f"semana ativa após salvar {_ms(t0)}")
+
+        for revisoes in args.revisoes:
+            srv.atualizar_conteudo(gerar_planilha(revisoes=revisoes))
+            graph_api.recarregar_dados()
+            funcoes_io._arquivo_revisoes.clear()
+            funcoes_io.ARQUIVO_REVISOES_DIR = tempfile.mkdtemp()
+            print(f"{revisoes} revisões na Base de Dados, mantendo {args.manter}:")
+            ciclo("tudo na planilha")
+            t0 = time.perf_counter()
+            funcoes_io.arquivar_revisoes_antigas(manter=args.manter)
+            print(f"  arquivamento       {_ms(t0)}  {funcoes_io.estatisticas_arquivo_revisoes()}")
+            ciclo("planilha limitada")
+            antiga = funcoes_io.revisoes_arquivadas()[0]
+            t0 = time.perf_counter()
+            df = funcoes_io.carregar_revisoes_arquivadas([antiga])
+            print(f"  revisão arquivada (disco)   {_ms(t0)}  {len(df)} linhas")
+            t0 = time.perf_counter()
+            funcoes_io.carregar_revisoes_arquivadas([antiga])
+            print(f"  revisão arquivada (memória) {_ms(t0)}")
+
+# ============================================================
+# parse: read_excel (XML) a frio x cache colunar (Arrow IPC) a quente
+# ============================================================
+
+def bench_parse(args) -> None:
+    from api.cache_colunar import CacheColunar
+
+    print(f"{'revisões':>8s} {'linhas':>7s} {'xlsx KiB':>9s} | {'read_excel':>11s} {'grava arrow':>11s} {'lê arrow':>11s} {'ganho':>6s}")
+    for revisoes in args.revisoes:
+        conteudo = gerar_planilha(revisoes=revisoes)
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = CacheColunar(tmp, 1 << 40)
+
+            t0 = time.perf_counter()
+            xls = pd.ExcelFile(io.BytesIO(conteudo), engine="openpyxl")
+            df = pd.read_excel(xls, sheet_name="Base de Dados")
+            t_parse = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            cache.gravar('"bench"', "Base de Dados", df)
+            t_grava = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            df_cache = cache.obter('"bench"', "Base de Dados")
+            t_le = time.perf_counter() - t0
+
+            pd.testing.assert_frame_equal(df, df_cache)
+        print(f"{revisoes:8d} {len(df):7d} {len(conteudo) / 1024:9.0f} | {t_parse * 1000:8.1f} ms "
+              f"{t_grava * 1000:8.1f} ms {t_le * 1000:8.1f} ms {t_parse / t_le:5.0f}x")
+
+# ============================================================
+# abas: abas pequenas via read_excel x leitor streaming (api.leitor_xlsx)
+# ============================================================
+
+def bench_abas(args) -> None:
+    from api.leitor_xlsx import ler_aba_xlsx
+
+    print(f"{'revisões':>8s} {'xlsx KiB':>9s} {'aba':>10s} | {'read_excel':>11s} {'streaming':>11s}")
+    for revisoes in args.revisoes:
+        conteudo = gerar_planilha(revisoes=revisoes)
+        for aba in ("Controle", "Usuarios"):
+            t0 = time.perf_counter()
+            df = pd.read_excel(io.BytesIO(conteudo), sheet_name=aba, engine="openpyxl")
+            t_excel = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            df_stream = ler_aba_xlsx(conteudo, aba)
+            t_stream = time.perf_counter() - t0
+
+            pd.testing.assert_frame_equal(df, df_stream)
+            print(f"{revisoes:8d} {len(conteudo) / 1024:9.0f} {aba:>10s} | {t_excel * 1000:8.1f} ms {t_stream * 1000:8.1f} ms")
+
+# ============================================================
+# escrita: salvar uma aba via openpyxl (wb.save) x troca no zip (api.escritor_xlsx)
+# ============================================================
+
+def _membros_brutos(conteudo: bytes) -> dict:
+    """{nome: (registro local comprimido, bytes descomprimidos)} de cada membro do zip."""
+    import zipfile
+    from api.escritor_xlsx import _bruto
+
+    with zipfile.ZipFile(io.BytesIO(conteudo)) as zf:
+        return {info.filename: (bytes(_bruto(conteudo, info)), zf.read(info)) for info in zf.infolist()}
+
+def verificar_troca_aba(conteudo: bytes, novo: bytes, aba: str, df: pd.DataFrame) -> None:
+    """Ida e volta: só a parte da aba (e styles/calcChain) muda; o resto é idêntico byte a byte."""
+    import zipfile
+    from openpyxl import load_workbook
+    from api.leitor_xlsx import caminho_aba
+
+    with zipfile.ZipFile(io.BytesIO(conteudo)) as zf:
+        parte = caminho_aba(zf, aba)
+    antes, depois = _membros_brutos(conteudo), _membros_brutos(novo)
+    permitidos = {parte, "xl/styles.xml", "xl/calcChain.xml", "[Content_Types].xml", "xl/_rels/workbook.xml.rels"}
+    assert set(antes) - set(depois) <= permitidos
+    for nome, membro in antes.items():
+        if nome not in permitidos:
+            assert depois[nome] == membro, f"membro alterado: {nome}"
+    pd.testing.assert_frame_equal(pd.read_excel(io.BytesIO(novo), sheet_name=aba), df)
+    load_workbook(io.BytesIO(novo), read_only=True).close()  # o openpyxl também abre o resultado
+
+def bench_escrita(args) -> None:
+    from openpyxl import load_workbook
+    from api.armazenamento import _write_df_to_worksheet
+    from api.escritor_xlsx import substituir_abas_xlsx
+
+    print(f"{'revisões':>8s} {'xlsx KiB':>9s} {'aba':>14s} | {'openpyxl':>11s} {'zip':>11s}")
+    for revisoes in args.revisoes:
+        conteudo = gerar_planilha(revisoes=revisoes)
+        base = pd.read_excel(io.BytesIO(conteudo), sheet_name="Base de Dados")
+        casos = {
+            "Controle": pd.DataFrame({"Semana Ativa": ["Semana 99 - v01"], "Meses Permitidos": ["jan/26;fev/26"]}),
+            "Histórico": pd.DataFrame({"Gerência": ["Gerência 1"], "Mês": [datetime(2026, 3, 1)],
+                                       "Novo Valor": [1234.5], "Semana": ["Semana 99 - v01"],
+                                       "DataHora": [datetime(2026, 3, 2, 10, 30)]}),
+            "Base de Dados": base,
+        }
+        for aba, df in casos.items():
+            t0 = time.perf_counter()
+            wb = load_workbook(io.BytesIO(conteudo))
+            _write_df_to_worksheet(wb[aba], df)
+            out = io.BytesIO()
+            wb.save(out)
+            t_openpyxl = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            novo = substituir_abas_xlsx(conteudo, {aba: df})
+            t_zip = time.perf_counter() - t0
+
+            verificar_troca_aba(conteudo, novo, aba, pd.read_excel(io.BytesIO(out.getvalue()), sheet_name=aba))
+            print(f"{revisoes:8d} {len(conteudo) / 1024:9.0f} {aba:>14s} | {t_openpyxl * 1000:8.1f} ms {t_zip * 1000:8.1f} ms")
+
+# ============================================================
+# serializacao: "Base de Dados" via ws.append linha a linha x blocos por coluna tipada
+# ============================================================
+
+def _medir(func) -> tuple:
+    """(segundos, pico de memória alocada em MiB) — tempo e memória medidos em execuções separadas."""
+    import tracemalloc
+
+    t0 = time.perf_counter()
+    func()
+    segundos = time.perf_counter() - t0
+    tracemalloc.start()
+    func()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return segundos, pico / 2**20
+
+def bench_serializacao(args) -> None:
+    from openpyxl import load_workbook
+    from api.armazenamento import _write_df_to_worksheet
+    from api.escritor_xlsx import substituir_abas_xlsx
+
+    colunas = len(COLUNAS_ID) + 24
+    print(f"{'células':>9s} {'linhas':>7s} | {'append (openpyxl)':>24s} | {'bloco por coluna (zip)':>24s} | ganho")
+    for celulas in args.celulas:
+        linhas = max(1, celulas // colunas)
+        conteudo = gerar_planilha(revisoes=1, linhas_por_revisao=linhas)
+        df = gerar_base(revisoes=1, linhas_por_revisao=linhas, seed=99)
+
+        def via_openpyxl():
+            wb = load_workbook(io.BytesIO(conteudo))
+            _write_df_to_worksheet(wb["Base de Dados"], df)
+            wb.save(io.BytesIO())
+
+        def via_zip():
+            substituir_abas_xlsx(conteudo, {"Base de Dados": df})
+
+        t_a, m_a = _medir(via_openpyxl)
+        t_b, m_b = _medir(via_zip)
+        print(f"{linhas * colunas:9d} {linhas:7d} | {t_a * 1000:9.0f} ms {m_a:8.1f} MiB | "
+              f"{t_b * 1000:9.0f} ms {m_b:8.1f} MiB | {t_a / t_b:4.1f}x")
+
+# ============================================================
+# esquema: Base de Dados como lida (texto/object) x tipada (category + float)
+# ============================================================
+
+def _tempo_ms(func, repeticoes: int = 5) -> float:
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        func()
+        melhor = min(melhor, time.perf_counter() - t0)
+    return melhor * 1000
+
+def bench_esquema(args) -> None:
+    import pickle
+    import entrada_saida.funcoes_io as fio
+
+    def operacoes(df: pd.DataFrame) -> dict:
+        meses = [c for c in df.columns if c not in COLUNAS_ID][:6]
+        semana = "Semana 03 - v01"
+        return {
+            "moderado": lambda: fio._filtrar_moderado(df),
+            "semana+ger": lambda: df[(df["Revisão"] == semana) & (df["Gerência"] == "Gerência 3")],
+            "melt+soma": lambda: df.melt(id_vars=["Revisão"], value_vars=meses, var_name="Mês", value_name="Valor")
+                                   .groupby(["Mês", "Revisão"], sort=False, observed=True)["Valor"].sum(),
+            "cópia cache_data": lambda: pickle.loads(pickle.dumps(df)),
+        }
+
+    padrao = fio.ESQUEMA_FLOAT_MESES
+    nomes = list(operacoes(pd.DataFrame(columns=COLUNAS_ID)))
+    print(f"{'linhas':>7s} {'esquema':>16s} | {'memória':>9s} | " + " | ".join(f"{n:>13s}" for n in nomes))
+    for revisoes in args.revisoes:
+        bruto = gerar_base(revisoes=revisoes, linhas_por_revisao=300)
+        variantes = [("como lida", bruto)]
+        for dtype in ("float64", "float32"):
+            fio.ESQUEMA_FLOAT_MESES = dtype
+            variantes.append((f"tipada {dtype}", fio.tipar_base(bruto)))
+        fio.ESQUEMA_FLOAT_MESES = padrao
+        for nome, df in variantes:
+            mib = df.memory_usage(deep=True).sum() / 2**20
+            tempos = [_tempo_ms(f) for f in operacoes(df).values()]
+            print(f"{len(df):7d} {nome:>16s} | {mib:6.1f} MiB | " + " | ".join(f"{t:10.1f} ms" for t in tempos))
+
+# ============================================================
+# revisoes: semana ativa por máscara sobre a base inteira x partição por Revisão
+# ============================================================
+
+def bench_revisoes(args) -> None:
+    import pickle
+    from api.indice_revisoes import IndiceRevisoes
+    from entrada_saida.funcoes_io import tipar_base
+
+    print(f"{'revisões':>8s} {'linhas':>7s} | {'máscara (cópia+hash+filtro)':>27s} | {'índice: montar (1x/ETag)':>24s} | "
+          f"{'semana ativa':>12s} | {'3 revisões':>10s} | ganho")
+    for revisoes in args.revisoes:
+        base = tipar_base(gerar_base(revisoes=revisoes, linhas_por_revisao=300))
+        ativa = base["Revisão"].iloc[-1]
+        ultimas = list(dict.fromkeys(base["Revisão"]))[-3:]
+
+        def por_mascara():
+            # caminho antigo: cópia do cache_data, hash do DataFrame argumento e varredura
+            df = pickle.loads(pickle.dumps(base))
+            pd.util.hash_pandas_object(df)
+            return df[df["Revisão"] == ativa].copy()
+
+        t_montar = _tempo_ms(lambda: IndiceRevisoes(base), repeticoes=3)
+        indice = IndiceRevisoes(base)
+        assert indice.revisao(ativa).equals(por_mascara())
+        t_antigo = _tempo_ms(por_mascara)
+        t_semana = _tempo_ms(lambda: indice.revisao(ativa).copy())
+        t_varias = _tempo_ms(lambda: indice.varias(ultimas).copy())
+        print(f"{revisoes:8d} {len(base):7d} | {t_antigo:24.1f} ms | {t_montar:21.1f} ms | "
+              f"{t_semana:9.2f} ms | {t_varias:7.2f} ms | {t_antigo / t_semana:5.0f}x")
+
+# ============================================================
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("download", help="download condicional x legado no servidor falso")
+    p.add_argument("--latencia", type=float, default=0.05, help="latência simulada por chamada (s)")
+    p.set_defaults(func=bench_download)
+
+    p = sub.add_parser("concorrencia", help="N sessões relendo após um salvamento (downloads coalescidos)")
+    p.add_argument("--sessoes", type=int, default=30)
+    p.add_argument("--latencia", type=float, default=0.05, help="latência simulada por chamada (s)")
+    p.set_defaults(func=bench_concorrencia)
+
+    p = sub.add_parser("idas", help="idas e voltas ao Graph por carregamento de página e por salvamento")
+    p.add_argument("--latencia", type=float, default=0.05, help="latência simulada por chamada (s)")
+    p.set_defaults(func=bench_idas)
+
+    p = sub.add_parser("limitacao", help="429 do SharePoint: Retry-After, disjuntor e leitura do cache")
+    p.add_argument("--sessoes", type=int, default=20)
+    p.add_argument("--janela", type=float, default=1.0, help="duração da limitação curta (s)")
+    p.add_argument("--latencia", type=float, default=0.02, help="latência simulada por chamada (s)")
+    p.set_defaults(func=bench_limitacao)
+
+    p = sub.add_parser("taxa", help="limitador token bucket: pico de requisições e espera na fila")
+    p.add_argument("--sessoes", type=int, default=20)
+    p.add_argument("--chamadas", type=int, default=10, help="consultas de metadados por sessão")
+    p.add_argument("--taxa", type=float, default=50, help="requisições de leitura por segundo")
+    p.add_argument("--rajada", type=float, default=20)
+    p.add_argument("--latencia", type=float, default=0.02, help="latência simulada por chamada (s)")
+    p.set_defaults(func=bench_taxa)
+
+    p = sub.add_parser("fila", help="salvamentos simultâneos: cada sessão gravando x fila de escrita do processo")
+    p.add_argument("--sessoes", type=int, default=10)
+    p.add_argument("--trava", type=float, default=0.5, help="segundos em que o arquivo fica bloqueado (423) após cada PUT")
+    p.add_argument("--latencia", type=float, default=0.05, help="latência simulada por chamada (s)")
+    p.set_defaults(func=bench_fila)
+
+    p = sub.add_parser("historico", help="acrescentar ao histórico: regravar a aba x SQLite só de acréscimo")
+    p.add_argument("--linhas", type=int, nargs="+", default=[2000, 20000], help="tamanhos do histórico existente")
+    p.add_argument("--edicoes", type=int, default=20, help="linhas acrescentadas por salvamento")
+    p.add_argument("--latencia", type=float, default=0.05, help="latência simulada por chamada (s)")
+    p.set_defaults(func=bench_historico)
+
+    p = sub.add_parser("armazenamento", help="mesmo fluxo sobre o Graph (servidor falso) e sobre um diretório local")
+    p.add_argument("--sessoes", type=int, default=10)
+    p.add_argument("--latencia", type=float, default=0.05, help="latência simulada por chamada do Graph (s)")
+    p.set_defaults(func=bench_armazenamento)
+
+    p = sub.add_parser("arquivo", help="Base de Dados crescendo x revisões antigas no arquivo frio")
+    p.add_argument("--revisoes", type=int, nargs="+", default=[20, 60], help="revisões (300 linhas cada)")
+    p.add_argument("--manter", type=int, default=8, help="revisões mantidas na planilha")
+    p.add_argument("--latencia", type=float, default=0.02, help="latência simulada por chamada (s)")
+    p.set_defaults(func=bench_arquivo)
+
+    p = sub.add_parser("parse", help="read_excel a frio x cache colunar a quente")
+    p.add_argument("--revisoes", type=int, nargs="+", default=[5, 20, 50], help="revisões (300 linhas cada)")
+    p.set_defaults(func=bench_parse)
+
+    p = sub.add_parser("abas", help="abas pequenas: read_excel x leitor streaming")
+    p.add_argument("--revisoes", type=int, nargs="+", default=[5, 20, 50], help="revisões (300 linhas cada)")
+    p.set_defaults(func=bench_abas)
+
+    p = sub.add_parser("escrita", help="salvar uma aba: openpyxl x troca no zip (com verificação de ida e volta)")
+    p.add_argument("--revisoes", type=int, nargs="+", default=[5, 20, 50], help="revisões (300 linhas cada)")
+    p.set_defaults(func=bench_escrita)
+
+    p = sub.add_parser("serializacao", help="serialização da Base de Dados: append linha a linha x blocos por coluna")
+    p.add_argument("--celulas", type=int, nargs="+", default=[50_000, 200_000, 1_000_000], help="tamanhos (células)")
+    p.set_defaults(func=bench_serializacao)
+
+    p = sub.add_parser("esquema", help="Base de Dados como lida x tipada: memória e latência de filtros")
+    p.add_argument("--revisoes", type=int, nargs="+", default=[10, 50, 200], help="revisões (300 linhas cada)")
+    p.set_defaults(func=bench_esquema)
+
+    p = sub.add_parser("revisoes", help="semana ativa: máscara sobre a base inteira x partição por Revisão")
+    p.add_argument("--revisoes", type=int, nargs="+", default=[10, 50, 200], help="revisões (300 linhas cada)")
+    p.set_defaults(func=bench_revisoes)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -15,7 +15,7 @@ _start_total = time.time()
 # Ajuste de path
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
-from configuracoes.config import COLUNAS_ID, COLUNAS_MESES
+from configuracoes.config import COLUNAS_ID
 from entrada_saida.funcoes_io import (
     carregar_previsto,
     salvar_base_dados,
@@ -178,11 +178,6 @@ def _carregar_base_somente_uma_vez() -> pd.DataFrame:
     # Só mantém Moderado
     df = _filtrar_moderado(df)
 
-    # Ajusta meses
-    COLUNAS_MESES.clear()
-    cols_meses = [c for c in df.columns if c not in COLUNAS_ID and pd.notnull(pd.to_datetime(c, errors="coerce", dayfirst=True))]
-    COLUNAS_MESES.extend(cols_meses)
-
     st.session_state.df_previsto = df
     st.session_state.semana_nova = semana_ativa
     st.session_state.meses_permitidos_admin = meses_controle
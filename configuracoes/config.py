@@ -1,6 +1,96 @@
 # config.py
+import os
+import tempfile
+
 NOME_ARQUIVO_PREVISTO = "Base_Revisoes_Cronograma.xlsx"
 NOME_ARQUIVO_REFINADO = "02_refinado_output.xlsx"
 # Adicionado 'Análise de emissão' para proteção total
 COLUNAS_ID = ["Classificação", "Revisão", "CC", "Complexo", "Área", "Gerência", "Cenário", "Análise de emissão"]
-COLUNAS_MESES = []
+
+# ============================================================
+# Desempenho (valores padrão; podem ser sobrescritos por variáveis de ambiente)
+# ============================================================
+
+# Pool de conexões HTTP (uma sessão keep-alive por host)
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))            # conexões simultâneas por host
+HTTP_KEEPALIVE_OCIOSO = float(os.getenv("HTTP_KEEPALIVE_OCIOSO", "240"))  # segundos sem uso antes de reciclar a sessão
+
+# Download condicional (If-None-Match): 1 chamada por leitura, 304 quando o arquivo não mudou
+DOWNLOAD_CONDICIONAL = os.getenv("DOWNLOAD_CONDICIONAL", "1") == "1"
+
+# Cache em disco dos bytes do workbook por ETag (vazio = desligado); sobrevive a restart/deploy
+CACHE_DISCO_DIR = os.getenv("CACHE_DISCO_DIR", "")
+CACHE_DISCO_LIMITE_MB = int(os.getenv("CACHE_DISCO_LIMITE_MB", "200"))
+
+# Cache colunar (Arrow IPC) das abas parseadas por (ETag, aba) (vazio = desligado)
+CACHE_COLUNAR_DIR = os.getenv("CACHE_COLUNAR_DIR", "")
+CACHE_COLUNAR_LIMITE_MB = int(os.getenv("CACHE_COLUNAR_LIMITE_MB", "500"))
+
+# Tipo das colunas de mês na "Base de Dados" tipada (float64 ou float32, metade da memória;
+# float32 só é usado numa coluna quando todos os valores cabem nele sem arredondar)
+ESQUEMA_FLOAT_MESES = os.getenv("ESQUEMA_FLOAT_MESES", "float64")
+
+# Salvar uma aba trocando só o XML dela no zip (demais abas copiadas byte a byte);
+# 0 (padrão) = openpyxl no workbook inteiro, como sempre foi
+SALVAR_POR_ZIP = os.getenv("SALVAR_POR_ZIP", "0") == "1"
+
+# IDs (site/drive/item) do arquivo no SharePoint persistidos entre reinícios (vazio = só memória);
+# conferidos só quando o Graph responder 404
+GRAPH_IDS_ARQUIVO = os.getenv("GRAPH_IDS_ARQUIVO", os.path.join(tempfile.gettempdir(), "graph_ids.json"))
+
+# Onde fica a planilha: "graph" (SharePoint via Microsoft Graph) ou "local" (o .xlsx dentro de
+# ARMAZENAMENTO_LOCAL_DIR; roda e mede o app sem acesso ao Graph)
+ARMAZENAMENTO = os.getenv("ARMAZENAMENTO", "graph")
+ARMAZENAMENTO_LOCAL_DIR = os.getenv("ARMAZENAMENTO_LOCAL_DIR", "dados_locais")
+
+# JSON $batch: chamadas de metadados independentes do Graph vão juntas em uma ida e volta
+GRAPH_LOTE = os.getenv("GRAPH_LOTE", "1") == "1"
+
+# Política de retry compartilhada por classe de endpoint (metadados, download, upload, token):
+# falhas de sobrecarga seguidas que abrem o disjuntor, segundos aberto e quanto cada sucesso
+# devolve ao orçamento de repetições (máx. RETRY_ORCAMENTO_MAX repetições acumuladas)
+RETRY_LIMIAR_DISJUNTOR = int(os.getenv("RETRY_LIMIAR_DISJUNTOR", "5"))
+RETRY_JANELA_DISJUNTOR = float(os.getenv("RETRY_JANELA_DISJUNTOR", "30"))
+RETRY_ORCAMENTO_RAZAO = float(os.getenv("RETRY_ORCAMENTO_RAZAO", "0.2"))
+RETRY_ORCAMENTO_MAX = float(os.getenv("RETRY_ORCAMENTO_MAX", "20"))
+
+# Limite de taxa do processo para chamadas ao Graph (token bucket; taxa 0 = sem limite, o padrão):
+# requisições por segundo e rajada para leituras (GET, $batch) e escritas (PUT etc.);
+# ex.: GRAPH_TAXA_LEITURA=10 / GRAPH_RAJADA_LEITURA=30 e GRAPH_TAXA_ESCRITA=2 / GRAPH_RAJADA_ESCRITA=5
+GRAPH_TAXA_LEITURA = float(os.getenv("GRAPH_TAXA_LEITURA", "0"))
+GRAPH_RAJADA_LEITURA = float(os.getenv("GRAPH_RAJADA_LEITURA", "30"))
+GRAPH_TAXA_ESCRITA = float(os.getenv("GRAPH_TAXA_ESCRITA", "0"))
+GRAPH_RAJADA_ESCRITA = float(os.getenv("GRAPH_RAJADA_ESCRITA", "5"))
+
+# Salvamento otimista: PUT com If-Match sobre os bytes em cache; em 412 (alguém salvou antes)
+# baixa a versão nova e refaz a alteração sobre ela até este número de vezes
+SALVAR_MAX_REBASES = int(os.getenv("SALVAR_MAX_REBASES", "3"))
+
+# Fila de escrita do processo (1 = ligada; padrão 0 = cada sessão grava por conta própria): um
+# único gravador; salvamentos que chegam durante um upload (ou nesta janela em ms) vão juntos no próximo
+SALVAR_FILA = os.getenv("SALVAR_FILA", "0") == "1"
+SALVAR_FILA_JANELA_MS = float(os.getenv("SALVAR_FILA_JANELA_MS", "50"))
+
+# Arquivo frio (0 = desligado): revisões além das ARQUIVO_MANTER_SEMANAS mais recentes saem da
+# 'Base de Dados' para arquivos Arrow em ARQUIVO_REVISOES_DIR (use um diretório persistente)
+# e só são lidas quando o dashboard as seleciona
+ARQUIVO_MANTER_SEMANAS = int(os.getenv("ARQUIVO_MANTER_SEMANAS", "0"))
+ARQUIVO_REVISOES_DIR = os.getenv("ARQUIVO_REVISOES_DIR", "arquivo_revisoes")
+
+# Histórico de edições num SQLite local só de acréscimo (vazio = desligado: regrava a aba
+# 'Histórico' a cada salvamento; use um caminho persistente). As linhas novas são copiadas para
+# a aba em lote (compactação) quando acumulam HISTORICO_COMPACTAR_LINHAS ou a mais antiga passa
+# de HISTORICO_COMPACTAR_S segundos (conferido também em segundo plano e no encerramento)
+HISTORICO_SQLITE = os.getenv("HISTORICO_SQLITE", "")
+HISTORICO_COMPACTAR_LINHAS = int(os.getenv("HISTORICO_COMPACTAR_LINHAS", "200"))
+HISTORICO_COMPACTAR_S = float(os.getenv("HISTORICO_COMPACTAR_S", "900"))
+
+# Token do Graph: renovado em segundo plano esta quantidade de segundos antes de expirar
+TOKEN_MARGEM_RENOVACAO = float(os.getenv("TOKEN_MARGEM_RENOVACAO", "300"))
+
+# Observador do ETag em segundo plano (0 = desligado): baixa e parseia versões novas antes
+# do usuário pedir. Enquanto a última verificação tiver até ETAG_MAX_DEFASAGEM segundos,
+# as leituras usam os bytes em memória sem consultar o SharePoint.
+ETAG_POLL_SEGUNDOS = float(os.getenv("ETAG_POLL_SEGUNDOS", "0"))
+ETAG_MAX_DEFASAGEM = float(os.getenv("ETAG_MAX_DEFASAGEM", "60"))
+ETAG_PREAQUECER_ABAS = [a.strip() for a in os.getenv("ETAG_PREAQUECER_ABAS", "Controle,Usuarios,Base de Dados").split(",") if a.strip()]
@@ -1,29 +1,59 @@
+import atexit
+import os
+import threading
 import time
-import random
-from typing import List, Set
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set
 
+import numpy as np
 import pandas as pd
 import streamlit as st
+
 import requests
 
-from configuracoes.config import COLUNAS_ID, COLUNAS_MESES
+from configuracoes.config import (
+    COLUNAS_ID,
+    ESQUEMA_FLOAT_MESES,
+    SALVAR_FILA,
+    SALVAR_FILA_JANELA_MS,
+    HISTORICO_SQLITE,
+    HISTORICO_COMPACTAR_LINHAS,
+    HISTORICO_COMPACTAR_S,
+    ARQUIVO_MANTER_SEMANAS,
+    ARQUIVO_REVISOES_DIR,
+)
 from api.graph_api import (
     baixar_aba_excel,
-    baixar_arquivo_excel,
+    aba_derivada,
+    cache_por_etag,
+    novo_version_token,
     salvar_arquivo_excel_modificado,
-    salvar_aba_controle,
-    salvar_apenas_aba,
     carregar_semana_ativa,
+    politica_retry,
+    idas_e_voltas_thread,
+    creditar_idas_e_voltas,
+    df_controle,
+    AbaNova,
+    ConflitoEdicao,
 )
+from api.politica_retry import CircuitoAberto, status_http
+from api.limitador_taxa import prioridade, PRIORIDADE_SALVAR
+from api.fila_escrita import FilaEscrita, compor
+from api.historico_sqlite import HistoricoSQLite, COLUNA_ID
+from api.indice_revisoes import IndiceRevisoes
+from api.esquema_planilha import EsquemaPlanilha
+from api.arquivo_revisoes import ArquivoRevisoes
 
 # ============================================================
-# Helpers de meses (mantém compatibilidade com o app)
+# Esquema (colunas de ID e de mês) — um por ETag, somente leitura
 # ============================================================
 
-def _touch_meses(df: pd.DataFrame) -> None:
-    """Atualiza a lista global COLUNAS_MESES com base nas colunas do DF informado."""
-    COLUNAS_MESES.clear()
-    COLUNAS_MESES.extend([c for c in df.columns if c not in COLUNAS_ID])
+def _esquema_da_base(df: pd.DataFrame) -> EsquemaPlanilha:
+    return EsquemaPlanilha(df.columns, COLUNAS_ID)
+
+def esquema_planilha(version_token: int = 0) -> EsquemaPlanilha:
+    """Esquema da 'Base de Dados' (meses em ordem de calendário, datas e rótulos 'Jan/26')."""
+    return aba_derivada("Base de Dados", "esquema", _esquema_da_base, version_token=version_token)
 
 # ============================================================
 # Filtragem de cenário
@@ -33,37 +63,85 @@ def _filtrar_moderado(df: pd.DataFrame) -> pd.DataFrame:
     """Mantém apenas Cenário Moderado."""
     if "Cenário" not in df.columns:
         return df
-    return df[df["Cenário"].str.casefold() == "moderado"].copy()
+    cenario = df["Cenário"]
+    if isinstance(cenario.dtype, pd.CategoricalDtype):
+        # casefold só nas categorias (poucas); nas linhas, comparação de códigos inteiros
+        codigos = [i for i, c in enumerate(cenario.cat.categories) if str(c).casefold() == "moderado"]
+        return df[cenario.cat.codes.isin(codigos)].copy()
+    return df[cenario.str.casefold() == "moderado"].copy()
 
 # ============================================================
-# Carregamentos (cacheados) — 1x por sessão
+# Esquema tipado da "Base de Dados" (aplicado uma vez por ETag)
 # ============================================================
 
-@st.cache_data(ttl=None, show_spinner=False, max_entries=6)
+def _tipar_mes(serie: pd.Series) -> pd.Series:
+    """Coluna de mês como número, só se nada se perde: texto ('-', 'n/d', notas) mantém a coluna como veio."""
+    numeros = pd.to_numeric(serie, errors="coerce")
+    if (numeros.isna() & serie.notna()).any():
+        return serie
+    numeros = numeros.astype("float64")
+    if ESQUEMA_FLOAT_MESES != "float64":
+        reduzida = numeros.astype(ESQUEMA_FLOAT_MESES)
+        if np.array_equal(reduzida.to_numpy("float64"), numeros.to_numpy(), equal_nan=True):
+            return reduzida
+    return numeros
+
+def tipar_base(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Colunas de ID (COLUNAS_ID) e Cenário → category (mesmos textos); colunas de mês → número
+    (ESQUEMA_FLOAT_MESES quando exato). Sem perdas: destipar_base() devolve o que foi lido.
+    """
+    if df is None or df.empty:
+        return df
+    esquema = _esquema_da_base(df)
+    colunas = {}
+    for c in df.columns:
+        serie = df[c]
+        if c == "Cenário" or c in COLUNAS_ID:
+            colunas[c] = serie if isinstance(serie.dtype, pd.CategoricalDtype) else serie.astype("category")
+        elif esquema.eh_mes(c):
+            colunas[c] = _tipar_mes(serie)
+        else:
+            colunas[c] = serie
+    return pd.DataFrame(colunas, index=df.index)
+
+def destipar_base(df: pd.DataFrame) -> pd.DataFrame:
+    """Categorias de volta a valores comuns (object), como a planilha guarda; o resto fica igual."""
+    if df is None or df.empty:
+        return df
+    categoricas = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+    if not categoricas:
+        return df
+    return df.astype({c: object for c in categoricas})
+
+def _indexar_base(df: pd.DataFrame) -> IndiceRevisoes:
+    return IndiceRevisoes(_filtrar_moderado(tipar_base(df)))
+
+def indice_revisoes(version_token: int = 0) -> IndiceRevisoes:
+    """
+    'Base de Dados' tipada (só Moderado) particionada por Revisão, montada uma vez por ETag e
+    compartilhada entre sessões. Somente leitura: copie antes de alterar.
+    """
+    return aba_derivada("Base de Dados", "revisoes", _indexar_base, version_token=version_token)
+
+# ============================================================
+# Carregamentos (cacheados por ETag — ver cache_por_etag)
+# ============================================================
+
+@cache_por_etag("Base de Dados")
 def carregar_previsto(version_token: int = 0) -> pd.DataFrame:
-    """Carrega a aba 'Base de Dados' (completa, somente Moderado)."""
-    df = baixar_aba_excel("Base de Dados", version_token=version_token)
-    df = _filtrar_moderado(df)
-    _touch_meses(df)
-    return df
-
-@st.cache_data(ttl=None, show_spinner=False, max_entries=12)
-def _filtrar_por_semana(df_base: pd.DataFrame, semana: str) -> pd.DataFrame:
-    """Filtra uma base pela revisão (semana)."""
-    if "Revisão" not in df_base.columns:
-        return pd.DataFrame()
-    df = df_base[df_base["Revisão"] == semana].copy()
-    df = _filtrar_moderado(df)
-    _touch_meses(df)
-    return df
+    """Carrega a aba 'Base de Dados' (completa, na ordem da aba, somente Moderado, já tipada — ver tipar_base)."""
+    return indice_revisoes(version_token=version_token).original
 
-@st.cache_data(ttl=None, show_spinner=False, max_entries=1)
+@cache_por_etag("Base de Dados")
 def carregar_previsto_semana(semana: str, version_token: int = 0) -> pd.DataFrame:
-    """Carrega apenas uma semana específica (Moderado)."""
-    base = carregar_previsto(version_token=version_token)
-    return _filtrar_por_semana(base, semana)
+    """Carrega apenas uma semana específica (Moderado), direto da partição da revisão."""
+    indice = indice_revisoes(version_token=version_token)
+    if "Revisão" not in indice.df.columns:
+        return pd.DataFrame()
+    return indice.revisao(semana).copy()
 
-@st.cache_data(ttl=None, show_spinner=False, max_entries=1)
+@cache_por_etag("Base de Dados", "Controle")
 def carregar_previsto_semana_ativa(version_token: int = 0) -> pd.DataFrame:
     """Carrega apenas a semana ativa (Controle, Moderado)."""
     info = carregar_semana_ativa(version_token=version_token)
@@ -72,7 +150,7 @@ def carregar_previsto_semana_ativa(version_token: int = 0) -> pd.DataFrame:
     semana = info["semana"]
     return carregar_previsto_semana(semana, version_token=version_token)
 
-@st.cache_data(ttl=None, show_spinner=False, max_entries=2)
+@cache_por_etag("Refinado")
 def carregar_refinado(version_token: int = 0,
                       colunas_id: List[str] = None,
                       colunas_meses: List[str] = None) -> pd.DataFrame:
@@ -88,27 +166,62 @@ def carregar_refinado(version_token: int = 0,
 # Persistência com retry/backoff
 # ============================================================
 
-def _tentar_salvar(func, tentativas: int = 6, delay_inicial: float = 2.0) -> None:
-    """Executa salvamento com retry/backoff (423 / timeout / conexão)."""
-    for tentativa in range(1, tentativas + 1):
-        try:
-            return func()
-        except requests.exceptions.HTTPError as e:
-            status = getattr(getattr(e, "response", None), "status_code", None)
-            if status == 423:
-                espera = delay_inicial * (2 ** (tentativa - 1)) + random.uniform(0, 0.8)
-                st.warning(f"Arquivo bloqueado (423). Nova tentativa em {espera:.1f}s... [{tentativa}/{tentativas}]")
-                time.sleep(espera)
-                continue
-            raise
-        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
-            espera = delay_inicial * (2 ** (tentativa - 1)) + random.uniform(0, 0.8)
-            st.warning(f"Instabilidade de rede. Nova tentativa em {espera:.1f}s... [{tentativa}/{tentativas}]")
-            time.sleep(espera)
-            continue
-        except Exception:
-            raise
-    raise Exception("Não foi possível salvar após múltiplas tentativas.")
+def _avisar(erro, espera: float, tentativa: int, total: int) -> None:
+    status = status_http(erro)
+    if isinstance(erro, CircuitoAberto):
+        motivo = "SharePoint sobrecarregado"
+    elif status == 423:
+        motivo = "Arquivo bloqueado (423)"
+    elif status is not None:
+        motivo = f"SharePoint limitou as requisições ({status})"
+    else:
+        motivo = "Instabilidade de rede"
+    st.warning(f"{motivo}. Nova tentativa em {espera:.1f}s... [{tentativa}/{total}]")
+
+def _gravar_abas(abas: Dict[str, List[AbaNova]], ao_esperar, tentativas: int = 6, delay_inicial: float = 2.0) -> int:
+    """
+    Grava as abas (alterações compostas em ordem) num único upload, com a política de retry
+    compartilhada (classe 'salvamento'): 423 / 429 / 5xx / timeout / conexão, respeitando
+    Retry-After e o disjuntor do Graph. Retorna as idas e voltas gastas.
+    """
+    antes = idas_e_voltas_thread()
+    # leituras de merge e o upload passam na frente das atualizações de fundo no limitador
+    with prioridade(PRIORIDADE_SALVAR):
+        politica_retry().executar(
+            "salvamento",
+            lambda: salvar_arquivo_excel_modificado({aba: compor(alts) for aba, alts in abas.items()}),
+            tentativas=tentativas, espera_inicial=delay_inicial, ao_esperar=ao_esperar,
+        )
+    return idas_e_voltas_thread() - antes
+
+@st.cache_resource(show_spinner=False)
+def _fila_escrita() -> FilaEscrita:
+    return FilaEscrita(
+        _gravar_abas,
+        janela_s=SALVAR_FILA_JANELA_MS / 1000,
+        erros_compartilhados=(requests.exceptions.RequestException, CircuitoAberto, ConflitoEdicao),
+    )
+
+def estatisticas_fila_escrita() -> dict:
+    return _fila_escrita().estatisticas()
+
+def _tentar_salvar(abas: Dict[str, List[AbaNova]]) -> None:
+    """
+    Envia o salvamento à fila de escrita do processo e espera o upload que o incluiu.
+    Os avisos de nova tentativa aparecem na tela de quem enviou. SALVAR_FILA=0 grava direto.
+    """
+    if not SALVAR_FILA:
+        _gravar_abas(abas, _avisar)
+        return
+    pedido = _fila_escrita().enviar(abas)
+    vistos = 0
+    while not pedido.aguardar(0.25):
+        for aviso in pedido.avisos[vistos:]:
+            _avisar(*aviso)
+        vistos = len(pedido.avisos)
+    if pedido.erro is not None:
+        raise pedido.erro
+    creditar_idas_e_voltas(pedido.resultado or 0)
 
 # ============================================================
 # Utilidades de DataFrame
@@ -133,55 +246,270 @@ def _substituir_por_revisao(df_existente: pd.DataFrame, df_novo: pd.DataFrame) -
 # Salvamentos (sempre Moderado)
 # ============================================================
 
-def salvar_base_dados(df: pd.DataFrame, append: bool = False, version_token: int = 0) -> None:
-    """Salva na aba 'Base de Dados', forçando Moderado."""
-    df = _filtrar_moderado(df)
-
-    if append:
-        def _append():
-            try:
-                df_existente = baixar_aba_excel("Base de Dados", version_token=version_token)
-            except Exception:
-                df_existente = pd.DataFrame(columns=df.columns)
-            df_final = _safe_concat(df_existente, df)
-            df_final = _filtrar_moderado(df_final)
-            salvar_apenas_aba("Base de Dados", df_final, version_token=version_token or 1)
-        _tentar_salvar(_append)
-        return
+def _alteracao_base_dados(df: pd.DataFrame, append: bool = False) -> AbaNova:
+    """
+    Alteração da 'Base de Dados' como função da aba atual (append ou troca por revisão).
+    O merge é feito sobre a aba da versão que está sendo gravada: se outra sessão salvar
+    antes (conflito), ele é refeito sobre a versão nova.
+    """
+    df = destipar_base(_filtrar_moderado(df))
 
-    def _merge_and_save():
-        try:
-            df_existente = baixar_aba_excel("Base de Dados", version_token=version_token)
-        except Exception:
+    def _aplicar(df_existente: Optional[pd.DataFrame]) -> pd.DataFrame:
+        if df_existente is None:
             df_existente = pd.DataFrame(columns=df.columns)
-
+        if append:
+            return _filtrar_moderado(_safe_concat(df_existente, df))
         if "Revisão" in df.columns and not df.empty:
             df_final = _substituir_por_revisao(df_existente, df)
         else:
             df_final = df
+        return _filtrar_moderado(df_final)
+    return _aplicar
 
-        df_final = _filtrar_moderado(df_final)
-        salvar_apenas_aba("Base de Dados", df_final, version_token=version_token or 1)
+def _alteracao_anexar(df: pd.DataFrame) -> AbaNova:
+    """Acrescenta 'df' (só Moderado) ao fim da aba atual."""
+    df = destipar_base(_filtrar_moderado(df))
 
-    _tentar_salvar(_merge_and_save)
+    def _aplicar(df_existente: Optional[pd.DataFrame]) -> pd.DataFrame:
+        df_final = df if df_existente is None else _safe_concat(df_existente, df)
+        return _filtrar_moderado(df_final)
+    return _aplicar
+
+def salvar_base_dados(df: pd.DataFrame, append: bool = False, version_token: int = 0) -> None:
+    """Salva na aba 'Base de Dados', forçando Moderado."""
+    _tentar_salvar({"Base de Dados": [_alteracao_base_dados(df, append)]})
 
 def salvar_refinado(df: pd.DataFrame, version_token: int = 0) -> None:
     """Salva aba 'Refinado', forçando Moderado."""
-    df = _filtrar_moderado(df)
-    _tentar_salvar(lambda: salvar_apenas_aba("Refinado", df, version_token=version_token or 1))
+    _tentar_salvar({"Refinado": [_filtrar_moderado(df)]})
 
 def salvar_em_aba(df: pd.DataFrame, aba: str = "Histórico", version_token: int = 0) -> None:
-    """Salva em aba arbitrária, mantendo Moderado."""
-    df = _filtrar_moderado(df)
-    def _append():
-        try:
-            df_existente = baixar_aba_excel(aba, version_token=version_token)
-            df_final = _safe_concat(df_existente, df)
-        except Exception:
-            df_final = df
-        df_final = _filtrar_moderado(df_final)
-        salvar_apenas_aba(aba, df_final, version_token=version_token or 1)
-    _tentar_salvar(_append)
+    """Salva em aba arbitrária, mantendo Moderado. 'Histórico' vai para o SQLite (ver abaixo)."""
+    if aba == ABA_HISTORICO and HISTORICO_SQLITE:
+        _anexar_historico(df)
+        return
+    _tentar_salvar({aba: [_alteracao_anexar(df)]})
+
+# ============================================================
+# Transação: várias abas, um único upload
+# ============================================================
+
+class TransacaoPlanilha:
+    """
+    Junta alterações em várias abas e grava todas de uma vez: um único workbook em
+    memória, um único upload (com If-Match/rebase). Base de Dados e Controle nunca ficam
+    em versões diferentes no SharePoint. Várias alterações na mesma aba são aplicadas
+    na ordem em que foram registradas.
+    """
+
+    def __init__(self):
+        self._abas: Dict[str, List[AbaNova]] = {}
+        self._historico: List[pd.DataFrame] = []
+
+    def alterar_aba(self, aba: str, alteracao: AbaNova) -> "TransacaoPlanilha":
+        """'alteracao': DataFrame (substitui a aba) ou função da aba atual."""
+        self._abas.setdefault(aba, []).append(alteracao)
+        return self
+
+    def salvar_base_dados(self, df: pd.DataFrame, append: bool = False) -> "TransacaoPlanilha":
+        return self.alterar_aba("Base de Dados", _alteracao_base_dados(df, append))
+
+    def salvar_refinado(self, df: pd.DataFrame) -> "TransacaoPlanilha":
+        return self.alterar_aba("Refinado", _filtrar_moderado(df))
+
+    def salvar_em_aba(self, df: pd.DataFrame, aba: str = "Histórico") -> "TransacaoPlanilha":
+        if aba == ABA_HISTORICO and HISTORICO_SQLITE:
+            self._historico.append(df)  # acrescentado no SQLite depois do upload das abas
+            return self
+        return self.alterar_aba(aba, _alteracao_anexar(df))
+
+    def salvar_semana_ativa(self, semana: str, meses_permitidos: Optional[List[str]] = None) -> "TransacaoPlanilha":
+        return self.alterar_aba("Controle", df_controle(semana, meses_permitidos))
+
+    def arquivar_revisoes_antigas(self, manter: Optional[int] = None,
+                                  preservar: Iterable[str] = ()) -> "TransacaoPlanilha":
+        """Ver arquivar_revisoes_antigas(); sem efeito com o arquivo frio desligado."""
+        manter = ARQUIVO_MANTER_SEMANAS if manter is None else manter
+        if manter > 0:
+            self.alterar_aba("Base de Dados", _alteracao_arquivar(manter, preservar))
+        return self
+
+    def gravar(self) -> None:
+        """Aplica tudo ao mesmo workbook e envia uma única vez (pela fila de escrita, com retry)."""
+        if self._abas:
+            _tentar_salvar({aba: list(alteracoes) for aba, alteracoes in self._abas.items()})
+            self._abas.clear()
+        for df in self._historico:
+            _anexar_historico(df)
+        self._historico.clear()
+
+@contextmanager
+def transacao_planilha() -> Iterator[TransacaoPlanilha]:
+    """
+    Uso:
+        with transacao_planilha() as tx:
+            tx.salvar_base_dados(df_nova, append=True)
+            tx.salvar_semana_ativa(semana, meses)
+    Grava ao sair do bloco; se o bloco levantar exceção, nada é enviado.
+    """
+    tx = TransacaoPlanilha()
+    yield tx
+    tx.gravar()
+
+# ============================================================
+# Histórico: SQLite só de acréscimo + compactação na aba
+# ============================================================
+
+ABA_HISTORICO = "Histórico"
+_LOCK_COMPACTACAO = threading.Lock()
+
+@st.cache_resource(show_spinner=False)
+def _historico() -> HistoricoSQLite:
+    """
+    SQLite do histórico. Na primeira abertura importa a aba antes de qualquer acréscimo: os
+    ids novos continuam depois do maior 'ID Histórico' já gravado nela.
+    """
+    historico = HistoricoSQLite(HISTORICO_SQLITE)
+    if not historico.importado():
+        historico.importar(baixar_aba_excel(ABA_HISTORICO))
+    _compactacao_periodica()
+    return historico
+
+@st.cache_resource(show_spinner=False)
+def _compactacao_periodica() -> threading.Thread:
+    """Confere os pendentes em segundo plano e no encerramento do processo (não só ao anexar)."""
+    thread = threading.Thread(target=_loop_compactacao, name="compactar-historico-periodico", daemon=True)
+    thread.start()
+    atexit.register(_compactar_sem_erro)
+    return thread
+
+def estatisticas_historico() -> dict:
+    return _historico().estatisticas() if HISTORICO_SQLITE else {}
+
+def _alteracao_compactar(novas: pd.DataFrame) -> AbaNova:
+    """Acrescenta as linhas do SQLite à aba, pulando as que já estão lá (mesmo ID Histórico)."""
+    def _aplicar(df_existente: Optional[pd.DataFrame]) -> pd.DataFrame:
+        if df_existente is None or df_existente.empty:
+            return novas
+        linhas = novas
+        if COLUNA_ID in df_existente.columns:
+            ja_gravados = set(pd.to_numeric(df_existente[COLUNA_ID], errors="coerce").dropna().astype(int))
+            linhas = novas[~novas[COLUNA_ID].isin(ja_gravados)]
+        return _safe_concat(df_existente, linhas)
+    return _aplicar
+
+def compactar_historico() -> int:
+    """
+    Copia para a aba 'Histórico' (um único upload) as linhas do SQLite que ainda não estão
+    nela. Retorna quantas foram copiadas (0 se não havia ou se outra compactação está rodando).
+    """
+    if not HISTORICO_SQLITE or not _LOCK_COMPACTACAO.acquire(blocking=False):
+        return 0
+    try:
+        historico = _historico()
+        novas, ate_id = historico.pendentes()
+        if novas.empty:
+            return 0
+        _tentar_salvar({ABA_HISTORICO: [_alteracao_compactar(novas)]})
+        historico.marcar_compactado(ate_id)
+        return len(novas)
+    finally:
+        _LOCK_COMPACTACAO.release()
+
+def _compactar_sem_erro() -> None:
+    try:
+        compactar_historico()
+    except Exception:
+        pass  # as linhas continuam pendentes: a próxima compactação tenta de novo
+
+def _precisa_compactar() -> bool:
+    pendentes, idade = _historico().situacao_pendentes()
+    return pendentes >= HISTORICO_COMPACTAR_LINHAS or (pendentes > 0 and idade >= HISTORICO_COMPACTAR_S)
+
+def _loop_compactacao() -> None:
+    while True:
+        time.sleep(max(HISTORICO_COMPACTAR_S / 4, 1.0))
+        if HISTORICO_SQLITE and _precisa_compactar():
+            _compactar_sem_erro()
+
+def _anexar_historico(df: pd.DataFrame) -> None:
+    """O(linhas novas): grava só no SQLite; a aba recebe as linhas na próxima compactação."""
+    _historico().anexar(_filtrar_moderado(df))
+    if _precisa_compactar():
+        threading.Thread(target=_compactar_sem_erro, name="compactar-historico", daemon=True).start()
+
+def carregar_historico(semana=None, gerencia=None, indice=None, mes=None) -> pd.DataFrame:
+    """
+    Histórico filtrado por semana (Semana/Revisão), Gerência e/ou célula (index + Mês).
+    Com o SQLite, a consulta usa os índices; a aba só é lida uma vez, na abertura do SQLite,
+    para importar o que já estava nela.
+    """
+    if not HISTORICO_SQLITE:
+        df = baixar_aba_excel(ABA_HISTORICO)
+        for coluna, valor in (("Semana", semana), ("Gerência", gerencia), ("index", indice), ("Mês", mes)):
+            if valor is not None and coluna in df.columns:
+                df = df[df[coluna] == valor]
+        return df.reset_index(drop=True)
+    return _historico().consultar(semana=semana, gerencia=gerencia, indice=indice, mes=mes)
+
+# ============================================================
+# Arquivo frio: revisões antigas fora da "Base de Dados"
+# ============================================================
+
+@st.cache_resource(show_spinner=False)
+def _arquivo_revisoes() -> ArquivoRevisoes:
+    return ArquivoRevisoes(ARQUIVO_REVISOES_DIR)
+
+def estatisticas_arquivo_revisoes() -> dict:
+    """Revisões/linhas/bytes arquivados, leituras do disco e acertos em memória."""
+    return _arquivo_revisoes().estatisticas()
+
+def _alteracao_arquivar(manter: int, preservar: Iterable[str]) -> Callable[[Optional[pd.DataFrame]], pd.DataFrame]:
+    """
+    Função da aba atual: arquiva as revisões além das 'manter' mais recentes (ordem da aba),
+    menos as de 'preservar', e devolve a aba sem elas. Roda sobre a versão que será gravada
+    (de novo, em caso de rebase); os arquivos são gravados antes do upload, nunca depois:
+    nenhuma linha sai da aba sem estar no arquivo. Se o upload falhar, a revisão fica nos
+    dois lugares — inofensivo: arquivar de novo substitui o arquivo e o dashboard ignora
+    arquivadas que ainda estão na planilha.
+    """
+    preservar = {str(p) for p in preservar}
+
+    def _aplicar(atual: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        if atual is None or atual.empty or "Revisão" not in atual.columns:
+            return atual
+        revisoes = list(pd.unique(atual["Revisão"].dropna()))
+        antigas = [r for r in revisoes[:max(len(revisoes) - manter, 0)] if str(r) not in preservar]
+        if not antigas:
+            return atual
+        arquivo = _arquivo_revisoes()
+        for revisao in antigas:
+            arquivo.arquivar(revisao, atual[atual["Revisão"] == revisao])
+        return atual[~atual["Revisão"].isin(antigas)]
+    return _aplicar
+
+def arquivar_revisoes_antigas(manter: Optional[int] = None, preservar: Iterable[str] = ()) -> None:
+    """
+    Tira da 'Base de Dados' as revisões além das 'manter' (ARQUIVO_MANTER_SEMANAS) mais
+    recentes e as guarda no arquivo frio. A semana ativa (Controle) nunca é arquivada.
+    """
+    manter = ARQUIVO_MANTER_SEMANAS if manter is None else manter
+    if manter <= 0:
+        return
+    ativa = (carregar_semana_ativa() or {}).get("semana")
+    preservar = [*preservar, ativa] if ativa else list(preservar)
+    _tentar_salvar({"Base de Dados": [_alteracao_arquivar(manter, preservar)]})
+
+def revisoes_arquivadas() -> List[str]:
+    """Revisões no arquivo frio (a mais antiga primeiro); lista vazia se nunca houve arquivamento."""
+    if not os.path.isdir(ARQUIVO_REVISOES_DIR):
+        return []
+    return _arquivo_revisoes().revisoes()
+
+def carregar_revisoes_arquivadas(revisoes: Iterable[str]) -> pd.DataFrame:
+    """Revisões do arquivo frio, tipadas e só Moderado — lidas do disco só quando pedidas."""
+    df = _arquivo_revisoes().carregar_varias(revisoes)
+    return _filtrar_moderado(tipar_base(df)) if not df.empty else df
 
 # ============================================================
 # Transformações de negócio
@@ -222,20 +550,19 @@ def gerar_semana_a_partir_revisao(df_base: pd.DataFrame, revisao_origem: str, no
 
 def salvar_semana_ativa(semana: str, meses_permitidos: List[str] | None = None, version_token: int = 0) -> None:
     """Atualiza semana ativa no Controle."""
-    _tentar_salvar(lambda: salvar_aba_controle(semana, meses_permitidos, version_token=version_token or 1))
+    _tentar_salvar({"Controle": [df_controle(semana, meses_permitidos)]})
 
 # ============================================================
 # Hooks de cache
 # ============================================================
 
 def bump_version_token() -> int:
-    """Incrementa token de versão para forçar recarregamento cacheado."""
-    if "version_token" not in st.session_state:
-        st.session_state.version_token = 1
-    else:
-        st.session_state.version_token += 1
+    """Novo token de versão: a próxima leitura reconfere o ETag (se não mudou, o cache vale)."""
+    st.session_state.version_token = novo_version_token()
     return st.session_state.version_token
 
 def get_version_token() -> int:
-    """Retorna token atual de versão."""
-    return st.session_state.get("version_token", 0)
+    """Retorna token atual de versão (sessão nova recebe um token próprio, ainda não conferido)."""
+    if "version_token" not in st.session_state:
+        return bump_version_token()
+    return st.session_state.version_token
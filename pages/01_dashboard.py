@@ -9,8 +9,11 @@ from datetime import datetime
 
 # 1. Configurações de Path e Importações
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
-from entrada_saida.funcoes_io import carregar_previsto, get_version_token
-from api.graph_api import carregar_semana_ativa
+from entrada_saida.funcoes_io import (
+    carregar_previsto, carregar_revisoes_arquivadas, revisoes_arquivadas,
+    esquema_planilha, get_version_token, bump_version_token,
+)
+from api.graph_api import cache_por_etag, carregar_semana_ativa
 
 # Configuração da página
 st.set_page_config(page_title="Dashboard O&S - Rota 27", layout="wide", page_icon="📊")
@@ -47,15 +50,6 @@ st.markdown("""
 st.image("assets/Logo Rota 27.png", width=250)
 st.markdown("---")
 
-# --- FUNÇÃO DE FORMATAÇÃO DE DATA ---
-def formatar_data_resumida(val):
-    try:
-        dt = pd.to_datetime(val, dayfirst=True)
-        meses = ["Jan", "Fev", "Mar", "Abr", "Mai", "Jun", "Jul", "Ago", "Set", "Out", "Nov", "Dez"]
-        return f"{meses[dt.month-1]}/{str(dt.year)[2:]}"
-    except:
-        return str(val)
-
 # 2. Lógica Mutex para Filtros
 def sync_filtros(key):
     if key in st.session_state:
@@ -65,23 +59,28 @@ def sync_filtros(key):
             else: st.session_state[key] = [x for x in escolha if x != "Todos"]
 
 # 3. Carregamento de Dados
-@st.cache_data(ttl=600)
-def fetch_dashboard_data(token):
-    df = carregar_previsto(token)
-    if "Cenário" in df.columns:
-        df = df[df["Cenário"].str.casefold() == "moderado"].copy()
+@cache_por_etag("Base de Dados")
+def fetch_dashboard_data(version_token, arquivadas=()):
+    df = carregar_previsto(version_token)  # já tipada e só Moderado
+    arquivadas = [r for r in arquivadas if r not in set(df["Revisão"].unique())]
+    if arquivadas:
+        # revisões do arquivo frio: lidas do disco só quando selecionadas
+        df = pd.concat([df, carregar_revisoes_arquivadas(arquivadas)], ignore_index=True)
     
     hierarquia = ["RECEITA MAO DE OBRA", "RECEITA LOCAÇÃO", "RECEITA DE INDENIZAÇÃO", "CUSTO COM MAO DE OBRA", "CUSTO COM INSUMOS", "LOCAÇÃO DE EQUIPAMENTOS"]
     df = df[df["Análise de emissão"].isin(hierarquia)].copy()
     df["Análise de emissão"] = pd.Categorical(df["Análise de emissão"], categories=hierarquia, ordered=True)
     return df.sort_values("Análise de emissão")
 
-df_raw = fetch_dashboard_data(get_version_token())
-controle = carregar_semana_ativa(version_token=get_version_token()) or {}
-
 # 4. SIDEBAR - FILTROS
 st.sidebar.title("🔍 Filtros")
 
+op_arquivadas = list(reversed(revisoes_arquivadas()))
+sel_arquivadas = st.sidebar.multiselect("Semanas arquivadas", op_arquivadas, help="Revisões antigas fora da planilha; carregadas só quando selecionadas.") if op_arquivadas else []
+
+df_raw = fetch_dashboard_data(get_version_token(), tuple(sel_arquivadas))
+controle = carregar_semana_ativa(version_token=get_version_token()) or {}
+
 op_col = ["Todos"] + sorted(df_raw["Classificação"].dropna().unique().tolist())
 sel_col = st.sidebar.selectbox("Coligada", op_col)
 df_f = df_raw if sel_col == "Todos" else df_raw[df_raw["Classificação"] == sel_col]
@@ -106,8 +105,10 @@ st.sidebar.multiselect("Análise de Emissão", op_ana, key="d_ana", on_change=sy
 if "Todos" not in st.session_state.d_ana: df_f = df_f[df_f["Análise de emissão"].isin(st.session_state.d_ana)]
 
 # --- FILTRO DE PERÍODO AJUSTADO (COM FORMAT_FUNC) ---
-lixo = ["Revisão", "Cenário", "Semana", "Observações:", "ID", "Classificação", "Gerência", "Complexo", "Área", "Análise de emissão", "CC", "DataHora"]
-todos_meses = [c for c in df_raw.columns if c not in lixo and not str(c).startswith("Unnamed") and pd.to_datetime(c, errors='coerce', dayfirst=True) is not pd.NaT]
+# meses e rótulos "Jan/26" vêm do esquema da planilha (calculado 1x por versão do arquivo)
+esquema = esquema_planilha(get_version_token())
+formatar_data_resumida = esquema.rotulo
+todos_meses = esquema.meses_em(df_raw)
 
 sel_meses = st.sidebar.multiselect(
     "Período Analisado", 
@@ -125,8 +126,9 @@ if df_f.empty or not sel_rev_geral or not sel_meses:
 
 # 5. PROCESSAMENTO
 df_longo = df_f[df_f["Revisão"].isin(sel_rev_geral)].melt(id_vars=["Revisão"], value_vars=sel_meses, var_name="Mês", value_name="Valor")
-df_longo["Valor"] = pd.to_numeric(df_longo["Valor"], errors='coerce').fillna(0)
-df_agrupado = df_longo.groupby(["Mês", "Revisão"], sort=False)["Valor"].sum().reset_index()
+# em geral os meses já vêm numéricos (esquema tipado); colunas com texto chegam como estão
+df_longo["Valor"] = pd.to_numeric(df_longo["Valor"], errors="coerce").fillna(0)
+df_agrupado = df_longo.groupby(["Mês", "Revisão"], sort=False, observed=True)["Valor"].sum().reset_index()
 # Formata o nome do mês para exibição no gráfico/tabela
 df_agrupado["Mês Exibição"] = df_agrupado["Mês"].apply(formatar_data_resumida)
 df_pivot_abs = df_agrupado.pivot(index="Mês", columns="Revisão", values="Valor")
@@ -204,10 +206,11 @@ st.markdown('<div class="section-header">🔍 Detalhamento por Conta (Análise d
 semanas_vivas = list(set([c.get('semana_a') for c in st.session_state.comparativos if c.get('semana_a')] + [c.get('semana_b') for c in st.session_state.comparativos if c.get('semana_b')]))
 semanas_vivas = [s for s in semanas_vivas if s in df_f["Revisão"].values]
 if semanas_vivas:
-    df_contas = df_f[df_f["Revisão"].isin(semanas_vivas)].groupby(["Análise de emissão", "Revisão"])[sel_meses].sum().sum(axis=1).unstack()
+    df_contas = df_f[df_f["Revisão"].isin(semanas_vivas)].groupby(["Análise de emissão", "Revisão"], observed=False)[sel_meses].sum().sum(axis=1).unstack()
+    df_contas = df_contas[[c for c in df_contas.columns if c in semanas_vivas]]  # Revisão é category: só as semanas escolhidas
     st.dataframe(df_contas.style.format("R$ {:,.2f}"), use_container_width=True)
 
 st.sidebar.markdown("---")
 if st.sidebar.button("🔄 Sincronizar Tudo"):
-    st.cache_data.clear()
+    bump_version_token()  # reconfere o ETag; só recarrega se o arquivo mudou
     st.rerun()
\ No newline at end of file
@@ -1,5 +1,4 @@
 import streamlit as st
-import pandas as pd
 import sys
 import os
 import time
@@ -8,14 +7,16 @@ from datetime import datetime
 # Ajuste de path para localizar módulos internos
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
-from configuracoes.config import COLUNAS_ID
 from entrada_saida.funcoes_io import (
     carregar_previsto,
-    salvar_base_dados,
+    esquema_planilha,
+    indice_revisoes,
+    transacao_planilha,
+    salvar_semana_ativa,
     bump_version_token,
     get_version_token,
 )
-from api.graph_api import carregar_semana_ativa, salvar_apenas_aba
+from api.graph_api import cache_por_etag, carregar_semana_ativa
 
 st.set_page_config(page_title="Admin - Rota 27", layout="wide")
 
@@ -59,27 +60,20 @@ if not st.session_state.get("autenticado_admin", False):
     st.stop()
 
 # 3. Carregamento de Dados
-@st.cache_data(ttl=600)
-def fetch_data(token):
-    return carregar_previsto(token)
+@cache_por_etag("Base de Dados")
+def fetch_data(version_token):
+    return carregar_previsto(version_token)
 
 df_previsto = fetch_data(get_version_token())
+indice = indice_revisoes(get_version_token())  # Base particionada por Revisão (somente leitura)
+revisoes_desc = sorted(indice.revisoes(), reverse=True)
 controle = carregar_semana_ativa(version_token=get_version_token()) or {}
 
 # 4. Lógica de Colunas e Datas
-metadados_fixos = ["Revisão", "Cenário", "Semana", "Observações:", "ID", "DataHora"]
-colunas_ignore = list(set(COLUNAS_ID + metadados_fixos))
-cols_m = [c for c in df_previsto.columns if c not in colunas_ignore and pd.to_datetime(c, errors='coerce', dayfirst=True) is not pd.NaT]
-
-# Função para formatar a data gigantesca em "Mes/Ano" (ex: Jan/26)
-def formatar_data_resumida(val):
-    try:
-        dt = pd.to_datetime(val, dayfirst=True)
-        # Lista de meses em PT-BR para garantir o formato desejado
-        meses = ["Jan", "Fev", "Mar", "Abr", "Mai", "Jun", "Jul", "Ago", "Set", "Out", "Nov", "Dez"]
-        return f"{meses[dt.month-1]}/{str(dt.year)[2:]}"
-    except:
-        return str(val)
+# meses em ordem de calendário e rótulos "Mes/Ano" (ex: Jan/26), calculados 1x por versão do arquivo
+esquema = esquema_planilha(get_version_token())
+cols_m = esquema.meses_em(df_previsto)
+formatar_data_resumida = esquema.rotulo
 
 # Processa meses atualmente liberados
 meses_liberados_raw = controle.get("meses", "")
@@ -102,7 +96,7 @@ with tab_create:
     st.subheader("Clonagem de Revisão e Liberação de Período")
     with st.form("form_nova_semana"):
         c_a, c_b = st.columns(2)
-        origem = c_a.selectbox("Copiar dados da revisão:", sorted(df_previsto["Revisão"].unique(), reverse=True))
+        origem = c_a.selectbox("Copiar dados da revisão:", revisoes_desc)
         novo = c_b.text_input("Nome da nova semana:", placeholder="Ex: Semana 05 - v01")
         
         meses_novos = st.multiselect(
@@ -118,17 +112,18 @@ with tab_create:
     if btn_executar:
         if not novo:
             st.error("Por favor, dê um nome para a nova semana.")
-        elif novo in df_previsto["Revisão"].unique():
+        elif novo in indice:
             st.error("Esta semana já existe na base de dados.")
         else:
             with st.status("Clonando dados e configurando travas...", expanded=True) as status:
-                df_nova = df_previsto[df_previsto["Revisão"] == origem].copy()
+                df_nova = indice.revisao(origem).copy()
                 df_nova["Revisão"] = novo
-                salvar_base_dados(df_nova, append=True)
-                
-                str_meses = ";".join([str(m) for m in meses_novos])
-                df_ctrl = pd.DataFrame({"Semana Ativa": [novo], "Meses Permitidos": [str_meses]})
-                salvar_apenas_aba("Controle", df_ctrl)
+                # base e controle no mesmo upload: nunca ficam em versões diferentes
+                with transacao_planilha() as tx:
+                    tx.salvar_base_dados(df_nova, append=True)
+                    tx.salvar_semana_ativa(novo, [str(m) for m in meses_novos])
+                    # com ARQUIVO_MANTER_SEMANAS > 0, revisões antigas vão para o arquivo frio no mesmo upload
+                    tx.arquivar_revisoes_antigas(preservar=[novo])
                 
                 bump_version_token()
                 status.update(label="✅ Nova Semana Ativada com Sucesso!", state="complete", expanded=False)
@@ -141,7 +136,7 @@ with tab_create:
 with tab_edit:
     st.subheader("Manutenção de Semana em Andamento")
     
-    opcoes_rev = sorted(df_previsto["Revisão"].unique(), reverse=True)
+    opcoes_rev = revisoes_desc
     semana_atual_ctrl = controle.get("semana")
     idx_default = opcoes_rev.index(semana_atual_ctrl) if semana_atual_ctrl in opcoes_rev else 0
     
@@ -157,9 +152,7 @@ with tab_edit:
     
     if st.button("Salvar Ajustes"):
         with st.spinner("Atualizando controle..."):
-            str_ajuste = ";".join([str(m) for m in meses_ajuste])
-            df_m = pd.DataFrame({"Semana Ativa": [sel_ativa], "Meses Permitidos": [str_ajuste]})
-            salvar_apenas_aba("Controle", df_m)
+            salvar_semana_ativa(sel_ativa, [str(m) for m in meses_ajuste])
             bump_version_token()
             st.success("Ajustes aplicados!")
             time.sleep(1)
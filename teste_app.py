@@ -15,13 +15,12 @@ _start_total = time.time()
 # Ajuste de path
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
-from configuracoes.config import COLUNAS_ID, COLUNAS_MESES
 from entrada_saida.funcoes_io import (
-    carregar_previsto,
     carregar_previsto_semana_ativa,
-    salvar_base_dados,
-    salvar_em_aba,
+    esquema_planilha,
+    transacao_planilha,
     get_version_token,
+    bump_version_token,
 )
 
 from api.graph_api import carregar_semana_ativa
@@ -160,14 +159,6 @@ def _carregar_base_somente_uma_vez() -> pd.DataFrame:
     # Só mantém Moderado
     df = _filtrar_moderado(df)
 
-    # Ajusta meses
-    COLUNAS_MESES.clear()
-    cols_meses = [
-        c for c in df.columns
-        if c not in COLUNAS_ID and pd.notnull(pd.to_datetime(c, errors="coerce", dayfirst=True))
-    ]
-    COLUNAS_MESES.extend(cols_meses)
-
     st.session_state.df_previsto = df
     st.session_state.semana_nova = semana_ativa
     st.session_state.meses_permitidos_admin = meses_controle
@@ -190,6 +181,7 @@ if st.session_state.meses_permitidos_admin:
 # ============================
 def resetar_cache_e_estado():
     st.cache_data.clear()
+    bump_version_token()  # leituras cacheadas por ETag: reconfere a versão na origem
     for key in [
         "df_previsto","semana_info","semana_nova","meses_permitidos_admin",
         "edicoes","has_unsaved_changes","meses_disponiveis","meses_display",
@@ -238,14 +230,11 @@ if df_semana is None or df_semana.empty:
 # Meses permitidos (pré-cálculo)
 # ============================
 def _extrair_meses_validos(df_ref: pd.DataFrame):
-    cols_meses = [
-        c for c in df_ref.columns
-        if c not in COLUNAS_ID + ["Observações:"]
-        and pd.notnull(pd.to_datetime(c, errors="coerce", dayfirst=True))
-    ]
+    esquema = esquema_planilha(get_version_token())  # meses já identificados, em ordem de calendário
+    cols_meses = esquema.meses_em(df_ref)
     if st.session_state.meses_permitidos_admin:
         cols_meses = [m for m in cols_meses if m in st.session_state.meses_permitidos_admin]
-    display_map = {m: pd.to_datetime(m, dayfirst=True).strftime("%B %Y").capitalize() for m in cols_meses}
+    display_map = {m: esquema.data(m).strftime("%B %Y").capitalize() for m in cols_meses}
     return cols_meses, display_map
 
 if not st.session_state.meses_disponiveis or not st.session_state.meses_display:
@@ -471,10 +460,10 @@ with salvar_col1:
 
             # 🔒 só salva Moderado
             df_final = _filtrar_moderado(df_semana.copy())
-            salvar_base_dados(df_final)
-
-            # histórico
-            salvar_em_aba(pd.DataFrame(st.session_state.edicoes), aba="Histórico")
+            # base + histórico num único upload
+            with transacao_planilha() as tx:
+                tx.salvar_base_dados(df_final)
+                tx.salvar_em_aba(pd.DataFrame(st.session_state.edicoes), aba="Histórico")
 
             # limpa estado
             st.session_state.df_previsto = df_final